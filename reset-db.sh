@@ -1,7 +1,8 @@
 #!/bin/bash
 
-for file in "./src/db"/*.sql; do
-    psql -f "${file}" > ${file%.sql}.txt
-done
+# Drops and recreates an empty database, then builds the schema from
+# src/db/migrations. To update an existing database in place run
+# "python -m src.utils.migrate" (add --dry-run to list pending changes).
 
-# psql -f ./src/db/0-setup-db.sql > ./src/db/setup-db.txt
\ No newline at end of file
+psql -f ./src/db/0-setup-db.sql > ./src/db/0-setup-db.txt
+python -m src.utils.migrate
@@ -0,0 +1,35 @@
+-- Natural keys used by insert() to find existing rows before writing.
+CREATE UNIQUE INDEX IF NOT EXISTS archetypes_archetype_name_key
+    ON archetypes (archetype_name);
+CREATE UNIQUE INDEX IF NOT EXISTS skills_skill_name_key
+    ON skills (skill_name);
+CREATE UNIQUE INDEX IF NOT EXISTS modules_module_name_key
+    ON modules (module_name);
+CREATE UNIQUE INDEX IF NOT EXISTS operators_operator_name_key
+    ON operators (operator_name);
+CREATE UNIQUE INDEX IF NOT EXISTS operators_gamepress_url_name_key
+    ON operators (gamepress_url_name);
+CREATE UNIQUE INDEX IF NOT EXISTS tags_tag_name_key
+    ON tags (tag_name);
+
+-- Leading operator_id column also serves the per-operator tag lookup.
+CREATE UNIQUE INDEX IF NOT EXISTS operators_tags_operator_id_tag_id_key
+    ON operators_tags (operator_id, tag_id);
+
+-- Referencing side of foreign keys, postgres does not index these itself.
+CREATE INDEX IF NOT EXISTS operators_tags_tag_id_idx
+    ON operators_tags (tag_id);
+CREATE INDEX IF NOT EXISTS operators_archetype_id_idx
+    ON operators (archetype_id);
+CREATE INDEX IF NOT EXISTS operators_alter_idx
+    ON operators (alter);
+CREATE INDEX IF NOT EXISTS operators_skill_1_id_idx
+    ON operators (skill_1_id);
+CREATE INDEX IF NOT EXISTS operators_skill_2_id_idx
+    ON operators (skill_2_id);
+CREATE INDEX IF NOT EXISTS operators_skill_3_id_idx
+    ON operators (skill_3_id);
+CREATE INDEX IF NOT EXISTS operators_module_1_id_idx
+    ON operators (module_1_id);
+CREATE INDEX IF NOT EXISTS operators_module_2_id_idx
+    ON operators (module_2_id);
@@ -0,0 +1,60 @@
+-- Binary JSON storage so structured columns are parsed once on write and
+-- can be indexed.
+ALTER TABLE modules
+    ALTER COLUMN level_1_stats TYPE JSONB USING level_1_stats::jsonb,
+    ALTER COLUMN level_2_talent TYPE JSONB USING level_2_talent::jsonb,
+    ALTER COLUMN level_2_stats TYPE JSONB USING level_2_stats::jsonb,
+    ALTER COLUMN level_3_talent TYPE JSONB USING level_3_talent::jsonb,
+    ALTER COLUMN level_3_stats TYPE JSONB USING level_3_stats::jsonb;
+
+ALTER TABLE skills
+    ALTER COLUMN l1 TYPE JSONB USING l1::jsonb,
+    ALTER COLUMN l2 TYPE JSONB USING l2::jsonb,
+    ALTER COLUMN l3 TYPE JSONB USING l3::jsonb,
+    ALTER COLUMN l4 TYPE JSONB USING l4::jsonb,
+    ALTER COLUMN l5 TYPE JSONB USING l5::jsonb,
+    ALTER COLUMN l6 TYPE JSONB USING l6::jsonb,
+    ALTER COLUMN l7 TYPE JSONB USING l7::jsonb,
+    ALTER COLUMN m1 TYPE JSONB USING m1::jsonb,
+    ALTER COLUMN m2 TYPE JSONB USING m2::jsonb,
+    ALTER COLUMN m3 TYPE JSONB USING m3::jsonb;
+
+ALTER TABLE operators
+    ALTER COLUMN level_stats TYPE JSONB USING level_stats::jsonb,
+    ALTER COLUMN ranges TYPE JSONB USING ranges::jsonb,
+    ALTER COLUMN potentials TYPE JSONB USING potentials::jsonb,
+    ALTER COLUMN trust_stats TYPE JSONB USING trust_stats::jsonb,
+    ALTER COLUMN talents TYPE JSONB USING talents::jsonb;
+
+-- Expression indexes, these match the expressions the query builder
+-- produces for tuple keyed where filters, e.g.
+-- {("level_stats", "e2", "Max", "ATK"): (">=", 600)}
+CREATE INDEX IF NOT EXISTS operators_e0_max_atk_idx
+    ON operators (((level_stats->'e0'->'Max'->>'ATK')::int));
+CREATE INDEX IF NOT EXISTS operators_e1_max_atk_idx
+    ON operators (((level_stats->'e1'->'Max'->>'ATK')::int));
+CREATE INDEX IF NOT EXISTS operators_e2_max_atk_idx
+    ON operators (((level_stats->'e2'->'Max'->>'ATK')::int));
+CREATE INDEX IF NOT EXISTS operators_e2_max_def_idx
+    ON operators (((level_stats->'e2'->'Max'->>'DEF')::int));
+CREATE INDEX IF NOT EXISTS operators_e2_max_hp_idx
+    ON operators (((level_stats->'e2'->'Max'->>'HP')::int));
+
+CREATE INDEX IF NOT EXISTS skills_l1_sp_cost_idx
+    ON skills (((l1->>'sp_cost')::int));
+CREATE INDEX IF NOT EXISTS skills_l7_sp_cost_idx
+    ON skills (((l7->>'sp_cost')::int));
+CREATE INDEX IF NOT EXISTS skills_m3_sp_cost_idx
+    ON skills (((m3->>'sp_cost')::int));
+
+-- Containment (@>) searches over nested documents.
+CREATE INDEX IF NOT EXISTS operators_talents_gin_idx
+    ON operators USING GIN (talents jsonb_path_ops);
+CREATE INDEX IF NOT EXISTS operators_potentials_gin_idx
+    ON operators USING GIN (potentials jsonb_path_ops);
+CREATE INDEX IF NOT EXISTS operators_trust_stats_gin_idx
+    ON operators USING GIN (trust_stats jsonb_path_ops);
+CREATE INDEX IF NOT EXISTS modules_level_2_talent_gin_idx
+    ON modules USING GIN (level_2_talent jsonb_path_ops);
+CREATE INDEX IF NOT EXISTS modules_level_3_talent_gin_idx
+    ON modules USING GIN (level_3_talent jsonb_path_ops);
@@ -0,0 +1,3 @@
+-- Fingerprint of the upstream page each operator row was parsed from, so
+-- refresh crawls can skip operators whose page hasn't changed.
+ALTER TABLE operators ADD COLUMN IF NOT EXISTS content_hash VARCHAR;
@@ -0,0 +1,17 @@
+-- One row per searchable piece of text (operator descriptions, archetype
+-- traits, talents, skill and module descriptions), rebuilt by insert().
+CREATE TABLE IF NOT EXISTS search_documents (
+    search_document_id SERIAL PRIMARY KEY,
+    entity VARCHAR NOT NULL,
+    entity_id INT NOT NULL,
+    name VARCHAR NOT NULL,
+    field VARCHAR NOT NULL,
+    content VARCHAR NOT NULL,
+    document TSVECTOR GENERATED ALWAYS AS
+        (to_tsvector('english', content)) STORED
+);
+
+CREATE INDEX IF NOT EXISTS search_documents_document_idx
+    ON search_documents USING GIN (document);
+CREATE INDEX IF NOT EXISTS search_documents_entity_entity_id_idx
+    ON search_documents (entity, entity_id);
@@ -0,0 +1,4 @@
+-- Each elite stage's range as a 256 bit tile mask in hex, see
+-- src/utils/ranges.py for the layout. Rows stored before this are
+-- backfilled by 0008, new ones are filled in by ingest.
+ALTER TABLE operators ADD COLUMN IF NOT EXISTS range_masks JSONB;
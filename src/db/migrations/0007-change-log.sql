@@ -0,0 +1,14 @@
+-- One row per entity created or modified by insert(), so API consumers can
+-- sync by asking for everything after the last revision they saw. data holds
+-- the full row for "created" and only the changed columns for "updated".
+CREATE TABLE IF NOT EXISTS change_log (
+    revision BIGSERIAL PRIMARY KEY,
+    entity VARCHAR NOT NULL,
+    entity_id INT NOT NULL,
+    action VARCHAR NOT NULL,
+    data JSONB NOT NULL,
+    changed_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS change_log_entity_idx
+ON change_log (entity, entity_id);
@@ -0,0 +1,58 @@
+-- Fills in range_masks for operators stored before 0006. Ingest won't
+-- rewrite them: new only crawls skip known operators and refresh crawls skip
+-- unchanged pages. Mirrors encode_range and mask_hex in src/utils/ranges.py,
+-- bit (dy + 7) * 16 + (dx + 7) is set for every tile in range, the
+-- operator's own included, written out as 64 hex digits. As there, tiles
+-- outside the grid are skipped and a range with no operator tile is left out
+-- of range_masks, so one odd range doesn't hold up the rest.
+CREATE OR REPLACE FUNCTION pg_temp.range_mask_hex(range_str TEXT)
+RETURNS TEXT AS $$
+DECLARE
+    grid_rows TEXT[] := string_to_array(range_str, E'\n');
+    mask BIT(256) := B'0'::BIT(256);
+    hex TEXT := '';
+    r0 INT;
+    c0 INT;
+    dx INT;
+    dy INT;
+BEGIN
+    FOR r IN 1 .. coalesce(array_length(grid_rows, 1), 0) LOOP
+        IF r0 IS NULL AND strpos(grid_rows[r], chr(9632)) > 0 THEN
+            r0 := r;
+            c0 := strpos(grid_rows[r], chr(9632));
+        END IF;
+    END LOOP;
+    IF r0 IS NULL THEN
+        RETURN NULL;
+    END IF;
+    FOR r IN 1 .. array_length(grid_rows, 1) LOOP
+        FOR c IN 1 .. char_length(grid_rows[r]) LOOP
+            IF substr(grid_rows[r], c, 1) IN (chr(9632), chr(9633)) THEN
+                dx := c - c0;
+                dy := r - r0;
+                IF dx BETWEEN -7 AND 8 AND dy BETWEEN -7 AND 8 THEN
+                    -- Bit strings number their bits from the left
+                    mask := set_bit(mask, 255 - ((dy + 7) * 16 + dx + 7), 1);
+                END IF;
+            END IF;
+        END LOOP;
+    END LOOP;
+    FOR i IN 0 .. 63 LOOP
+        hex := hex
+            || to_hex(substring(mask FROM i * 4 + 1 FOR 4)::BIT(4)::INT);
+    END LOOP;
+    RETURN hex;
+END;
+$$ LANGUAGE plpgsql;
+
+UPDATE operators
+SET range_masks = coalesce((
+    SELECT jsonb_object_agg(phase, mask)
+    FROM jsonb_each_text(ranges) AS stages(phase, range_str),
+        LATERAL (SELECT pg_temp.range_mask_hex(range_str) AS mask) AS masks
+    WHERE mask IS NOT NULL
+), '{}'::jsonb)
+WHERE range_masks IS NULL AND ranges IS NOT NULL
+    AND jsonb_typeof(ranges) = 'object';
+
+DROP FUNCTION pg_temp.range_mask_hex(TEXT);
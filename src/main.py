@@ -1,8 +1,287 @@
-from fastapi import FastAPI
+from fastapi import (
+    FastAPI, HTTPException, Request, WebSocket,
+    WebSocketDisconnect
+)
+from fastapi.responses import StreamingResponse
+from src.utils.mmap_snapshot import open_snapshot
+from src.utils.connect import load_env, postgres_configured, read
+from src.utils.query import Query
+from src.utils.search import search
+from src.utils.recruit import get_index, UnknownTagErr, TooManyTagsErr
+from src.utils import ranges
+from src.utils.changes import stream_changes
+from src.utils.hub import Hub
+from src.utils.cache import ResponseCache
+from src.utils.freshness import data_version
+from src.utils.compression import CompressedCache, compressed_response
+from src.utils.listener import CacheListener
+from src.utils.batch import get_operators, BadFieldErr, BatchTooLargeErr
+from os import getenv
+from hashlib import sha1
+from asyncio import FIRST_COMPLETED, create_task, wait
+import orjson
 
 app = FastAPI()
 
+snapshot = None
+hub = Hub()
+cache = ResponseCache()
+bodies = CompressedCache()
+listener = CacheListener(cache)
+
+
+def get_snapshot():
+    ''' Opens the memory mapped snapshot named by MMAP_SNAPSHOT the first
+        time it's available, each worker maps the same file.
+    '''
+    global snapshot
+    if snapshot is None:
+        load_env()
+        snapshot = open_snapshot(getenv("MMAP_SNAPSHOT"))
+    return snapshot
+
+
+# numpy makes up most of the stat modules' import time and only the ranking
+# endpoints use them, so they're imported on the first ranking request rather
+# than when a worker starts. Nothing from the scraper or ingest side should
+# be imported here at all, test_main checks both.
+def get_engine():
+    from src.utils.stat_engine import get_engine
+    return get_engine()
+
+
+def get_calculator():
+    from src.utils.dps import get_calculator
+    return get_calculator()
+
+
+@app.on_event("startup")
+def start_listener():
+    if postgres_configured():
+        listener.start()
+
+
+@app.on_event("shutdown")
+def stop_listener():
+    listener.stop()
+
 
 @app.get("/api/", status_code=200)
 async def root():
     return {"message": "Hello World"}
+
+
+def split_param(param: str = None):
+    if not param:
+        return []
+    return [item.strip() for item in param.split(",") if item.strip()]
+
+
+@app.get("/api/operators", status_code=200)
+def get_operators_batch(names: str = None, ids: str = None,
+                        fields: str = None):
+    ''' Fetches many operators in one query. names and ids are comma
+        separated, fields limits the columns returned.
+    '''
+    try:
+        id_list = [int(i) for i in split_param(ids)]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="ids must be integers")
+    try:
+        return get_operators(
+            split_param(names), id_list, split_param(fields) or None
+        )
+    except (BadFieldErr, BatchTooLargeErr) as err:
+        raise HTTPException(status_code=400, detail=str(err))
+
+
+@app.get("/api/operators/{name}", status_code=200)
+def get_operator(name: str, request: Request):
+    ''' Serves an operator's document, compressed to suit the client and
+        cached per version: the snapshot file and document offset, or a
+        hash of the body when read from the db.
+    '''
+    snap = get_snapshot()
+    if snap:
+        doc = snap.find("operators", name=name)
+        if doc is None:
+            raise HTTPException(status_code=404, detail="Operator not found")
+        view, (offset, length) = snap.view, doc
+        version = f"{snap.generation:x}-{offset:x}"
+
+        def body_fn():
+            return bytes(view[offset:offset + length])
+    else:
+        # NOTIFY arrives before the SQLite snapshot is re-exported, so when
+        # reads come from one the cache also starts over on each file swap
+        if getenv("SQLITE_SNAPSHOT"):
+            cache.sync(data_version())
+        key = ("operator", name)
+        cached = cache.get(key)
+        if cached is None:
+            generation = cache.generation
+            q = Query("operators").select()
+            q.where({"operator_name": name})
+            q.where({"gamepress_url_name": name})
+            res = read(q)
+            # A miss depends on the whole table, any new operator could match
+            tags = [("operators", row["operator_id"]) for row in res]
+            body = orjson.dumps(res[0]) if res != [] else None
+            version = sha1(body).hexdigest()[:16] if body else None
+            cached = cache.set(
+                key, (body, version), tags or [("operators", None)],
+                generation
+            )
+        body, version = cached
+        if body is None:
+            raise HTTPException(status_code=404, detail="Operator not found")
+
+        def body_fn():
+            return body
+    return compressed_response(
+        bodies, version, body_fn,
+        accept_encoding=request.headers.get("accept-encoding"),
+        if_none_match=request.headers.get("if-none-match")
+    )
+
+
+@app.get("/api/search", status_code=200)
+def search_text(q: str, entity: str = None, field: str = None,
+                limit: int = 20):
+    limit = max(1, min(limit, 100))
+    return search(q, entity=entity, field=field, limit=limit)
+
+
+@app.get("/api/recruit", status_code=200)
+def recruit(tags: str, server: str = "en"):
+    if server not in ["en", "cn"]:
+        raise HTTPException(status_code=400, detail="Unknown server")
+    selected = [tag.strip() for tag in tags.split(",") if tag.strip()]
+    try:
+        return get_index(server).lookup(selected)
+    except (UnknownTagErr, TooManyTagsErr) as err:
+        raise HTTPException(status_code=400, detail=str(err))
+
+
+@app.get("/api/stats/rank", status_code=200)
+def rank_stats(stat: str = "ATK", class_name: str = None,
+               archetype: str = None, elite: int = 2, level: int = None,
+               potential: int = 1, trust: int = 0, module: int = 0,
+               module_level: int = 3, limit: int = 20):
+    from src.utils.stat_engine import BadStatParamErr
+    try:
+        return get_engine().rank(
+            stat, class_name=class_name, archetype=archetype,
+            limit=min(limit, 500), elite=elite, level=level,
+            potential=potential, trust=trust, module=module,
+            module_level=module_level
+        )
+    except BadStatParamErr as err:
+        raise HTTPException(status_code=400, detail=str(err))
+
+
+@app.get("/api/dps/rank", status_code=200)
+def rank_dps(class_name: str = None, enemy_def: int = 0, enemy_res: int = 0,
+             skill_level: str = "m3", elite: int = 2, potential: int = 1,
+             trust: int = 100, module: int = 0, limit: int = 20,
+             fight_time: float = None):
+    from src.utils.stat_engine import BadStatParamErr
+    try:
+        return get_calculator().rank(
+            class_name=class_name, limit=min(limit, 500),
+            enemy_def=enemy_def, enemy_res=enemy_res,
+            skill_level=skill_level, fight_time=fight_time, elite=elite,
+            potential=potential, trust=trust, module=module
+        )
+    except BadStatParamErr as err:
+        raise HTTPException(status_code=400, detail=str(err))
+
+
+@app.get("/api/ranges", status_code=200)
+def search_ranges(dx: int = None, dy: int = None, superset_of: str = None,
+                  elite: int = 2):
+    index = ranges.get_index()
+    phase = f"e{elite}"
+    try:
+        if superset_of:
+            mask = index.mask_of(superset_of, phase)
+            if mask is None:
+                raise HTTPException(
+                    status_code=404, detail="Operator range not found"
+                )
+            return index.supersets(mask, phase)
+        if dx is None or dy is None:
+            raise HTTPException(
+                status_code=400, detail="Pass dx and dy, or superset_of"
+            )
+        return index.covering(dx, dy, phase)
+    except ranges.BadRangeErr as err:
+        raise HTTPException(status_code=400, detail=str(err))
+
+
+@app.get("/api/changes", status_code=200)
+def get_changes(since: int = 0):
+    ''' Streams every change after revision since as newline delimited
+        JSON, oldest first. Clients store the last revision they read and
+        pass it back next time.
+    '''
+    lines = (orjson.dumps(change) + b"\n" for change in stream_changes(since))
+    return StreamingResponse(lines, media_type="application/x-ndjson")
+
+
+def parse_topics(topics: str = None):
+    return split_param(topics) or None
+
+
+async def sse_events(sub):
+    ''' Formats a subscription's events as server sent events, dropping
+        the subscription once the client goes away.
+    '''
+    try:
+        while True:
+            event = await sub.next()
+            yield f"event: {event['event']}\n".encode()
+            yield b"data: " + orjson.dumps(event) + b"\n\n"
+    finally:
+        hub.unsubscribe(sub)
+
+
+@app.get("/api/events", status_code=200)
+async def events(topics: str = None):
+    ''' Server sent events for changes to the topics, comma separated
+        entity names such as "operator,skill", or every entity if omitted.
+    '''
+    sub = hub.subscribe(parse_topics(topics))
+    hub.ensure_polling()
+    return StreamingResponse(sse_events(sub), media_type="text/event-stream")
+
+
+@app.websocket("/api/ws")
+async def events_ws(websocket: WebSocket, topics: str = None):
+    ''' WebSocket version of /api/events. Anything the client sends is
+        ignored, but listening for it means a disconnect is noticed even
+        while no events are arriving.
+    '''
+    await websocket.accept()
+    sub = hub.subscribe(parse_topics(topics))
+    hub.ensure_polling()
+    receiver = create_task(websocket.receive())
+    try:
+        while True:
+            sender = create_task(sub.next())
+            done, _ = await wait(
+                [receiver, sender], return_when=FIRST_COMPLETED
+            )
+            if sender in done:
+                await websocket.send_json(sender.result())
+            else:
+                sender.cancel()
+            if receiver in done:
+                if receiver.result()["type"] == "websocket.disconnect":
+                    break
+                receiver = create_task(websocket.receive())
+    except WebSocketDisconnect:
+        pass
+    finally:
+        receiver.cancel()
+        hub.unsubscribe(sub)
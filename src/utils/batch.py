@@ -0,0 +1,57 @@
+from src.utils.connect import read
+from src.utils.query import Query
+from src.utils.records import Operator
+from dataclasses import fields
+
+max_batch = 100
+id_columns = [
+    "operator_id", "archetype_id", "skill_1_id", "skill_2_id", "skill_3_id",
+    "module_1_id", "module_2_id"
+]
+# Unquoted names fold to lowercase in postgres, so rows come back that way
+operator_columns = id_columns + [
+    field.name.lower() for field in fields(Operator)
+]
+
+
+class BadFieldErr(Exception):
+    pass
+
+
+class BatchTooLargeErr(Exception):
+    pass
+
+
+def batch_query(names: list = None, ids: list = None, cols: list = None):
+    ''' Builds one SelectQuery for every operator matching any of the names,
+        by operator or url name, or ids, selecting only cols plus
+        operator_id so rows can be told apart.
+    '''
+    names = list(dict.fromkeys(names or []))
+    ids = list(dict.fromkeys(ids or []))
+    if len(names) + len(ids) > max_batch:
+        msg = f"At most {max_batch} operators can be fetched at once."
+        raise BatchTooLargeErr(msg)
+    cols = [col.lower() for col in cols or operator_columns]
+    unknown = [col for col in cols if col not in operator_columns]
+    if unknown:
+        msg = f"Unknown fields: {', '.join(unknown)}, use any of: "
+        msg += ", ".join(operator_columns)
+        raise BadFieldErr(msg)
+    cols = ["operator_id"] + [col for col in cols if col != "operator_id"]
+    q = Query("operators").select(cols)
+    if names:
+        q.where({"operator_name": ("IN", names)})
+        q.where({"gamepress_url_name": ("IN", names)})
+    if ids:
+        q.where({"operator_id": ("IN", ids)})
+    return q
+
+
+def get_operators(names: list = None, ids: list = None, cols: list = None):
+    ''' Returns the matching operators' rows in one round trip, or an empty
+        list if neither names nor ids were given.
+    '''
+    if not names and not ids:
+        return []
+    return read(batch_query(names, ids, cols))
@@ -0,0 +1,53 @@
+from time import perf_counter
+from src.utils.query import Query
+import sys
+
+cols = [
+    "operator_name", "rarity", "interval", "limited", "alter",
+    "level_stats", "talents", "potentials"
+]
+
+
+def sample_rows(count):
+    ''' Builds count operator shaped rows, each with a few KB of nested JSON
+        like the level_stats and talents columns hold.
+    '''
+    rows = []
+    for i in range(count):
+        level_stats = {
+            f"e{e}": {
+                str(level): {"HP": 1000 + level, "ATK": 300 + level,
+                             "DEF": 150, "RES": 0}
+                for level in range(1, 91, 10)
+            }
+            for e in range(3)
+        }
+        talents = {
+            "Vanguard's Will": {
+                "e2": {"p1": "ATK +10% when deployed, can't be 'healed'"}
+            }
+        }
+        potentials = {"p2": f"Cost -{i % 3}", "p3": "Redeploy -4s",
+                      "p4": None}
+        rows.append([
+            f"Operator {i}", i % 6 + 1, 1.05, i % 2 == 0, None,
+            level_stats, talents, potentials
+        ])
+    return rows
+
+
+def bench(count=2000, repeats=5):
+    ''' Times escaping and compiling a count row insert, returning the mean
+        time per run in milliseconds.
+    '''
+    rows = sample_rows(count)
+    start = perf_counter()
+    for _ in range(repeats):
+        str(Query("operators").insert(cols, rows))
+    elapsed = perf_counter() - start
+    return elapsed * 1000 / repeats
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    print(f"{bench(count):.1f} ms per {count} row insert")
@@ -0,0 +1,67 @@
+from os import listdir, path
+from time import perf_counter
+from src.utils.scraper import scrape, fetch
+from src.utils.insert import add_ids_to_op
+import tracemalloc
+import sys
+
+
+def record(directory, names):
+    ''' Saves the gamepress page of each named operator to
+        <directory>/<name>.html so parsing can be timed offline.
+    '''
+    for name in names:
+        with open(path.join(directory, name + ".html"), "w") as f:
+            f.write(fetch(name)[1])
+
+
+def load_pages(directory):
+    pages = {}
+    for file_name in sorted(listdir(directory)):
+        if file_name.endswith(".html"):
+            with open(path.join(directory, file_name)) as f:
+                pages[file_name[:-5]] = f.read()
+    return pages
+
+
+def bench(directory, repeats=3):
+    ''' Times scrape() over every recorded page in the directory, returning
+        the mean parse time per operator in milliseconds.
+    '''
+    pages = load_pages(directory)
+    if not pages:
+        return 0
+    start = perf_counter()
+    for _ in range(repeats):
+        for name in pages:
+            scrape(name, pages[name])
+    elapsed = perf_counter() - start
+    return elapsed * 1000 / (repeats * len(pages))
+
+
+def memory(directory, repeats=10):
+    ''' Parses every recorded page repeats times and builds its operator
+        row, holding on to the results as an ingest batch would. Returns the
+        (retained, peak) memory traced in MB.
+    '''
+    pages = load_pages(directory)
+    held = []
+    tracemalloc.start()
+    for _ in range(repeats):
+        for name in pages:
+            operator_info, *data = scrape(name, pages[name])
+            held.append((add_ids_to_op(operator_info, 1, [1], [1]), *data))
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return retained / 1e6, peak / 1e6
+
+
+if __name__ == "__main__":
+    if sys.argv[1] == "record":
+        record(sys.argv[2], sys.argv[3:])
+    elif sys.argv[1] == "memory":
+        retained, peak = memory(sys.argv[2])
+        print(f"{retained:.2f} MB retained, {peak:.2f} MB peak")
+    else:
+        repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+        print(f"{bench(sys.argv[1], repeats):.2f} ms per operator")
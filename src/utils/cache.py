@@ -0,0 +1,94 @@
+from threading import Lock
+from time import monotonic
+
+
+class ResponseCache:
+    ''' Thread safe cache of API responses, each tagged with the rows it was
+        built from as (table, id) pairs, or (table, None) for a response
+        that depends on the whole table.
+
+        evict() drops exactly the entries tagged with the changed rows, plus
+        the whole table ones, so entries can live for a long ttl and still
+        never be served stale once a change notification arrives.
+
+        Every evict() or clear() bumps generation. A caller reads it before
+        fetching and passes it to set(), which won't store a value fetched
+        before an eviction that could have made it stale.
+    '''
+
+    def __init__(self, ttl: float = 3600, max_entries: int = 1024):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.entries = {}
+        self.tags = {}
+        self.generation = 0
+        self.version = None
+        self.lock = Lock()
+
+    def get(self, key, default=None):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return default
+            value, tags, expires = entry
+            if monotonic() > expires:
+                self.drop(key)
+                return default
+            return value
+
+    def set(self, key, value, tags, generation: int = None):
+        with self.lock:
+            if generation is not None and generation != self.generation:
+                return value
+            if key in self.entries:
+                self.drop(key)
+            elif len(self.entries) >= self.max_entries:
+                self.drop(next(iter(self.entries)))
+            tags = set(tags)
+            self.entries[key] = (value, tags, monotonic() + self.ttl)
+            for tag in tags:
+                self.tags.setdefault(tag, set()).add(key)
+        return value
+
+    def drop(self, key):
+        ''' Removes an entry and its tag references, the lock must be held.
+        '''
+        _, tags, _ = self.entries.pop(key)
+        for tag in tags:
+            keys = self.tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self.tags[tag]
+
+    def evict(self, table: str, ids: list = None):
+        ''' Drops the entries built from any of the table's rows in ids, and
+            those depending on the whole table. With no ids every entry
+            touching the table goes. Returns the number evicted.
+        '''
+        with self.lock:
+            self.generation += 1
+            if ids is None:
+                tags = [tag for tag in self.tags if tag[0] == table]
+            else:
+                tags = [(table, None)] + [(table, i) for i in ids]
+            keys = set()
+            for tag in tags:
+                keys |= self.tags.get(tag, set())
+            for key in keys:
+                self.drop(key)
+            return len(keys)
+
+    def clear(self):
+        with self.lock:
+            self.generation += 1
+            self.entries = {}
+            self.tags = {}
+
+    def sync(self, version):
+        ''' Clears the cache when version, whatever identifies the data its
+            entries were read from, has changed since the last call.
+        '''
+        if version != self.version:
+            self.clear()
+            self.version = version
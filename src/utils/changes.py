@@ -0,0 +1,63 @@
+from src.utils.connect import run
+from src.utils.query import Query
+from src.utils.formatting import lit
+import json
+
+actions = ["created", "updated"]
+channel = "apiknights_changes"
+
+
+class UnknownActionErr(Exception):
+    pass
+
+
+def record_change(entity: str, entity_id: int, action: str, data: dict):
+    ''' Appends a row to the change log. data is the full row for a
+        created entity and just the changed columns for an updated one.
+
+        The same statement NOTIFYs the change channel with the table and id,
+        so API processes listening on it can evict what they cached.
+    '''
+    if action not in actions:
+        msg = f'"{action}" is not a change action, use one of: '
+        msg += ", ".join(actions)
+        raise UnknownActionErr(msg)
+    q = Query("change_log").insert_d({
+        "entity": entity,
+        "entity_id": entity_id,
+        "action": action,
+        "data": json.dumps(data, default=str)
+    })
+    payload = json.dumps({"table": entity + "s", "ids": [entity_id]})
+    query = q() + f"\nSELECT pg_notify({lit(channel)}, {lit(payload)});"
+    run(query)
+
+
+latest_revision_q = Query("change_log").select("revision").order_by(
+    "revision", desc=True
+).limit(1).freeze()
+
+
+def latest_revision():
+    ''' Returns the newest revision in the change log, 0 when it's empty. '''
+    res = run(latest_revision_q())
+    return res[0]["revision"] if res != [] else 0
+
+
+def changes_since(revision: int, limit: int = 500):
+    ''' Returns up to limit change log rows after revision, oldest first. '''
+    q = Query("change_log").select()
+    q.where({"revision": (">", revision)}).order_by("revision").limit(limit)
+    return run(q())
+
+
+def stream_changes(revision: int, page_size: int = 500):
+    ''' Yields every change after revision, oldest first, fetching a page
+        at a time so a client far behind doesn't load the whole log at once.
+    '''
+    while True:
+        page = changes_since(revision, page_size)
+        yield from page
+        if len(page) < page_size:
+            return
+        revision = page[-1]["revision"]
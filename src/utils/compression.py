@@ -0,0 +1,120 @@
+from fastapi import Response
+from threading import Lock
+import gzip
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Bodies this small aren't worth the headers
+min_size = 512
+
+
+def accepted_encodings(header: str = None):
+    ''' Parses an Accept-Encoding header into a dict of encoding to q value,
+        dropping any refused with q=0.
+    '''
+    accepted = {}
+    for part in (header or "").split(","):
+        name, *params = [item.strip() for item in part.split(";")]
+        if not name:
+            continue
+        q = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    q = float(param[2:])
+                except ValueError:
+                    q = 0.0
+        if q > 0:
+            accepted[name.lower()] = q
+    return accepted
+
+
+def negotiate(header: str = None):
+    ''' Picks the encoding to send for an Accept-Encoding header, brotli
+        over gzip when both are equally welcome and brotli is installed.
+    '''
+    accepted = accepted_encodings(header)
+    offered = ["br", "gzip"] if brotli else ["gzip"]
+    best, best_q = "identity", 0
+    for encoding in offered:
+        q = accepted.get(encoding, accepted.get("*", 0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def compress(body: bytes, encoding: str):
+    if encoding == "br":
+        return brotli.compress(body, quality=5)
+    elif encoding == "gzip":
+        return gzip.compress(body, compresslevel=6, mtime=0)
+    return body
+
+
+class CompressedCache:
+    ''' Compressed bodies keyed by (version, encoding), where version
+        identifies one resource's content, e.g. a hash of its body or its
+        place in a snapshot file. A new version is a new key, so entries are
+        never stale, the oldest are dropped once max_entries is reached.
+    '''
+
+    def __init__(self, max_entries: int = 2048):
+        self.max_entries = max_entries
+        self.entries = {}
+        self.lock = Lock()
+
+    def get(self, version: str, encoding: str, body_fn):
+        ''' Returns (body, applied encoding) for version in encoding,
+            calling body_fn for the uncompressed bytes only when it isn't
+            cached. Small bodies are left as they are.
+        '''
+        key = (version, encoding)
+        with self.lock:
+            entry = self.entries.get(key)
+        if entry is not None:
+            return entry
+        body = body_fn()
+        if len(body) < min_size:
+            encoding = "identity"
+        entry = (compress(body, encoding), encoding)
+        with self.lock:
+            if len(self.entries) >= self.max_entries:
+                self.entries.pop(next(iter(self.entries)))
+            self.entries[key] = entry
+        return entry
+
+
+def compressed_response(cache: CompressedCache, version: str, body_fn,
+                        accept_encoding: str = None, if_none_match=None,
+                        media_type: str = "application/json"):
+    ''' Builds a response for a versioned resource, answering 304 when the
+        client already has it and otherwise serving the negotiated encoding
+        from cache. Each encoding is its own representation, so the ETag
+        names the encoding actually applied, which for a small body is
+        identity whatever was negotiated. Finding that out needs the body
+        unless nothing was to be compressed, so only then can a 304 be
+        answered without it.
+    '''
+    negotiated = negotiate(accept_encoding)
+    body = None
+    if negotiated == "identity":
+        encoding = negotiated
+    else:
+        body, encoding = cache.get(version, negotiated, body_fn)
+    if encoding == "identity":
+        etag = f'"{version}"'
+    else:
+        etag = f'"{version}-{encoding}"'
+    headers = {"ETag": etag, "Vary": "Accept-Encoding"}
+    if if_none_match and etag in [
+        tag.strip().removeprefix("W/") for tag in if_none_match.split(",")
+    ]:
+        return Response(status_code=304, headers=headers)
+    if body is None:
+        body, encoding = cache.get(version, negotiated, body_fn)
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+    return Response(content=body, media_type=media_type, headers=headers)
@@ -1,37 +1,98 @@
 from pg8000.native import Connection
-from dotenv import load_dotenv
-from os import getenv
+from os import getenv, stat
+from collections import namedtuple
+from datetime import date, datetime
+from contextlib import closing
+from functools import lru_cache
+import sqlite3
+import json
+import re
 
-load_dotenv()
+env_loaded = False
+
+
+def load_env():
+    ''' Loads the .env file into the environment the first time it's called.
+        Deferred rather than done at import so the API workers don't pay for
+        python-dotenv until they first need a setting.
+    '''
+    global env_loaded
+    if not env_loaded:
+        from dotenv import load_dotenv
+        load_dotenv()
+        env_loaded = True
+
+
+def postgres_configured():
+    ''' Whether the environment names a postgres user to connect as.
+        Deployments serving only from snapshots don't.
+    '''
+    load_env()
+    return bool(getenv("PGUSER"))
 
 
 def connect():
     ''' Return a pg8000 Connection object using the credentials loaded from the
         .env file.
     '''
+    load_env()
     user = getenv("PGUSER")
     db = getenv("PGDATABASE")
     password = getenv("PGPASSWORD")
     return Connection(user, database=db, password=password)
 
 
+# {} gives a dict per row and [] the column headings then a list per row.
+# "rows" gives pg8000's own value lists with no headings, "namedtuples" a
+# namedtuple per row and "columns" a dict of column heading to a list of
+# its values. Dicts are the most convenient and the most expensive.
+return_types = [{}, [], "rows", "namedtuples", "columns"]
+stream_types = [{}, "rows", "namedtuples"]
+cursor_name = "apiknights_stream"
+
+
+@lru_cache(maxsize=256)
+def row_class(cols: tuple):
+    ''' Returns the namedtuple for rows with these column headings, renaming
+        any that aren't valid field names to _0, _1 etc. by position.
+    '''
+    return namedtuple("Row", cols, rename=True)
+
+
+def shape(cols: list, rows: list, return_type={}):
+    ''' Arranges rows, lists of values in cols order, as return_type. '''
+    if return_type == []:
+        return [cols] + rows
+    elif return_type == "rows":
+        return rows
+    elif return_type == "namedtuples":
+        row = row_class(tuple(cols))
+        return [row(*values) for values in rows]
+    elif return_type == "columns":
+        return {col: [values[i] for values in rows]
+                for i, col in enumerate(cols)}
+    return [dict(zip(cols, values)) for values in rows]
+
+
 def run(query, return_type={}):
     ''' Runs a query to a postgres database and returns the response as a list
         of dictionaies with the column headings as keys and the row data as
         values.
 
         Args:
-            db:
-                The connection object to run the query string with.
             query:
                 The query string to be run.
+            return_type:
+                One of return_types, the shape of the response. Anything
+                else falls back to {}.
 
         Returns:
             res_dicts:
                 The response from the db formatted as a list of dicts, one per
-                returned row, with the column headings as the keys.
+                returned row, with the column headings as the keys, unless
+                another return_type was asked for.
     '''
-    if return_type not in [{}, []]:
+    if return_type not in return_types:
         return_type = {}
     with connect() as db:
         res = db.run(str(query))
@@ -41,8 +102,160 @@ def run(query, return_type={}):
         cols = []
     else:
         cols = [col["name"] for col in db.columns]
-    if isinstance(return_type, dict):
-        res = [{cols[i]: item[i] for i in range(len(cols))} for item in res]
-    elif isinstance(return_type, list):
-        res = [cols] + res
-    return res
+    return shape(cols, res, return_type)
+
+
+def stream(query, return_type={}, batch_size: int = 1000):
+    ''' Runs a select through a server side cursor and yields its rows one
+        at a time, fetching batch_size at once, so memory use stays flat
+        however many rows there are.
+
+        Args:
+            query:
+                The select query string (or Query object) to be run.
+            return_type:
+                One of stream_types, the shape of each row. Anything else
+                falls back to {}.
+            batch_size:
+                Rows fetched per round trip.
+    '''
+    if return_type not in stream_types:
+        return_type = {}
+    sql = str(query).rstrip().rstrip(";")
+    with connect() as db:
+        db.run("START TRANSACTION READ ONLY;")
+        try:
+            db.run(f"DECLARE {cursor_name} NO SCROLL CURSOR FOR {sql};")
+            fetch = f"FETCH FORWARD {int(batch_size)} FROM {cursor_name};"
+            while True:
+                rows = db.run(fetch) or []
+                cols = [col["name"] for col in db.columns or []]
+                yield from shape(cols, rows, return_type)
+                if len(rows) < batch_size:
+                    break
+        finally:
+            # Ends the transaction, closing the cursor with it
+            db.run("ROLLBACK;")
+
+
+class SnapshotQueryErr(Exception):
+    pass
+
+
+cast_pattern = re.compile(r"\(([^()]*)\)::(\w+)")
+sqlite_casts = {"int": "INTEGER", "numeric": "REAL", "boolean": "INTEGER"}
+table_pattern = re.compile(r'\b(?:FROM|JOIN)\s+"?(\w+)"?')
+
+
+def cast(match):
+    sqlite_type = sqlite_casts.get(match.group(2), "TEXT")
+    return f"CAST({match.group(1)} AS {sqlite_type})"
+
+
+def translate(query):
+    ''' Rewrites the postgres specific parts of a query built by the query
+        module into their SQLite equivalents, raising SnapshotQueryErr for
+        anything SQLite can't express.
+    '''
+    sql = str(query)
+    for op in ["@>", "<@"]:
+        if op in sql:
+            msg = f'JSON containment ("{op}") is not supported by SQLite '
+            msg += 'snapshots.'
+            raise SnapshotQueryErr(msg)
+    return cast_pattern.sub(cast, sql)
+
+
+# Decoders for the postgres types SQLite stores as text or integers
+snapshot_decoders = {
+    "json": json.loads,
+    "jsonb": json.loads,
+    "boolean": bool,
+    "date": date.fromisoformat,
+    "timestamp without time zone": datetime.fromisoformat,
+    "timestamp with time zone": datetime.fromisoformat
+}
+snapshot_types = {}
+
+
+def snapshot_identity(file_path: str):
+    st = stat(file_path)
+    return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+
+def column_types(db, file_path: str, identity: tuple):
+    ''' Returns the (table, column) to postgres type map recorded in a
+        snapshot's _columns table. It's read once per snapshot file, the
+        cache is keyed by identity, the file's inode, size and mtime, so a
+        swapped in snapshot is read afresh. identity has to be taken before
+        db is opened: taken after, a file swapped in between would have the
+        old file's types cached under its own identity.
+    '''
+    cached = snapshot_types.get(file_path)
+    if cached is None or cached[0] != identity:
+        rows = db.execute(
+            "SELECT table_name, column_name, data_type FROM _columns;"
+        ).fetchall()
+        types = {(table, col): data_type for table, col, data_type in rows}
+        cached = snapshot_types[file_path] = (identity, types)
+    return cached[1]
+
+
+def column_decoder(types: dict, tables: list, col: str):
+    ''' Returns the decoder for a result column, going by its type in the
+        first of the query's tables to have it.
+    '''
+    for table in tables:
+        data_type = types.get((table, col))
+        if data_type:
+            return snapshot_decoders.get(data_type)
+    return None
+
+
+def run_snapshot(query, return_type={}, file_path=None):
+    ''' Runs a read query against a SQLite snapshot written by
+        sqlite_snapshot.export_sqlite, returning the same shapes as run. JSON,
+        boolean, date and timestamp columns are decoded back to the python
+        types run gives.
+
+        Args:
+            query:
+                The query string (or Query object) to be run.
+            return_type:
+                One of return_types, as for run.
+            file_path:
+                The snapshot file, defaults to the SQLITE_SNAPSHOT env var.
+    '''
+    if return_type not in return_types:
+        return_type = {}
+    load_env()
+    file_path = file_path or getenv("SQLITE_SNAPSHOT")
+    uri = f"file:{file_path}?mode=ro"
+    identity = snapshot_identity(file_path)
+    sql = translate(query)
+    with closing(sqlite3.connect(uri, uri=True)) as db:
+        types = column_types(db, file_path, identity)
+        cursor = db.execute(sql)
+        cols = [col[0] for col in cursor.description or []]
+        res = cursor.fetchall()
+    tables = table_pattern.findall(sql)
+    decoders = [column_decoder(types, tables, col) for col in cols]
+    res = [
+        [
+            dec(item) if dec and item is not None else item
+            for dec, item in zip(decoders, row)
+        ]
+        for row in res
+    ]
+    return shape(cols, res, return_type)
+
+
+def read(query, return_type={}):
+    ''' Runs a read only query, served from the SQLite snapshot named by the
+        SQLITE_SNAPSHOT env var when one is configured, otherwise from
+        postgres via run.
+    '''
+    load_env()
+    if getenv("SQLITE_SNAPSHOT"):
+        return run_snapshot(query, return_type)
+    return run(query, return_type)
@@ -0,0 +1,189 @@
+from src.utils.connect import read
+from src.utils.query import Query
+from src.utils.stat_engine import get_engine, stat_names, BadStatParamErr
+import numpy as np
+import re
+
+skill_levels = ["l1", "l2", "l3", "l4", "l5", "l6", "l7", "m1", "m2", "m3"]
+sp_modes = {"Auto Recovery": 0, "Offensive Recovery": 1}
+atk_buff_pattern = re.compile(r"ATK \+(\d+)%")
+# Damage never drops below 5% of ATK however tanky the enemy is
+min_damage = 0.05
+cache_size = 128
+skills_q = Query("skills").select().freeze()
+
+
+def skill_duration(value):
+    try:
+        return max(float(value), 0.0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def atk_buff(description):
+    ''' Estimates a skill's ATK bonus as a fraction from the "ATK +X%"
+        phrases in its description, the only place the schema keeps it.
+    '''
+    matches = atk_buff_pattern.findall(description or "")
+    return sum(int(match) for match in matches) / 100
+
+
+class DpsCalculator:
+    ''' Sustained DPS and skill uptime for every operator/skill pair on the
+        roster, worked out with array operations over the StatEngine's ATK.
+
+        Each skill level's sp_cost, initial_sp, duration and ATK buff are held
+        as [level, pair] arrays, initial_sp setting when the first activation
+        comes in a fight of fixed length. Results are cached by their
+        parameters, the cache goes with the calculator when the engine is
+        rebuilt.
+    '''
+
+    def __init__(self, engine, skills: list):
+        self.engine = engine
+        stored = {skill["skill_id"]: skill for skill in skills}
+        pairs = []
+        for i, op in enumerate(engine.operators):
+            for slot in range(1, 4):
+                skill = stored.get(op.get(f"skill_{slot}_id"))
+                if skill:
+                    pairs.append((i, slot, skill))
+        n = len(pairs)
+        self.op_index = np.array([i for i, _, _ in pairs], dtype=int)
+        self.slots = np.array([slot for _, slot, _ in pairs], dtype=int)
+        self.skill_names = [skill["skill_name"] for _, _, skill in pairs]
+        self.sp_mode = np.array(
+            [sp_modes.get(skill["sp_type"], -1) for _, _, skill in pairs],
+            dtype=int
+        )
+        self.passive = np.array(
+            [skill["activation_type"] == "Passive" for _, _, skill in pairs],
+            dtype=bool
+        )
+        self.sp_cost = np.full((len(skill_levels), n), np.nan)
+        self.initial_sp = np.full((len(skill_levels), n), np.nan)
+        self.duration = np.full((len(skill_levels), n), np.nan)
+        self.buff = np.zeros((len(skill_levels), n))
+        for p, (_, _, skill) in enumerate(pairs):
+            for lv, level in enumerate(skill_levels):
+                data = skill.get(level)
+                if not data:
+                    continue
+                self.sp_cost[lv, p] = data["sp_cost"]
+                self.initial_sp[lv, p] = data["initial_sp"]
+                self.duration[lv, p] = skill_duration(data["skill_duration"])
+                self.buff[lv, p] = atk_buff(data.get("skill_description"))
+        self.cache = {}
+
+    def compute(self, enemy_def: int = 0, enemy_res: int = 0,
+                skill_level: str = "l7", fight_time: float = None,
+                **stat_params):
+        ''' Returns a dict of "dps" and "uptime" arrays, one value per pair,
+            for the skill level against an enemy with the given DEF and RES.
+            stat_params are passed on to StatEngine.compute().
+
+            SP is assumed to come in at 1 a second for auto recovery and 1 an
+            attack for offensive recovery, not at all while the skill is
+            active. Instant skills count as one buffed attack per charge.
+            Healers deal no damage and defensive recovery skills have no
+            uptime. Pairs missing the skill level or elite stage are NaN.
+
+            Without fight_time uptime is the long run share, which initial_sp
+            doesn't change. With it, uptime is the share of a fight that many
+            seconds long, the first activation coming once the SP left over
+            from initial_sp has charged.
+        '''
+        if skill_level not in skill_levels:
+            msg = f'"{skill_level}" is not a skill level, use one of: '
+            msg += ", ".join(skill_levels)
+            raise BadStatParamErr(msg)
+        if fight_time is not None and fight_time <= 0:
+            raise BadStatParamErr("fight_time must be more than 0.")
+        key = (enemy_def, enemy_res, skill_level, fight_time,
+               tuple(sorted(stat_params.items())))
+        if key in self.cache:
+            return self.cache[key]
+        engine = self.engine
+        stats = engine.compute(**stat_params)
+        atk = stats[self.op_index, stat_names.index("ATK")]
+        interval = engine.intervals[self.op_index]
+        attack_type = engine.attack_types[self.op_index]
+        lv = skill_levels.index(skill_level)
+        sp_cost = self.sp_cost[lv]
+        duration = self.duration[lv]
+        sp_rate = np.select(
+            [self.sp_mode == 0, self.sp_mode == 1], [1.0, 1 / interval], 0.0
+        )
+        # Instant skills are active for the one attack they buff
+        active = np.where(duration > 0, duration, interval)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            charge = np.where(sp_rate > 0, sp_cost / sp_rate, np.inf)
+            cycle = active + charge
+            if fight_time is None:
+                uptime = active / cycle
+            else:
+                needed = np.maximum(sp_cost - self.initial_sp[lv], 0)
+                first = np.where(sp_rate > 0, needed / sp_rate, np.inf)
+                left = fight_time - first
+                cycles = np.floor(left / cycle)
+                rest = left - cycles * cycle
+                on = cycles * active + np.minimum(rest, active)
+                uptime = np.where(
+                    np.isfinite(first) & (left > 0),
+                    np.minimum(on / fight_time, 1.0), 0.0
+                )
+        uptime = np.where(self.passive, 1.0, uptime)
+        uptime = np.where(np.isnan(sp_cost), np.nan, uptime)
+
+        def hit(power):
+            arts = power * (1 - min(max(enemy_res, 0), 100) / 100)
+            physical = power - enemy_def
+            damage = np.where(attack_type == "Arts", arts, physical)
+            damage = np.maximum(damage, power * min_damage)
+            return np.where(attack_type == "Healing", 0.0, damage)
+
+        plain = hit(atk)
+        buffed = hit(atk * (1 + self.buff[lv]))
+        dps = ((1 - uptime) * plain + uptime * buffed) / interval
+        res = {"dps": dps, "uptime": uptime}
+        if len(self.cache) >= cache_size:
+            self.cache.pop(next(iter(self.cache)))
+        self.cache[key] = res
+        return res
+
+    def rank(self, class_name: str = None, limit: int = 20, **params):
+        ''' Returns the operator/skill pairs with the highest sustained DPS
+            under the compute() params, optionally limited to a class.
+        '''
+        if limit < 1:
+            raise BadStatParamErr("limit must be 1 or more.")
+        res = self.compute(**params)
+        dps = res["dps"]
+        mask = ~np.isnan(dps)
+        if class_name:
+            classes = self.engine.class_names[self.op_index]
+            mask &= np.char.lower(classes) == class_name.lower()
+        found = np.flatnonzero(mask)
+        order = found[np.argsort(-dps[found], kind="stable")][:limit]
+        return [
+            {
+                "operator_name": str(self.engine.names[self.op_index[p]]),
+                "skill_name": self.skill_names[p],
+                "skill_slot": int(self.slots[p]),
+                "dps": round(float(dps[p]), 1),
+                "uptime": round(float(res["uptime"][p]), 3)
+            }
+            for p in order
+        ]
+
+
+calculator = None
+
+
+def get_calculator():
+    ''' Returns the cached calculator, rebuilt along with the stat engine. '''
+    global calculator
+    engine = get_engine()
+    if calculator is None or calculator.engine is not engine:
+        calculator = DpsCalculator(engine, read(skills_q))
+    return calculator
@@ -1,4 +1,6 @@
 from pg8000.native import identifier, literal
+from functools import lru_cache
+import orjson
 import json
 
 
@@ -6,29 +8,75 @@ class MismatchKeysErr(Exception):
     pass
 
 
+def dumps(item):
+    ''' JSON encodes item with orjson, compact and UTF-8, falling back to
+        json.dumps for anything orjson refuses such as ints over 64 bits.
+    '''
+    try:
+        return orjson.dumps(item, option=orjson.OPT_NON_STR_KEYS).decode()
+    except orjson.JSONEncodeError:
+        return json.dumps(item)
+
+
 def j_d(item):
-    ''' Takes an item and returns the json.dumps string version if a dict,
+    ''' Takes an item and returns the JSON string version if a dict,
         otherwise does nothing.
     '''
     if isinstance(item, dict):
-        return json.dumps(item)
+        return dumps(item)
     else:
         return item
 
 
+@lru_cache(maxsize=4096)
+def idf_str(data):
+    if data == "*":
+        return data
+    elif isinstance(data, str) and data[0] == '"' and data[-1] == '"':
+        return identifier(data[1:-1])
+    else:
+        return identifier(data)
+
+
 def idf(data):
     ''' Takes an item and applies the pg8000 identifier function, for lists
         aplies self recursively so that any sublists also have their
         contents formatted, returning the same data type that was passed.
+        Column and table names repeat constantly, so single names are cached.
     '''
     if isinstance(data, list):
         return [idf(item) for item in data]
-    elif data == "*":
-        return data
-    elif isinstance(data, str) and data[0] == '"' and data[-1] == '"':
-        return identifier(data[1:-1])
-    else:
-        return identifier(data)
+    return idf_str(data)
+
+
+def quote(text: str):
+    return "'" + text.replace("'", "''") + "'"
+
+
+def lit_str(data: str):
+    # Strips every layer of surrounding quotes as lit always has, the length
+    # check stops at an empty string and leaves a lone quote as it is
+    while len(data) > 1 and data[0] == "'" and data[-1] == "'":
+        data = data[1:-1]
+    return quote(data.replace("''", "'"))
+
+
+def lit_list(data: list):
+    return [fast_lit.get(type(item), lit)(item) for item in data]
+
+
+# Exact type to formatter, checked before lit's general case. Each gives
+# the same result as pg8000's literal, without its chain of isinstance
+# checks for every value in a bulk insert.
+fast_lit = {
+    str: lit_str,
+    int: str,
+    float: str,
+    bool: lambda data: "TRUE" if data else "FALSE",
+    type(None): lambda data: "NULL",
+    dict: lambda data: quote(dumps(data)),
+    list: lit_list
+}
 
 
 def lit(data):
@@ -36,12 +84,35 @@ def lit(data):
         aplies self recursively so that any sublists also have their
         contents formatted, returning the same data type that was passed.
         Uses j_d to process dicts into strings.
+
+        Plain str, int, float, bool, None, dict and list values go through
+        fast_lit, anything else, subclasses included, through literal.
     '''
-    if isinstance(data, list):
-        return [lit(item) for item in data]
-    elif isinstance(data, str) and data[0] == "'" and data[-1] == "'":
-        return lit(data[1:-1])
+    fast = fast_lit.get(type(data))
+    if fast is not None:
+        return fast(data)
+    elif isinstance(data, list):
+        return lit_list(data)
     elif isinstance(data, str):
-        return literal(data.replace("''", "'"))
+        return lit_str(data)
     else:
         return literal(j_d(data))
+
+
+def jp(col, path, cast=None, as_text=True):
+    ''' Takes a column name and a list of keys/indexes and returns a postgres
+        JSON path expression walking that column. The last step uses ->> so
+        the result is text unless as_text is False, and if cast is given the
+        whole expression is cast to that type, matching the form used by the
+        expression indexes in src/db.
+    '''
+    expr = idf(col)
+    if not path:
+        return expr
+    steps = [lit(step) for step in path]
+    for step in steps[:-1]:
+        expr += f"->{step}"
+    expr += f"{'->>' if as_text else '->'}{steps[-1]}"
+    if cast:
+        expr = f"({expr})::{cast}"
+    return expr
@@ -0,0 +1,62 @@
+from src.utils.connect import load_env
+from src.utils.changes import latest_revision
+from os import getenv, stat
+from time import monotonic
+
+# Seconds a data_version() answer is reused for, so the indexes can check on
+# every request without a query or stat call each time
+check_interval = 2.0
+checked = None
+
+
+def snapshot_version(file_path: str):
+    ''' Identifies the file currently at file_path by inode, size and mtime,
+        or None if there isn't one. Swapping a new snapshot in changes it.
+    '''
+    try:
+        st = stat(file_path)
+    except FileNotFoundError:
+        return None
+    return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+
+def data_version(max_age: float = check_interval):
+    ''' Returns a value that changes whenever the data read() serves does:
+        the SQLite snapshot's identity when reads come from one, otherwise
+        the newest change log revision. Ingest runs in another process, so
+        this is how an API worker finds out about it.
+    '''
+    global checked
+    now = monotonic()
+    if checked is None or now - checked[0] > max_age:
+        load_env()
+        file_path = getenv("SQLITE_SNAPSHOT")
+        if file_path:
+            version = snapshot_version(file_path)
+        else:
+            version = latest_revision()
+        checked = (now, version)
+    return checked[1]
+
+
+class Rebuilt:
+    ''' In memory values built from the db, such as the recruit, range and
+        stat indexes, each kept until data_version() moves on from the one
+        it was built at.
+    '''
+
+    def __init__(self):
+        self.values = {}
+
+    def get(self, key, build):
+        ''' Returns the value for key, calling build() for a new one when
+            there isn't one yet or the data has changed since.
+        '''
+        version = data_version()
+        entry = self.values.get(key)
+        if entry is None or entry[0] != version:
+            entry = self.values[key] = (version, build())
+        return entry[1]
+
+    def clear(self):
+        self.values = {}
@@ -1,60 +1,118 @@
-import requests
-from bs4 import BeautifulSoup
-from src.utils.scraper import scrape
+from src.utils.scraper import (
+    scrape,
+    fetch,
+    fingerprint,
+    operator_list,
+    skip_list
+)
 from src.utils.insert import insert
 import time
-from src.utils.formatting import select_query
+from src.utils.query import Query
 from src.utils.connect import run
+from src.utils.journal import CrawlJournal
+from src.utils.snapshots import export_snapshots
+import sys
 
-skip_list = [
-    "tulip",
-    "touch",
-    "pith",
-    "stormeye",
-    "sharp",
-    "reserve-operator-logistics",
-    "reserve-operator-caster",
-    "reserve-operator-sniper",
-    "reserve-operator-melee",
-]
-
-
-def full_scrape(new_only=True):
-    url = "https://gamepress.gg/arknights/tools/"
-    url += "interactive-operator-list#tags=null##stats"
-    res = requests.get(url)
-    soup = BeautifulSoup(res.text, 'html.parser')
-    all_in = True
-    for item in soup.find_all("tr", class_="operators-row"):
-        title = item.find("a", class_="operator-title-actual")
-        name = title["href"].split("/")[-1]
-        print(name)
+
+def known_operators():
+    ''' Loads the url name and content hash of every stored operator in one
+        query, returned as a dict of url name to hash.
+    '''
+    q = Query("operators").select("gamepress_url_name, content_hash")
+    return {row["gamepress_url_name"]: row["content_hash"] for row in run(q)}
+
+
+def crawl_operator(name, known, new_only, journal):
+    ''' Fetches, parses and inserts a single operator, checkpointing each
+        step in the journal. One an earlier run left fetched or parsed is
+        picked up from the page saved then.
+
+        With new_only a known operator is skipped before anything else, so
+        the fingerprint check only comes into play on refresh crawls. There
+        it saves parsing the page and reading back every stored row that
+        insert() would otherwise compare column by column.
+    '''
+    if new_only and name in known:
+        print("in db")
+        journal.mark(name, "skipped")
+        return False
+    html = journal.saved_page(name)
+    if html is None:
+        journal.mark(name, "pending")
+        time.sleep(5)
+        html = fetch(name)[1]
+        journal.save_page(name, html)
+        journal.mark(name, "fetched")
+    else:
+        print(f"{journal.state(name)} in earlier run, using saved page")
+    content_hash = fingerprint(html)
+    if known.get(name) == content_hash:
+        print("unchanged")
+        journal.mark(name, "skipped")
+        return False
+    operator_info, *data = scrape(name, html)
+    operator_info["content_hash"] = content_hash
+    journal.mark(name, "parsed")
+    insert(operator_info, *data)
+    journal.mark(name, "inserted")
+    return True
+
+
+def full_scrape(new_only=True, resume=False, journal_path=None,
+                max_attempts=3):
+    ''' Crawls the gamepress operator list and inserts every EN operator.
+
+        With new_only, operators already in the db are skipped without being
+        fetched. Otherwise every page is fetched but only parsed and inserted
+        when its fingerprint differs from the one stored with the operator.
+
+        Progress is kept in a CrawlJournal. With resume, operators finished
+        by an earlier run are skipped, otherwise the journal starts afresh.
+        An operator that raises is marked failed and the crawl moves on,
+        failures are retried at the end of the run and on resume until they
+        have failed max_attempts times.
+    '''
+    journal = CrawlJournal(journal_path or "crawl-journal.json", max_attempts)
+    if not resume:
+        journal.reset()
+    known = known_operators()
+    names = []
+    for name, server in operator_list():
         if name in skip_list:
+            print(name)
             print("IS op, skipping")
             print("")
-            continue
-        if item["data-availserver"] == "na":
-            if new_only:
-                query = select_query(
-                    "operators",
-                    filters={"gamepress_url_name": name}
-                )
-                db_res = run(query)
-            else:
-                db_res == []
-            if db_res == []:
-                all_in = False
-                time.sleep(5)
-                data = scrape(name)
-                insert(*data)
-            else:
-                print("in db")
-        else:
+        elif server != "na":
+            print(name)
             print("cn op, skipping")
-        print("")
+            print("")
+        else:
+            names.append(name)
+    all_in = True
+    while names:
+        for name in names:
+            print(name)
+            if not journal.should_run(name):
+                print(f"{journal.state(name)} in earlier run")
+            else:
+                try:
+                    if crawl_operator(name, known, new_only, journal):
+                        all_in = False
+                except Exception as e:
+                    print(f"failed: {e!r}")
+                    journal.mark(name, "failed", repr(e))
+            print("")
+        names = journal.retryable()
     if all_in:
         print("all in db already")
+    else:
+        export_snapshots()
+    print(journal.report())
+    return journal.summary()
 
 
 if __name__ == "__main__":
-    full_scrape()
+    full_scrape(
+        new_only="--refresh" not in sys.argv,
+        resume="--resume" in sys.argv
+    )
@@ -0,0 +1,116 @@
+from src.utils.changes import changes_since, latest_revision
+from src.utils.debugger import Debug
+from asyncio import Queue, QueueEmpty, create_task, sleep, to_thread
+
+log = Debug()
+log.off()
+
+event_names = {"created": "added", "updated": "updated"}
+
+
+class Subscription:
+    ''' One client's view of the hub: the topics it wants, None for all of
+        them, and a bounded queue of events waiting to be sent.
+
+        A client that can't keep up loses its oldest events rather than
+        holding up the hub, dropped counts them so it can be told to resync
+        from /api/changes.
+    '''
+
+    def __init__(self, topics=None, max_queue: int = 100):
+        self.topics = set(topics) if topics else None
+        self.queue = Queue(maxsize=max_queue)
+        self.dropped = 0
+
+    def wants(self, topic: str):
+        return self.topics is None or topic in self.topics
+
+    def offer(self, event: dict):
+        if self.queue.full():
+            try:
+                self.queue.get_nowait()
+                self.dropped += 1
+            except QueueEmpty:
+                pass
+        self.queue.put_nowait(event)
+
+    async def next(self):
+        ''' Waits for the next event. After any were dropped, returns a
+            "lagged" event first with how many were lost.
+        '''
+        if self.dropped:
+            lagged = {"event": "lagged", "topic": None,
+                      "dropped": self.dropped}
+            self.dropped = 0
+            return lagged
+        return await self.queue.get()
+
+
+class Hub:
+    ''' In process pub/sub for ingest events.
+
+        Ingest runs in its own process, so the hub follows the change log
+        rather than being called by it: a background task polls for new
+        revisions every interval seconds and publishes each one under its
+        entity as the topic, as e.g. an "operator-added" event. The task is
+        started by the first subscriber and stops once the last one leaves,
+        changes made while no one was subscribed are never sent.
+    '''
+
+    def __init__(self, interval: float = 2.0, max_queue: int = 100):
+        self.interval = interval
+        self.max_queue = max_queue
+        self.subscriptions = []
+        self.revision = None
+        self.task = None
+
+    def subscribe(self, topics=None):
+        sub = Subscription(topics, self.max_queue)
+        self.subscriptions.append(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscription):
+        if sub in self.subscriptions:
+            self.subscriptions.remove(sub)
+
+    def publish(self, topic: str, event: dict):
+        for sub in self.subscriptions:
+            if sub.wants(topic):
+                sub.offer(event)
+
+    def publish_change(self, change: dict):
+        name = f'{change["entity"]}-{event_names[change["action"]]}'
+        self.publish(change["entity"], {
+            "event": name,
+            "topic": change["entity"],
+            "revision": change["revision"],
+            "entity_id": change["entity_id"],
+            "columns": sorted(change["data"])
+        })
+        self.revision = change["revision"]
+
+    async def poll(self):
+        ''' Publishes every change logged since the last poll. '''
+        if self.revision is None:
+            self.revision = await to_thread(latest_revision)
+        changes = await to_thread(changes_since, self.revision)
+        for change in changes:
+            self.publish_change(change)
+        return len(changes)
+
+    async def run(self):
+        while self.subscriptions:
+            try:
+                await self.poll()
+            except Exception as e:
+                # Keep following the log through a db restart
+                log.warn(f"Hub poll failed: {e}")
+            await sleep(self.interval)
+        # With no one listening the log isn't followed, so the next
+        # subscriber starts from the head rather than the backlog since
+        self.revision = None
+        self.task = None
+
+    def ensure_polling(self):
+        if self.task is None:
+            self.task = create_task(self.run())
@@ -1,8 +1,18 @@
 from pg8000.exceptions import DatabaseError
-from copy import deepcopy
+from datetime import date
 from src.utils.connect import connect, run
 from src.utils.query import Query
 from src.utils.debugger import Debug
+from src.utils.records import as_row
+from src.utils.changes import record_change
+from src.utils.search import (
+    index_documents,
+    operator_documents,
+    archetype_documents,
+    skill_documents,
+    module_documents
+)
+import re
 
 log = Debug()
 log.off()
@@ -30,9 +40,9 @@ def merge(old, new):
     merged = {}
     for key in set(list(new.keys())+list(old.keys())):
         if old.get(key) == None:
-            merged[key] = new[key]
+            merged[key] = new.get(key)
         if new.get(key) == None:
-            merged[key] = old[key]
+            merged[key] = old.get(key)
         elif isinstance(new.get(key), dict) and isinstance(old.get(key), dict):
             merged[key] = merge(old[key], new[key])
         elif old.get(key) != new.get(key):
@@ -49,21 +59,77 @@ def diff(before, after):
     return changes
 
 
+date_pattern = re.compile(r"^(\d{4})[/-](\d{2})[/-](\d{2})$")
+
+
+def json_form(value):
+    ''' Turns tuples into lists all the way through dicts and lists, as
+        they come back from a JSON column.
+    '''
+    if isinstance(value, dict):
+        return {key: json_form(value[key]) for key in value}
+    elif isinstance(value, (list, tuple)):
+        return [json_form(item) for item in value]
+    return value
+
+
+def normalise(value):
+    ''' Puts a fresh column value in the form the db hands it back in, so
+        equal data compares equal. A "YYYY/MM/DD" string becomes a date, as
+        it would from a date column, anything else goes through json_form.
+        Dates inside JSON are left as strings, as the db gives them back.
+    '''
+    if isinstance(value, str):
+        match = date_pattern.match(value)
+        if match:
+            return date(*[int(part) for part in match.groups()])
+    return json_form(value)
+
+
+def row_changes(stored, fresh):
+    ''' Returns the minimal dict of columns to write to turn a stored row
+        into the fresh data merged over it.
+
+        Keys are lowercased the way postgres folds unquoted column names and
+        values normalised before merging, JSON columns are merged and
+        compared structurally so only columns whose contents differ come
+        back. Columns the fresh data doesn't have, or has as None, are kept.
+
+        The same goes for keys nested in JSON columns: merge keeps any the
+        stored value has and the fresh one lacks, so a field dropped
+        upstream stays in the db until the row is replaced outright.
+    '''
+    fresh = {key.lower(): normalise(fresh[key]) for key in fresh}
+    merged = merge(stored, fresh)
+    return diff(stored, merged)
+
+
+def update_changed(table: str, id_col: str, stored: dict, fresh: dict):
+    ''' Runs an UPDATE of only the changed columns of a stored row and logs
+        them, or does nothing at all if the fresh data matches it.
+    '''
+    changes = row_changes(stored, fresh)
+    if changes != {}:
+        q = Query(table).update(changes)
+        q.where({id_col: stored[id_col]})
+        run(q())
+        record_change(table[:-1], stored[id_col], "updated", changes)
+    return changes
+
+
 def insert_archetype(stored_arch_info, fresh_arch_info: dict):
     if stored_arch_info == []:
         query = Query("archetypes").insert_d(fresh_arch_info)
         query.returning("archetype_id")
         res = run(query())[0]
         a_id = res["archetype_id"]
+        record_change("archetype", a_id, "created", fresh_arch_info)
     else:
         stored_arch_info = stored_arch_info[0]
         a_id = stored_arch_info["archetype_id"]
-        merged = merge(stored_arch_info, fresh_arch_info)
-        changes = diff(stored_arch_info, merged)
-        if changes != {}:
-            q = Query("archetypes").update(changes)
-            q.where({"archetype_id": a_id})
-            run(q())
+        update_changed(
+            "archetypes", "archetype_id", stored_arch_info, fresh_arch_info
+        )
     return a_id
 
 
@@ -72,9 +138,12 @@ def insert_skill(stored_skill_info, fresh_skill_info):
         q = Query("skills").insert_d(fresh_skill_info).returning("skill_id")
         res = run(q())[0]
         s_id = res["skill_id"]
+        record_change("skill", s_id, "created", fresh_skill_info)
     else:
         stored_skill_info = stored_skill_info[0]
         s_id = stored_skill_info["skill_id"]
+        update_changed("skills", "skill_id", stored_skill_info,
+                       fresh_skill_info)
     return s_id
 
 
@@ -83,19 +152,26 @@ def insert_module(stored_mod_info, fresh_mod_info):
         q = Query("modules").insert_d(fresh_mod_info).returning("module_id")
         res = run(q())[0]
         m_id = res["module_id"]
+        record_change("module", m_id, "created", fresh_mod_info)
     else:
         stored_mod_info = stored_mod_info[0]
         m_id = stored_mod_info["module_id"]
+        update_changed("modules", "module_id", stored_mod_info,
+                       fresh_mod_info)
     return m_id
 
 
 def add_ids_to_op(fresh_op_info, a_id: int, s_ids: list, m_ids: list):
-    id_fresh_op_info = deepcopy(fresh_op_info)
-    id_fresh_op_info["archetype_id"] = a_id
+    ''' Returns the operator's db row with its foreign keys filled in. The
+        row is a new top level dict, nested values are shared with
+        fresh_op_info rather than copied.
+    '''
+    ids = {"archetype_id": a_id}
     for i in range(len(m_ids)):
-        id_fresh_op_info[f"module_{i+1}_id"] = m_ids[i]
+        ids[f"module_{i+1}_id"] = m_ids[i]
     for i in range(len(s_ids)):
-        id_fresh_op_info[f"skill_{i+1}_id"] = s_ids[i]
+        ids[f"skill_{i+1}_id"] = s_ids[i]
+    id_fresh_op_info = as_row(fresh_op_info, **ids)
     if id_fresh_op_info.get("alter"):
         id_fresh_op_info["alter"] = None
     return id_fresh_op_info
@@ -107,25 +183,39 @@ def insert_operator(stored_op_info, id_fresh_op_info):
         q.returning("operator_id")
         res = run(q())[0]
         o_id = res["operator_id"]
+        record_change("operator", o_id, "created", id_fresh_op_info)
     else:
         stored_op_info = stored_op_info[0]
         o_id = stored_op_info["operator_id"]
+        update_changed("operators", "operator_id", stored_op_info,
+                       id_fresh_op_info)
     return o_id
 
 
 def alter_mod(alter_name, o_id):
+    ''' Links an operator and their alter to each other. Both rows are read
+        first and only links that differ from the stored ones are written
+        and logged, so re-ingesting a pair changes nothing.
+    '''
     if alter_name:
-        q = Query("operators").select("operator_id")
+        q = Query("operators").select("operator_id, operator_name, alter")
         q.where({"operator_name": alter_name})
+        q.where({"operator_id": o_id})
         res = run(q())
-        if res != []:
-            alter_id = res[0]["operator_id"]
-            o_q = Query("operators").update({"alter": alter_id})
-            o_q.where({"operator_id": o_id})
-            a_q = Query("operators").update({"alter": o_id})
-            a_q.where({"operator_id": alter_id})
-            run(o_q)
-            run(a_q)
+        alters = [row for row in res if row["operator_name"] == alter_name]
+        if alters != []:
+            stored_alter = alters[0]
+            alter_id = stored_alter["operator_id"]
+            stored_op = next(
+                (row for row in res if row["operator_id"] == o_id),
+                {"operator_id": o_id}
+            )
+            update_changed(
+                "operators", "operator_id", stored_op, {"alter": alter_id}
+            )
+            update_changed(
+                "operators", "operator_id", stored_alter, {"alter": o_id}
+            )
 
 
 def insert_tags(stored_tag_ids, fresh_tags):
@@ -135,6 +225,7 @@ def insert_tags(stored_tag_ids, fresh_tags):
             q = Query("tags").insert_d({"tag_name": tag}).returning("tag_id")
             res = run(q())[0]
             tag_ids.append(res["tag_id"])
+            record_change("tag", res["tag_id"], "created", {"tag_name": tag})
         else:
             tag_ids.append(stored_tag_ids[tag])
     return tag_ids
@@ -147,6 +238,8 @@ def insert_operators_tags(stored_op_tag_ids, op_id, tag_ids):
             {"tag_id": tag, "operator_id": op_id}
         )
         run(q())
+    if new_tags != []:
+        record_change("operator", op_id, "updated", {"tag_ids": new_tags})
 
 
 def insert(operator_info, archetype_info, skill_info, module_info, tag_info):
@@ -158,27 +251,42 @@ def insert(operator_info, archetype_info, skill_info, module_info, tag_info):
     a_q = Query("archetypes").select()
     a_q.where({"archetype_name": archetype_info["archetype_name"]})
     stored_a = run(a_q())
-    a_id = insert_archetype(stored_a, archetype_info)
+    a_id = insert_archetype(stored_a, as_row(archetype_info))
+    index_documents(
+        "archetype", a_id, archetype_info["archetype_name"],
+        archetype_documents(archetype_info)
+    )
 
     s_ids = []
     for skill in skill_info:
         s_q = Query("skills").select()
         s_q.where({"skill_name": skill["skill_name"]})
         stored_s = run(s_q())
-        s_ids.append(insert_skill(stored_s, skill))
+        s_ids.append(insert_skill(stored_s, as_row(skill)))
+        index_documents(
+            "skill", s_ids[-1], skill["skill_name"], skill_documents(skill)
+        )
 
     m_ids = []
     for module in module_info:
         m_q = Query("modules").select()
         m_q.where({"module_name": module["module_name"]})
         stored_m = run(m_q())
-        m_ids.append(insert_module(stored_m, module))
+        m_ids.append(insert_module(stored_m, as_row(module)))
+        index_documents(
+            "module", m_ids[-1], module["module_name"],
+            module_documents(module)
+        )
 
     o_q = Query("operators").select()
     o_q.where({"operator_name": operator_info["operator_name"]})
     stored_o = run(o_q())
     modded_op_info = add_ids_to_op(operator_info, a_id, s_ids, m_ids)
     o_id = insert_operator(stored_o, modded_op_info)
+    index_documents(
+        "operator", o_id, operator_info["operator_name"],
+        operator_documents(operator_info)
+    )
     alter_mod(operator_info["alter"], o_id)
 
     t_q = Query("tags").select()
@@ -0,0 +1,128 @@
+from os import makedirs, path, remove, replace
+import shutil
+import json
+
+states = ["pending", "fetched", "parsed", "inserted", "skipped", "failed"]
+
+
+class UnknownStateErr(Exception):
+    pass
+
+
+class CrawlJournal:
+    ''' Per-operator record of a crawl's progress, written to disk on every
+        state change so an interrupted crawl can carry on where it stopped.
+
+        Each entry holds the operator's state, the number of failed attempts
+        and the last error message. Operators that reached "inserted" or
+        "skipped" are done, failed ones are retried until max_attempts.
+
+        Fetched pages are kept in a directory beside the journal until the
+        operator is done, so one left "fetched" or "parsed" carries on from
+        its saved page rather than fetching it again. A failed operator's
+        page is dropped so its retry fetches a fresh one.
+    '''
+
+    def __init__(self, file_path: str = "crawl-journal.json",
+                 max_attempts: int = 3):
+        self.file_path = file_path
+        self.pages_dir = file_path + ".pages"
+        self.max_attempts = max_attempts
+        self.entries = {}
+        if path.exists(file_path):
+            with open(file_path) as f:
+                self.entries = json.load(f)
+
+    def save(self):
+        tmp_path = self.file_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.entries, f, indent=2)
+        replace(tmp_path, self.file_path)
+
+    def reset(self):
+        self.entries = {}
+        shutil.rmtree(self.pages_dir, ignore_errors=True)
+        self.save()
+        return self
+
+    def page_path(self, name: str):
+        return path.join(self.pages_dir, name + ".html")
+
+    def save_page(self, name: str, html: str):
+        makedirs(self.pages_dir, exist_ok=True)
+        tmp_path = self.page_path(name) + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(html)
+        replace(tmp_path, self.page_path(name))
+
+    def saved_page(self, name: str):
+        ''' Returns the page saved for an operator left "fetched" or
+            "parsed", or None if it has to be fetched.
+        '''
+        if self.state(name) not in ["fetched", "parsed"]:
+            return None
+        try:
+            with open(self.page_path(name), encoding="utf-8") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def mark(self, name: str, state: str, error: str = None):
+        if state not in states:
+            msg = f'"{state}" is not a journal state, use one of: '
+            msg += ", ".join(states)
+            raise UnknownStateErr(msg)
+        entry = self.entries.setdefault(
+            name, {"state": "pending", "attempts": 0, "error": None}
+        )
+        entry["state"] = state
+        if state == "failed":
+            entry["attempts"] += 1
+            entry["error"] = error
+        if state in ["inserted", "skipped", "failed"]:
+            try:
+                remove(self.page_path(name))
+            except FileNotFoundError:
+                pass
+        self.save()
+        return self
+
+    def state(self, name: str):
+        return self.entries.get(name, {}).get("state")
+
+    def should_run(self, name: str):
+        entry = self.entries.get(name)
+        if not entry:
+            return True
+        if entry["state"] in ["inserted", "skipped"]:
+            return False
+        if entry["state"] == "failed":
+            return entry["attempts"] < self.max_attempts
+        return True
+
+    def retryable(self):
+        return [
+            name for name in self.entries
+            if self.state(name) == "failed" and self.should_run(name)
+        ]
+
+    def summary(self):
+        ''' Returns a dict of the number of operators in each state, plus a
+            "errors" key mapping each failed operator to its last error.
+        '''
+        counts = {state: 0 for state in states}
+        for entry in self.entries.values():
+            counts[entry["state"]] += 1
+        counts["errors"] = {
+            name: self.entries[name]["error"] for name in self.entries
+            if self.entries[name]["state"] == "failed"
+        }
+        return counts
+
+    def report(self):
+        summary = self.summary()
+        lines = [f"{state}: {summary[state]}" for state in states]
+        for name, error in summary["errors"].items():
+            attempts = self.entries[name]["attempts"]
+            lines.append(f"  {name} ({attempts} attempts): {error}")
+        return "\n".join(lines)
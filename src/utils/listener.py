@@ -0,0 +1,73 @@
+from src.utils.connect import connect
+from src.utils.changes import channel
+from src.utils.debugger import Debug
+from threading import Event, Thread
+import json
+
+log = Debug()
+log.off()
+
+
+class CacheListener:
+    ''' Background thread that LISTENs on the change channel and evicts the
+        rows each notification names from a ResponseCache.
+
+        pg8000 only reads notifications while it's handling a query, so the
+        thread runs a trivial one every interval seconds and drains what
+        arrived. A lost connection is retried after the same wait, clearing
+        the cache first as notifications sent meanwhile are gone.
+    '''
+
+    def __init__(self, cache, interval: float = 1.0):
+        self.cache = cache
+        self.interval = interval
+        self.stopped = Event()
+        self.thread = None
+
+    def handle(self, payload: str):
+        try:
+            change = json.loads(payload)
+            return self.cache.evict(change["table"], change.get("ids"))
+        except (ValueError, KeyError, TypeError):
+            log.warn(f"Ignoring bad change notification: {payload}")
+            return 0
+
+    def drain(self, db):
+        while db.notifications:
+            _, _, payload = db.notifications.popleft()
+            self.handle(payload)
+
+    def listen(self):
+        while not self.stopped.is_set():
+            try:
+                db = connect()
+            except Exception as e:
+                log.warn(f"Cache listener can't connect: {e}")
+                self.stopped.wait(self.interval)
+                continue
+            try:
+                db.run(f"LISTEN {channel};")
+                self.cache.clear()
+                while not self.stopped.is_set():
+                    db.run("SELECT 1;")
+                    self.drain(db)
+                    self.stopped.wait(self.interval)
+            except Exception as e:
+                log.warn(f"Cache listener lost its connection: {e}")
+            finally:
+                try:
+                    db.close()
+                except Exception:
+                    pass
+
+    def start(self):
+        if self.thread is None:
+            self.thread = Thread(target=self.listen, daemon=True)
+            self.thread.start()
+        return self
+
+    def stop(self):
+        self.stopped.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
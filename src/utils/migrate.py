@@ -0,0 +1,117 @@
+from os import listdir, path
+from src.utils.connect import connect
+from src.utils.query import Query
+import re
+import sys
+
+migrations_dir = path.join(
+    path.dirname(path.dirname(path.abspath(__file__))), "db", "migrations"
+)
+
+migration_file = re.compile(r"^(\d+)-(.+)\.sql$")
+
+tracking_table = '''CREATE TABLE IF NOT EXISTS schema_migrations (
+    version INT PRIMARY KEY,
+    name VARCHAR NOT NULL,
+    applied_at TIMESTAMP NOT NULL DEFAULT NOW()
+);'''
+
+
+class DuplicateMigrationErr(Exception):
+    pass
+
+
+def load_migrations(directory: str = migrations_dir):
+    ''' Reads every "<version>-<name>.sql" file in the directory and returns
+        them as a list of dicts with version, name and sql keys, ordered by
+        version. Files not matching the pattern are ignored.
+
+        Raises:
+            DuplicateMigrationErr:
+                If two files share the same version number.
+    '''
+    migrations = {}
+    for file_name in listdir(directory):
+        match = migration_file.match(file_name)
+        if not match:
+            continue
+        version = int(match.group(1))
+        if version in migrations:
+            msg = f'Migrations "{migrations[version]["name"]}" and '
+            msg += f'"{match.group(2)}" share version {version}.'
+            raise DuplicateMigrationErr(msg)
+        with open(path.join(directory, file_name)) as f:
+            sql = f.read()
+        migrations[version] = {
+            "version": version,
+            "name": match.group(2),
+            "sql": sql
+        }
+    return [migrations[version] for version in sorted(migrations)]
+
+
+def applied_versions(db):
+    ''' Creates the tracking table if needed and returns the set of migration
+        versions already recorded in it.
+    '''
+    db.run(tracking_table)
+    rows = db.run(str(Query("schema_migrations").select("version")))
+    return {row[0] for row in rows or []}
+
+
+def apply_migration(db, migration: dict):
+    ''' Runs a single migration and records it in the tracking table inside
+        one transaction, so a failing migration leaves no trace behind.
+    '''
+    record = Query("schema_migrations").insert_d({
+        "version": migration["version"],
+        "name": migration["name"]
+    })
+    db.run("START TRANSACTION;")
+    try:
+        db.run(migration["sql"])
+        db.run(str(record))
+        db.run("COMMIT;")
+    except Exception:
+        db.run("ROLLBACK;")
+        raise
+
+
+def migrate(dry_run: bool = False, target: int = None,
+            directory: str = migrations_dir):
+    ''' Applies, in version order, every migration that isn't yet recorded
+        in the schema_migrations table of the database.
+
+        Args:
+            dry_run:
+                List the pending migrations without running them.
+            target:
+                Highest version to apply, defaults to all of them.
+            directory:
+                Where to read the migration files from.
+
+        Returns:
+            pending:
+                The migrations that were (or with dry_run, would be) applied.
+    '''
+    migrations = load_migrations(directory)
+    with connect() as db:
+        done = applied_versions(db)
+        pending = [
+            m for m in migrations if m["version"] not in done
+            and (target is None or m["version"] <= target)
+        ]
+        for migration in pending:
+            label = f'{migration["version"]:04d}-{migration["name"]}'
+            if dry_run:
+                print(f"pending: {label}")
+                continue
+            print(f"applying: {label}")
+            apply_migration(db, migration)
+    if not pending:
+        print("database is up to date")
+    return pending
+
+
+if __name__ == "__main__":
+    migrate(dry_run="--dry-run" in sys.argv)
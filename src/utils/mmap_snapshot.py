@@ -0,0 +1,184 @@
+from src.utils.connect import stream
+from src.utils.query import Query
+from os import fsync, path, replace, stat
+from time import monotonic, time_ns
+import mmap
+import orjson
+import struct
+
+magic = b"AKSNAP02"
+# magic, entry count, generation, index offset
+header = struct.Struct("<8sIQQ")
+# kind, id, doc offset, doc length, name offset, name length
+entry = struct.Struct("<BIQIQH")
+
+kinds = {"operators": 0, "skills": 1, "modules": 2, "archetypes": 3}
+
+name_cols = {
+    "operators": ["operator_name", "gamepress_url_name"],
+    "skills": ["skill_name"],
+    "modules": ["module_name"],
+    "archetypes": ["archetype_name"]
+}
+
+
+class BadSnapshotErr(Exception):
+    pass
+
+
+def next_generation(file_path: str):
+    ''' Returns a generation for a new snapshot at file_path, newer than the
+        current one's. A clock reading, so it stays unique even when there's
+        no previous file to count on from.
+    '''
+    previous = 0
+    try:
+        with open(file_path, "rb") as f:
+            found, _, previous, _ = header.unpack(f.read(header.size))
+        if found != magic:
+            previous = 0
+    except (FileNotFoundError, struct.error):
+        pass
+    return max(time_ns(), previous + 1)
+
+
+def write_snapshot(file_path: str, documents: dict):
+    ''' Writes documents, a dict of kind to a list of row dicts, to a
+        snapshot file.
+
+        The file is a header, a blob of JSON documents, a blob of names and
+        a fixed width index with one entry per id/name pair. Each row is
+        serialised once and every name it can be looked up by points at the
+        same bytes. Documents go straight to disk as they're serialised,
+        only the index and names are held until the end, when the header is
+        filled in with where the index starts. The file is written beside
+        the target then renamed over it, so open readers keep their mapping
+        of the old file and new readers see a complete one.
+    '''
+    entries = []
+    names = bytearray()
+    tmp_path = file_path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(bytes(header.size))
+        doc_offset = header.size
+        for kind in documents:
+            id_col = kind[:-1] + "_id"
+            for row in documents[kind]:
+                doc = orjson.dumps(row)
+                f.write(doc)
+                for col in name_cols[kind]:
+                    name = (row.get(col) or "").lower().encode()
+                    entries.append((
+                        kinds[kind], row[id_col], doc_offset, len(doc),
+                        len(names), len(name)
+                    ))
+                    names += name
+                doc_offset += len(doc)
+        names_start = doc_offset
+        f.write(names)
+        index_start = names_start + len(names)
+        for kind, i, d_off, d_len, n_off, n_len in entries:
+            f.write(entry.pack(kind, i, d_off, d_len, names_start + n_off,
+                               n_len))
+        f.seek(0)
+        f.write(header.pack(
+            magic, len(entries), next_generation(file_path), index_start
+        ))
+        f.flush()
+        fsync(f.fileno())
+    replace(tmp_path, file_path)
+    return file_path
+
+
+def export_mmap(file_path: str):
+    ''' Writes every operator, skill, module and archetype row in the db to a
+        snapshot file. Rows are streamed, each one serialised and dropped
+        before the next is fetched.
+    '''
+    documents = {kind: stream(Query(kind).select()) for kind in kinds}
+    return write_snapshot(file_path, documents)
+
+
+def file_identity(st):
+    # An inode can be reused once the file it belonged to is replaced, so
+    # size and mtime are compared too
+    return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+
+class Snapshot:
+    ''' Read only view of a snapshot file shared through the page cache.
+
+        The index is read once on open into two dicts, (kind, id) and
+        (kind, lowercase name), each mapping to a document's position.
+        Lookups return memoryview slices of the mapping so no document is
+        copied until it's written out. Every check_interval seconds a lookup
+        stats the path and remaps it if the file has been swapped out.
+    '''
+
+    def __init__(self, file_path: str, check_interval: float = 1.0):
+        self.file_path = file_path
+        self.check_interval = check_interval
+        self.open()
+
+    def open(self):
+        with open(self.file_path, "rb") as f:
+            self.identity = file_identity(stat(f.fileno()))
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.view = memoryview(self.map)
+        if len(self.map) < header.size:
+            raise BadSnapshotErr(f"{self.file_path} is not a snapshot file.")
+        found, count, self.generation, index_start = header.unpack_from(
+            self.map, 0
+        )
+        if found != magic:
+            raise BadSnapshotErr(f"{self.file_path} is not a snapshot file.")
+        self.by_id = {}
+        self.by_name = {}
+        for i in range(count):
+            kind, row_id, d_off, d_len, n_off, n_len = entry.unpack_from(
+                self.map, index_start + i * entry.size
+            )
+            doc = (d_off, d_len)
+            self.by_id[(kind, row_id)] = doc
+            name = bytes(self.view[n_off:n_off + n_len]).decode()
+            self.by_name[(kind, name)] = doc
+        self.checked = monotonic()
+
+    def reload_if_swapped(self):
+        if monotonic() - self.checked < self.check_interval:
+            return False
+        self.checked = monotonic()
+        if file_identity(stat(self.file_path)) == self.identity:
+            return False
+        self.open()
+        return True
+
+    def find(self, kind: str, row_id: int = None, name: str = None):
+        ''' Returns the (offset, length) of a row's document in the current
+            mapping, looked up by id or case insensitive name, or None if it
+            isn't in the snapshot.
+        '''
+        self.reload_if_swapped()
+        if row_id is not None:
+            return self.by_id.get((kinds[kind], row_id))
+        return self.by_name.get((kinds[kind], (name or "").lower()))
+
+    def get(self, kind: str, row_id: int = None, name: str = None):
+        ''' Returns the JSON document for a row as a memoryview, or None if
+            it isn't in the snapshot.
+        '''
+        doc = self.find(kind, row_id, name)
+        if doc is None:
+            return None
+        return self.view[doc[0]:doc[0] + doc[1]]
+
+    def load(self, kind: str, row_id: int = None, name: str = None):
+        doc = self.get(kind, row_id, name)
+        return None if doc is None else orjson.loads(doc)
+
+
+def open_snapshot(file_path: str):
+    ''' Returns a Snapshot of the file, or None if it doesn't exist yet. '''
+    if file_path and path.exists(file_path):
+        return Snapshot(file_path)
+    return None
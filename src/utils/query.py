@@ -1,4 +1,6 @@
-from src.utils.formatting import idf, lit
+from src.utils.formatting import idf, lit, jp
+from pg8000.native import literal
+import json
 
 
 class IncompleteQueryErr(Exception):
@@ -13,6 +15,22 @@ class ImplicitUpdateErr(Exception):
     pass
 
 
+class InvalidOperatorErr(Exception):
+    pass
+
+
+class ImplicitDeleteErr(Exception):
+    pass
+
+
+class FrozenQueryErr(Exception):
+    pass
+
+
+operators = ["=", "!=", "<>", "<", "<=", ">", ">=", "@>", "<@", "IN"]
+containment = ["@>", "<@"]
+
+
 def validate_cols(cols: str | list):
     if cols == "":
         return []
@@ -21,11 +39,59 @@ def validate_cols(cols: str | list):
     return idf(cols)
 
 
+def path_cast(value):
+    if isinstance(value, bool):
+        return "boolean"
+    elif isinstance(value, int):
+        return "int"
+    elif isinstance(value, float):
+        return "numeric"
+    return None
+
+
 def validate_dict(filters: dict):
-    new_dict = {idf(key): lit(filters[key]) for key in filters}
+    new_dict = {}
+    for key in filters:
+        value = filters[key]
+        op = None
+        if isinstance(value, tuple):
+            op, value = value
+            if op not in operators:
+                msg = f'"{op}" is not a supported operator, use one of: '
+                msg += ", ".join(operators)
+                raise InvalidOperatorErr(msg)
+        if isinstance(key, tuple):
+            col, *path = key
+            if op in containment:
+                key = jp(col, path, as_text=False)
+            else:
+                key = jp(col, path, cast=path_cast(value))
+        else:
+            key = idf(key)
+        if op in containment:
+            value = literal(json.dumps(value))
+        elif op == "IN":
+            if isinstance(value, (str, dict)) or len(value) == 0:
+                msg = '"IN" needs a non empty list of values.'
+                raise InvalidOperatorErr(msg)
+            value = f"({', '.join(lit(list(value)))})"
+        else:
+            value = lit(value)
+        new_dict[key] = (op, value) if op else value
     return new_dict
 
 
+def compile_wheres(wheres: list):
+    and_join = [
+        "\nAND ".join([
+            f"{key} {w[key][0]} {w[key][1]}" if isinstance(w[key], tuple)
+            else f"{key} = {w[key]}" for key in w
+        ])
+        for w in wheres
+    ]
+    return "\nOR ".join(and_join)
+
+
 def validate_rows(l: int, rows: list):
     for sub in rows:
         rl = len(sub)
@@ -41,19 +107,39 @@ def validate_rows(l: int, rows: list):
 
 
 class Query:
+    ''' Base for the query builders. The compiled SQL is kept in sql the
+        first time the query is rendered, and any attribute being set clears
+        it, so a query passed around and rendered many times only compiles
+        once. Methods that change a part in place, such as appending to
+        wheres, clear it themselves.
+    '''
+
     def __init__(self, table: str):
         self.table = idf(table)
 
+    def __setattr__(self, name, value):
+        if name != "sql":
+            object.__setattr__(self, "sql", None)
+        object.__setattr__(self, name, value)
+
     def __call__(self):
         return self.__str__()
 
     def __str__(self):
+        if self.sql is None:
+            self.sql = self.compile()
+        return self.sql
+
+    def __eq__(self, other):
+        return str(self) == other
+
+    def compile(self):
         msg = 'Query class has not been specialised with either "select", '
         msg += '"insert" or "update" methods.'
         raise IncompleteQueryErr(msg)
 
-    def __eq__(self, other):
-        return str(self) == other
+    def freeze(self):
+        return FrozenQuery(self)
 
     def select(self, cols: str | list = "*"):
         return SelectQuery(self.table, cols)
@@ -69,6 +155,9 @@ class Query:
     def update(self, changes: dict = None):
         return UpdateQuery(self.table, changes)
 
+    def delete(self):
+        return DeleteQuery(self.table)
+
 
 class SelectQuery(Query):
     def __init__(self, table: str, cols: str | list = "*"):
@@ -76,6 +165,9 @@ class SelectQuery(Query):
         self.cols = validate_cols(cols)
         self.joins = []
         self.wheres = []
+        self.searches = []
+        self.orders = []
+        self.limit_to = None
 
     def select(self, cols: str | list = "*"):
         self.cols = validate_cols(cols)
@@ -91,11 +183,34 @@ class SelectQuery(Query):
         if on_2:
             j["on_2"] = idf(on_2)
         self.joins.append(j)
+        self.sql = None
         return self
 
     def where(self, filters: dict):
         if filters != {}:
             self.wheres.append(validate_dict(filters))
+            self.sql = None
+        return self
+
+    def search(self, text: str, col: str = "document",
+               config: str = "english"):
+        ''' Adds a full text match of col against text, parsed with
+            websearch_to_tsquery, which must hold alongside the where filters.
+            Also selects the match's ts_rank as "rank" and orders by it,
+            best first, unless an explicit order is set.
+        '''
+        tsquery = f"websearch_to_tsquery({lit(config)}, {lit(text)})"
+        self.searches.append((idf(col), tsquery))
+        self.sql = None
+        return self
+
+    def order_by(self, col: str, desc: bool = False):
+        self.orders.append((idf(col), "DESC" if desc else "ASC"))
+        self.sql = None
+        return self
+
+    def limit(self, count: int):
+        self.limit_to = int(count)
         return self
 
     def clear(self, param: str):
@@ -103,23 +218,42 @@ class SelectQuery(Query):
             self.joins = []
         elif param == "where":
             self.wheres = []
+        elif param == "search":
+            self.searches = []
+        elif param == "order":
+            self.orders = []
+        elif param == "limit":
+            self.limit_to = None
         return self
 
-    def __str__(self):
-        query = f"SELECT {', '.join(self.cols)} FROM {self.table}"
+    def compile(self):
+        cols = list(self.cols)
+        orders = list(self.orders)
+        if self.searches != []:
+            ranks = " + ".join([
+                f"ts_rank({col}, {tsquery})" for col, tsquery in self.searches
+            ])
+            cols.append(f"{ranks} AS rank")
+            if orders == []:
+                orders = [("rank", "DESC")]
+        query = f"SELECT {', '.join(cols)} FROM {self.table}"
         for j in self.joins:
             query += f'\n{j["j_type"].upper()} JOIN'
             query += f' {j["table"]} ON {j["table"]}.{j["on"]}'
             query += f' = {j.get("table_2", self.table)}.'
             query += j.get("on_2", j["on"])
-        if self.wheres != []:
-            query += "\nWHERE "
-            and_join = [
-                "\nAND ".join([f"{key} = {w[key]}" for key in w])
-                for w in self.wheres
-            ]
-            or_join = "\nOR ".join(and_join)
-            query += or_join
+        conditions = [f"{col} @@ {tsquery}" for col, tsquery in self.searches]
+        if self.wheres != [] and conditions != []:
+            conditions.append(f"({compile_wheres(self.wheres)})")
+        elif self.wheres != []:
+            conditions.append(compile_wheres(self.wheres))
+        if conditions != []:
+            query += "\nWHERE " + "\nAND ".join(conditions)
+        if orders != []:
+            query += "\nORDER BY "
+            query += ", ".join([f"{col} {way}" for col, way in orders])
+        if self.limit_to is not None:
+            query += f"\nLIMIT {self.limit_to}"
         query += ";"
         return query
 
@@ -157,7 +291,7 @@ class InsertQuery(Query):
             self.cols = []
         return self
 
-    def __str__(self):
+    def compile(self):
         if self.rows == [] or self.cols == []:
             msg = 'Information for both cols and rows is needed for a valid '
             msg += 'insert query.'
@@ -208,7 +342,7 @@ class UpdateQuery(Query):
             self.returns = None
         return self
 
-    def __str__(self):
+    def compile(self):
         if self.changes == {}:
             msg = 'Information for changes to make is needed for a valid '
             msg += 'update query.'
@@ -224,14 +358,88 @@ class UpdateQuery(Query):
         ])
         query += joined_changes
         if not self.no_filter:
-            query += "\nWHERE "
-            and_join = [
-                "\nAND ".join([f"{key} = {w[key]}" for key in w])
-                for w in self.wheres
-            ]
-            or_join = "\nOR ".join(and_join)
-            query += or_join
+            query += "\nWHERE " + compile_wheres(self.wheres)
         if self.returns:
             query += f"\nRETURNING {', '.join(self.returns)}"
         query += ";"
         return query
+
+
+class DeleteQuery(Query):
+    def __init__(self, table: str):
+        super().__init__(table)
+        self.wheres = []
+        self.no_filter = False
+        self.returns = None
+
+    def where(self, filters: str | dict):
+        if filters == "*":
+            self.no_filter = True
+        elif filters != {}:
+            self.wheres.append(validate_dict(filters))
+            self.no_filter = False
+        return self
+
+    def returning(self, cols: str | list = "*"):
+        self.returns = validate_cols(cols)
+        return self
+
+    def clear(self, param: str):
+        if param == "where":
+            self.wheres = []
+            self.no_filter = False
+        elif param == "returning":
+            self.returns = None
+        return self
+
+    def compile(self):
+        if not self.no_filter and self.wheres == []:
+            msg = 'No filters have been set. All rows will be deleted. If '
+            msg += 'this is your intent then pass "*" to the where method to '
+            msg += 'explicitly declare so.'
+            raise ImplicitDeleteErr(msg)
+        query = f"DELETE FROM {self.table}"
+        if not self.no_filter:
+            query += "\nWHERE " + compile_wheres(self.wheres)
+        if self.returns:
+            query += f"\nRETURNING {', '.join(self.returns)}"
+        query += ";"
+        return query
+
+
+class FrozenQuery:
+    ''' An immutable, already compiled query, made with a builder's
+        freeze(). Meant for queries that never change, defined once at module
+        level and run as often as needed without being compiled again.
+    '''
+    __slots__ = ("table", "sql")
+
+    def __init__(self, query: Query):
+        object.__setattr__(self, "table", query.table)
+        object.__setattr__(self, "sql", str(query))
+
+    def __setattr__(self, name, value):
+        raise FrozenQueryErr("Frozen queries can't be changed.")
+
+    def __getattr__(self, name):
+        builders = [SelectQuery, InsertQuery, UpdateQuery, DeleteQuery]
+        if any(hasattr(builder, name) for builder in builders):
+            msg = f'Frozen queries can\'t "{name}", build a new query with '
+            msg += 'the changes and freeze that instead.'
+            raise FrozenQueryErr(msg)
+        raise AttributeError(name)
+
+    def __call__(self):
+        return self.sql
+
+    def __str__(self):
+        return self.sql
+
+    def __repr__(self):
+        return f"FrozenQuery({self.sql!r})"
+
+    def __eq__(self, other):
+        return self.sql == other
+
+    def __hash__(self):
+        return hash(self.sql)
@@ -0,0 +1,168 @@
+from src.utils.connect import read
+from src.utils.query import Query
+from src.utils.freshness import Rebuilt
+
+own_tile = chr(9632)
+range_tile = chr(9633)
+# Ranges are encoded on a 16x16 grid with the operator at (7, 7), so dx and
+# dy both run from -7 to 8 and a mask fits in 256 bits.
+grid_size = 16
+origin = 7
+hex_width = grid_size * grid_size // 4
+
+
+class BadRangeErr(Exception):
+    pass
+
+
+def tile_bit(dx: int, dy: int):
+    ''' Returns the bit for the tile dx columns in front of and dy rows below
+        the operator.
+    '''
+    x, y = dx + origin, dy + origin
+    if not (0 <= x < grid_size and 0 <= y < grid_size):
+        msg = f"Tile ({dx}, {dy}) is outside the {grid_size}x{grid_size} "
+        msg += "range grid."
+        raise BadRangeErr(msg)
+    return 1 << (y * grid_size + x)
+
+
+def encode_range(range_str: str):
+    ''' Converts a box character range, as made by parse_range, to an int
+        with one bit set per tile in range, the operator's own tile included.
+
+        An odd range box shouldn't cost the whole operator, so tiles outside
+        the grid are skipped and a range with no operator tile gives None,
+        both with a note printed. Migration 0008 does the same in SQL.
+    '''
+    rows = range_str.split("\n")
+    start = [
+        (r, row.index(own_tile)) for r, row in enumerate(rows)
+        if own_tile in row
+    ]
+    if not start:
+        print(f"no operator tile in range, skipping:\n{range_str}")
+        return None
+    r0, c0 = start[0]
+    mask = 0
+    for r, row in enumerate(rows):
+        for c, tile in enumerate(row):
+            if tile in [own_tile, range_tile]:
+                try:
+                    mask |= tile_bit(c - c0, r - r0)
+                except BadRangeErr as e:
+                    print(f"{e} Skipping it.")
+    return mask
+
+
+def decode_range(mask: int):
+    ''' Returns the sorted (dx, dy) tiles set in a mask. '''
+    tiles = []
+    for bit in range(grid_size * grid_size):
+        if mask >> bit & 1:
+            y, x = divmod(bit, grid_size)
+            tiles.append((x - origin, y - origin))
+    return sorted(tiles)
+
+
+def mask_hex(mask: int):
+    return f"{mask:0{hex_width}x}"
+
+
+def range_mask(range_str: str):
+    ''' Encodes a range string as a hex mask, or None if it can't be. '''
+    mask = encode_range(range_str)
+    if mask is None:
+        return None
+    return mask_hex(mask)
+
+
+def range_masks(ranges: dict):
+    ''' Encodes an operator's ranges dict, elite stage to range string, as
+        the hex masks stored in the range_masks column. Stages whose range
+        can't be encoded are left out.
+    '''
+    masks = {}
+    for phase in ranges:
+        mask = range_mask(ranges[phase])
+        if mask is not None:
+            masks[phase] = mask
+    return masks
+
+
+class RangeIndex:
+    ''' Operators' range masks for each elite stage, plus the transpose: an
+        int per tile with bit n set when the nth operator covers it. Coverage
+        and superset questions become a lookup or a few ANDs.
+    '''
+
+    def __init__(self, operators: list):
+        self.names = [op["operator_name"] for op in operators]
+        self.masks = {}
+        self.tiles = {}
+        for i, op in enumerate(operators):
+            for phase, hex_mask in (op.get("range_masks") or {}).items():
+                mask = int(hex_mask, 16)
+                self.masks.setdefault(phase, {})[i] = mask
+                tiles = self.tiles.setdefault(phase, {})
+                while mask:
+                    low = mask & -mask
+                    tiles[low] = tiles.get(low, 0) | 1 << i
+                    mask ^= low
+
+    def operator_names(self, bitset: int):
+        return [self.names[i] for i in range(bitset.bit_length())
+                if bitset >> i & 1]
+
+    def covering(self, dx: int, dy: int, phase: str = "e2"):
+        ''' Returns the names of the operators whose range at phase includes
+            the tile (dx, dy).
+        '''
+        tiles = self.tiles.get(phase, {})
+        return self.operator_names(tiles.get(tile_bit(dx, dy), 0))
+
+    def supersets(self, mask: int, phase: str = "e2"):
+        ''' Returns the names of the operators whose range at phase covers
+            every tile in mask.
+        '''
+        found = -1
+        remaining = mask
+        while remaining:
+            low = remaining & -remaining
+            found &= self.tiles.get(phase, {}).get(low, 0)
+            remaining ^= low
+        if found == -1:
+            found = 0
+            for i in self.masks.get(phase, {}):
+                found |= 1 << i
+        return self.operator_names(found)
+
+    def mask_of(self, name: str, phase: str = "e2"):
+        ''' Returns an operator's mask at phase, or None if they don't have
+            one.
+        '''
+        for i, op_name in enumerate(self.names):
+            if op_name.lower() == name.lower():
+                return self.masks.get(phase, {}).get(i)
+        return None
+
+
+masks_q = Query("operators").select(
+    ["operator_name", "range_masks"]
+).freeze()
+
+
+def build_index():
+    return RangeIndex(read(masks_q))
+
+
+indexes = Rebuilt()
+
+
+def get_index():
+    ''' Returns the cached index, rebuilt once the data changes. '''
+    return indexes.get(None, build_index)
+
+
+def invalidate():
+    indexes.clear()
@@ -0,0 +1,133 @@
+from dataclasses import dataclass, fields
+
+
+class Record:
+    ''' Base for the slotted records scrape() and the sources return.
+
+        Item access reads and writes the attributes, so code written against
+        the old dicts keeps working. row() gives the dict insert() stores,
+        a shallow one: JSON fields are shared with the record rather than
+        copied, and None fields are left out as the db defaults them to NULL.
+    '''
+    __slots__ = ()
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        return cls(**data)
+
+    def __getitem__(self, key):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        setattr(self, key, value)
+
+    def get(self, key, default=None):
+        return getattr(self, key, default)
+
+    def row(self, **extra):
+        row = {}
+        for field in fields(self):
+            value = getattr(self, field.name)
+            if value is not None:
+                row[field.name] = value
+        row.update(extra)
+        return row
+
+
+@dataclass(slots=True)
+class Archetype(Record):
+    class_name: str
+    archetype_name: str
+    trait: str
+    position: str
+    attack_type: str
+    cost_on_e1: bool = None
+    cost_on_e2: bool = None
+    block_on_e1: bool = None
+    block_on_e2: bool = None
+
+
+@dataclass(slots=True)
+class Skill(Record):
+    skill_name: str
+    sp_type: str
+    activation_type: str
+    l1: dict = None
+    l2: dict = None
+    l3: dict = None
+    l4: dict = None
+    l5: dict = None
+    l6: dict = None
+    l7: dict = None
+    m1: dict = None
+    m2: dict = None
+    m3: dict = None
+
+
+@dataclass(slots=True)
+class Module(Record):
+    module_name: str
+    level_1_trait_upgrade: str = None
+    level_1_stats: dict = None
+    level_2_talent: dict = None
+    level_2_stats: dict = None
+    level_3_talent: dict = None
+    level_3_stats: dict = None
+
+
+@dataclass(slots=True)
+class Operator(Record):
+    operator_name: str
+    gamepress_url_name: str
+    gamepress_link: str
+    rarity: int
+    description: str = None
+    quote: str = None
+    alter: str = None
+    resist: int = None
+    redeploy: int = None
+    cost: int = None
+    block: int = None
+    interval: float = None
+    level_stats: dict = None
+    ranges: dict = None
+    range_masks: dict = None
+    potentials: dict = None
+    trust_stats: dict = None
+    talents: dict = None
+    limited: bool = None
+    free: bool = None
+    EN_released: bool = None
+    EN_recruitable: bool = None
+    EN_release_date: str = None
+    EN_recruitment_added: str = None
+    CN_released: bool = None
+    CN_recruitable: bool = None
+    CN_release_date: str = None
+    CN_recruitment_added: str = None
+    content_hash: str = None
+
+
+def as_row(record, **extra):
+    ''' Returns the db row for a record or a plain dict, plus any extra
+        columns, without copying nested values.
+    '''
+    if isinstance(record, Record):
+        return record.row(**extra)
+    return {**record, **extra}
+
+
+def to_records(operator_info, archetype_info, skill_info, module_info, tags):
+    ''' Wraps the dicts a parser builds up in records, in scrape()'s
+        return order.
+    '''
+    return (
+        Operator.from_dict(operator_info),
+        Archetype.from_dict(archetype_info),
+        [Skill.from_dict(skill) for skill in skill_info],
+        [Module.from_dict(module) for module in module_info],
+        tuple(tags)
+    )
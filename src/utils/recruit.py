@@ -0,0 +1,140 @@
+from src.utils.connect import read
+from src.utils.query import Query
+from src.utils.freshness import Rebuilt
+from itertools import combinations
+
+max_selected = 5
+max_combined = 3
+top_tag = "Top Operator"
+
+
+class UnknownTagErr(Exception):
+    pass
+
+
+class TooManyTagsErr(Exception):
+    pass
+
+
+class RecruitIndex:
+    ''' In memory recruitment calculator for one server's pool.
+
+        Each tag maps to an int used as a bitset, bit n set when the nth
+        recruitable operator has the tag. Operators are numbered by rarity so
+        the lowest set bit of any combination's bitset is its guaranteed
+        rarity. Every combination of up to three tags that matches at least
+        one operator is worked out once on build, so a lookup only has to
+        enumerate the subsets of the selected tags.
+    '''
+
+    def __init__(self, operators: list, tags: list, operators_tags: list):
+        self.operators = sorted(
+            operators, key=lambda op: (op["rarity"], op["operator_name"])
+        )
+        bits = {
+            op["operator_id"]: 1 << i for i, op in enumerate(self.operators)
+        }
+        tag_names = {tag["tag_id"]: tag["tag_name"] for tag in tags}
+        self.bitsets = {name: 0 for name in tag_names.values()}
+        for row in operators_tags:
+            if row["operator_id"] in bits and row["tag_id"] in tag_names:
+                self.bitsets[tag_names[row["tag_id"]]] |= bits[
+                    row["operator_id"]
+                ]
+        # Six stars only turn up when Top Operator is one of the tags
+        self.below_top = 0
+        for i, op in enumerate(self.operators):
+            if op["rarity"] < 6:
+                self.below_top |= 1 << i
+        self.results = {}
+        names = sorted(self.bitsets)
+        for size in range(1, max_combined + 1):
+            for combo in combinations(names, size):
+                bitset = self.match(combo)
+                if bitset:
+                    self.results[frozenset(combo)] = self.outcome(
+                        combo, bitset
+                    )
+
+    def match(self, combo):
+        bitset = -1
+        for name in combo:
+            bitset &= self.bitsets[name]
+        if top_tag not in combo:
+            bitset &= self.below_top
+        return bitset
+
+    def outcome(self, combo, bitset):
+        ops = []
+        i = 0
+        while bitset:
+            if bitset & 1:
+                ops.append(self.operators[i])
+            bitset >>= 1
+            i += 1
+        return {
+            "tags": sorted(combo),
+            "min_rarity": ops[0]["rarity"],
+            "operators": [
+                {"operator_name": op["operator_name"], "rarity": op["rarity"]}
+                for op in ops
+            ]
+        }
+
+    def lookup(self, selected: list):
+        ''' Returns the outcome of every combination of the selected tags that
+            can recruit someone, best guaranteed rarity first.
+        '''
+        selected = list(dict.fromkeys(selected))
+        if len(selected) > max_selected:
+            msg = f"At most {max_selected} tags can be selected, "
+            msg += f"got {len(selected)}."
+            raise TooManyTagsErr(msg)
+        unknown = [name for name in selected if name not in self.bitsets]
+        if unknown:
+            raise UnknownTagErr(f"Unknown tags: {', '.join(unknown)}")
+        found = []
+        for size in range(1, max_combined + 1):
+            for combo in combinations(selected, size):
+                res = self.results.get(frozenset(combo))
+                if res:
+                    found.append(res)
+        return sorted(
+            found, key=lambda res: (-res["min_rarity"], len(res["tags"]))
+        )
+
+
+op_qs = {
+    server: Query("operators").select(
+        ["operator_id", "operator_name", "rarity"]
+    ).where({f"{server}_recruitable": True}).freeze()
+    for server in ["en", "cn"]
+}
+tags_q = Query("tags").select(["tag_id", "tag_name"]).freeze()
+operators_tags_q = Query("operators_tags").select(
+    ["operator_id", "tag_id"]
+).freeze()
+
+
+def build_index(server: str = "en"):
+    ''' Loads the recruitable operators for a server and their tags through
+        read(), so the build uses the SQLite snapshot where there is one.
+    '''
+    operators = read(op_qs[server])
+    tags = read(tags_q)
+    operators_tags = read(operators_tags_q)
+    return RecruitIndex(operators, tags, operators_tags)
+
+
+indexes = Rebuilt()
+
+
+def get_index(server: str = "en"):
+    ''' Returns the cached index for a server, rebuilt once the data
+        changes.
+    '''
+    return indexes.get(server, lambda: build_index(server))
+
+
+def invalidate():
+    indexes.clear()
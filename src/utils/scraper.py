@@ -1,8 +1,11 @@
 import requests
 from bs4 import BeautifulSoup
+from src.utils.ranges import range_masks, range_mask
+from src.utils.records import to_records
 # from pprint import pprint
 import re
 import json
+import hashlib
 
 stat_lookup = {
     "Deployment Cost": "DP Cost",
@@ -14,6 +17,104 @@ stat_lookup = {
     "Attack Speed": "ASPD"
 }
 
+skip_list = [
+    "tulip",
+    "touch",
+    "pith",
+    "stormeye",
+    "sharp",
+    "reserve-operator-logistics",
+    "reserve-operator-caster",
+    "reserve-operator-sniper",
+    "reserve-operator-melee",
+]
+
+stat_obj_pattern = re.compile(r"var myStats = ({.+})\s+var summon_stats")
+skill_pattern = re.compile(
+    r"Skill \d: (?P<skill_name>.+)"
+    r"|SP Charge Type\n\n(?P<sp_type>.+)"
+    r"|Skill Activation\n\n\n(?P<activation_type>.+)"
+)
+obtain_date_pattern = re.compile(
+    r"(Release Date|Recruitment Pool Date) \((Global|CN)\)\n"
+    r"(\d+/\d+/\d\d\d\d)"
+)
+
+
+def index_page(soup):
+    ''' Walks the whole page once and returns a dict of each class name,
+        and each id prefixed with "#", to the elements carrying it in
+        document order, so top level lookups don't each rescan the page.
+    '''
+    index = {}
+    for tag in soup.descendants:
+        if tag.name is None:
+            continue
+        for name in tag.get("class") or ():
+            index.setdefault(name, []).append(tag)
+        if tag.get("id"):
+            index.setdefault("#" + tag["id"], []).append(tag)
+    return index
+
+
+def indexed(index, key: str, tag_name: str = None):
+    ''' Equivalent of soup.findAll(tag_name, class_=key) against an index
+        built by index_page.
+    '''
+    return [tag for tag in index.get(key, []) if tag_name in (None, tag.name)]
+
+
+def indexed_one(index, key: str, tag_name: str = None):
+    ''' Equivalent of soup.find(tag_name, class_=key) against an index
+        built by index_page.
+    '''
+    found = indexed(index, key, tag_name)
+    return found[0] if found else None
+
+
+def find_first(soup, classes: list):
+    ''' Walks the subtree once and returns a dict of each class name in
+        classes to the first element carrying it, equivalent to calling
+        soup.find(class_=name) for each name but without rescanning.
+    '''
+    wanted = set(classes)
+    found = {}
+    for tag in soup.descendants:
+        if tag.name is None:
+            continue
+        for name in tag.get("class") or ():
+            if name in wanted and name not in found:
+                found[name] = tag
+                if len(found) == len(wanted):
+                    return found
+    return found
+
+
+def all_with_class(soup, class_name: str):
+    ''' Same result as soup.findAll(class_=class_name), using a plain set
+        membership test per element rather than bs4's generic matcher.
+    '''
+    return [
+        tag for tag in soup.descendants
+        if tag.name is not None and class_name in (tag.get("class") or ())
+    ]
+
+
+def first_matches(pattern, text):
+    ''' Runs a pattern of named alternatives over text once, returning the
+        first captured value for each group name.
+    '''
+    found = {}
+    for match in pattern.finditer(text):
+        found.setdefault(match.lastgroup, match.group(match.lastgroup))
+    return found
+
+
+def img_digit(img):
+    ''' Gamepress icons are named after the level they show, e.g. .../2.png
+    '''
+    return img["src"].split("/")[-1][0]
+
 
 def parse_range(range_soup):
     tile_lookup = {"null-box": " ",
@@ -56,8 +157,8 @@ def parse_trust(trust_soup):
 
 
 def parse_stat_obj(script):
-    op_stat_str = re.findall('var myStats = ({.+})\s+var summon_stats',
-                             script.text.replace("\n", ""))[0]
+    op_stat_str = stat_obj_pattern.search(
+        script.text.replace("\n", "")).group(1)
     op_stat_object = json.loads(op_stat_str)
     new_stat_object = {}
     for key in op_stat_object:
@@ -87,19 +188,62 @@ def mdy2ymd(date):
     return "/".join(ymd)
 
 
-def scrape(name):
+def fetch(name):
+    ''' Downloads the gamepress page for an operator, returning the url and
+        the page html.
+    '''
     url = "https://gamepress.gg/arknights/operator/"+name
     res = requests.get(url)
+    return url, res.text
+
+
+def operator_list():
+    ''' Reads the gamepress interactive operator list, returning a list of
+        (url name, server) tuples where server is "na" for operators out on
+        the global server.
+    '''
+    url = "https://gamepress.gg/arknights/tools/"
+    url += "interactive-operator-list#tags=null##stats"
+    res = requests.get(url)
+    soup = BeautifulSoup(res.text, 'html.parser')
+    operators = []
+    for item in soup.find_all("tr", class_="operators-row"):
+        title = item.find("a", class_="operator-title-actual")
+        operators.append(
+            (title["href"].split("/")[-1], item["data-availserver"])
+        )
+    return operators
+
+
+def fingerprint(html):
+    ''' Returns a sha256 hex digest of the operator article in a page, the
+        part scrape reads from, so that changes to the site chrome around it
+        don't count as changes to the operator. Falls back to hashing the
+        whole page if the article can't be found.
+    '''
+    start = html.find('class="operator-node')
+    end = html.rfind("</article>")
+    if start != -1 and end > start:
+        start = html.rfind("<article", 0, start)
+        html = html[start:end]
+    return hashlib.sha256(html.encode()).hexdigest()
+
+
+def scrape(name, html=None):
+    url = "https://gamepress.gg/arknights/operator/"+name
+    if html is None:
+        url, html = fetch(name)
     operator_info = {}
     archetype_info = {}
     skill_info = []
     tags = []
     modules = []
-    soup = BeautifulSoup(res.text, 'html.parser')
+    soup = BeautifulSoup(html, 'html.parser')
+    page = index_page(soup)
 
     # Operator Name
-    operator_info["operator_name"] = soup.find(
-        "div", {"id": "page-title"}).find("h1").text
+    operator_info["operator_name"] = indexed_one(
+        page, "#page-title", "div").find("h1").text
 
     # Gampress URL Name
     operator_info["gamepress_url_name"] = name
@@ -108,25 +252,25 @@ def scrape(name):
     operator_info["gamepress_link"] = url
 
     # Operator Rarity
-    rarity = len(soup.find("div", class_="rarity-cell").findAll("img"))
+    rarity = len(indexed_one(page, "rarity-cell", "div").findAll("img"))
     operator_info["rarity"] = rarity
 
     # Operator Description
-    op_desc = soup.findAll("div", class_="description-box")
+    op_desc = indexed(page, "description-box", "div")
     operator_info["description"] = op_desc[1].text.strip()
 
     # Operator Quote
     operator_info["quote"] = op_desc[2].text.strip()
 
     # Alter Name
-    alter = soup.find("a", class_="alter-form")
+    alter = indexed_one(page, "alter-form", "a")
     if alter:
         operator_info["alter"] = alter.find("div", class_="name").text
     else:
         operator_info["alter"] = None
 
     # Operator Secondary Stats
-    op_2nd_stats = soup.findAll("div", class_="other-stat-value-cell")
+    op_2nd_stats = indexed(page, "other-stat-value-cell", "div")
     for stat in op_2nd_stats:
         stat_name = stat.find(class_="effect-title").text.strip()
         stat_2nd_lookup = {
@@ -144,7 +288,8 @@ def scrape(name):
                 class_="effect-description").text.strip())
 
     # Operator Level Stats
-    op_stat_script_article = soup.find("article", class_="operator-node")
+    op_stat_script_article = indexed_one(
+        page, "operator-node", "article")
     op_stat_script = op_stat_script_article.findAll("script")[-1]
     op_stat_object = parse_stat_obj(op_stat_script)
     operator_info["level_stats"] = op_stat_object
@@ -152,14 +297,14 @@ def scrape(name):
     # Operator Range
     operator_info["ranges"] = {}
     operator_info["ranges"]["e0"] = parse_range(
-        soup.find("div", {"id": "image-tab-1"}).find(
+        indexed_one(page, "#image-tab-1", "div").find(
             "div", class_="range-box"
         )
     )
     if rarity > 2:
         try:
             operator_info["ranges"]["e1"] = parse_range(
-                soup.find("div", {"id": "image-tab-2"}).find(
+                indexed_one(page, "#image-tab-2", "div").find(
                     "div", class_="range-box"
                 )
             )
@@ -167,34 +312,42 @@ def scrape(name):
             pass
     if rarity > 3:
         operator_info["ranges"]["e2"] = parse_range(
-            soup.find("div", {"id": "image-tab-3"}).find(
+            indexed_one(page, "#image-tab-3", "div").find(
                 "div", class_="range-box"
             )
         )
 
+    operator_info["range_masks"] = range_masks(operator_info["ranges"])
+
     # Operator Potentials
-    op_pots = soup.find("div", class_="potential-cell")
+    op_pots = indexed_one(page, "potential-cell", "div")
     operator_info["potentials"] = parse_pots(op_pots)
 
     # Operator Trust Bonuses
-    op_trust = soup.find("div", class_="trust-cell")
+    op_trust = indexed_one(page, "trust-cell", "div")
     operator_info["trust_stats"] = parse_trust(op_trust)
 
     # Operator Talents Info
     talents = {}
-    for t in soup.findAll("div", class_="talent-child"):
-        t_name = t.find(class_="talent-title").text.strip()
-        t_L = t.find(class_="operator-level").text.strip().split()[1]
-        t_E = t.find(class_="elite-level")
+    talent_classes = [
+        "talent-title",
+        "operator-level",
+        "elite-level",
+        "potential-level",
+        "talent-description"
+    ]
+    for t in indexed(page, "talent-child", "div"):
+        t_parts = find_first(t, talent_classes)
+        t_name = t_parts["talent-title"].text.strip()
+        t_L = t_parts["operator-level"].text.strip().split()[1]
+        t_E = t_parts.get("elite-level")
         if not t_E:
             t_E = "0"
         else:
-            t_E = t_E.find("img")["src"].split("/")[-1][0]
+            t_E = img_digit(t_E.find("img"))
         t_EL = "e"+t_E+"/l"+t_L
-        t_pot = "pot"+t.find(
-            class_="potential-level").find("img")["src"].split("/")[-1][0]
-        t_desc = t.find(
-            class_="talent-description").text.strip()
+        t_pot = "pot"+img_digit(t_parts["potential-level"].find("img"))
+        t_desc = t_parts["talent-description"].text.strip()
         if not talents.get(t_name):
             talents[t_name] = {t_EL: {t_pot: t_desc}}
         else:
@@ -205,14 +358,16 @@ def scrape(name):
     operator_info["talents"] = talents
 
     # Limited
-    op_obtain_info = soup.find(class_="obtain-approach-table").text.strip()
-    limited = re.search("LIMITED", op_obtain_info)
-
-    operator_info["limited"] = True if limited else False
+    op_obtain_info = indexed_one(
+        page, "obtain-approach-table").text.strip()
+    operator_info["limited"] = "LIMITED" in op_obtain_info
+    obtain_dates = {}
+    for match in obtain_date_pattern.finditer(op_obtain_info):
+        obtain_dates.setdefault(match.group(1, 2), match.group(3))
 
     # Free
     operator_info["free"] = False
-    for item in soup.find_all("div", class_="approach-name"):
+    for item in indexed(page, "approach-name", "div"):
         if item.text.strip() in [
             "Activity Acquisition",
             "Event Reward",
@@ -222,42 +377,19 @@ def scrape(name):
         ]:
             operator_info["free"] = True
 
-    # EN Release Info
-    en_release = re.search(
-        "Release Date \(Global\)\n(\d+/\d+/\d\d\d\d)",
-        op_obtain_info
-    )
-    en_recruit = re.search(
-        "Recruitment Pool Date \(Global\)\n(\d+/\d+/\d\d\d\d)",
-        op_obtain_info
-    )
-
-    operator_info["EN_released"] = True if en_release else False
-    operator_info["EN_release_date"] = mdy2ymd(
-        en_release.group(1)) if en_release else None
-    operator_info["EN_recruitable"] = True if en_recruit else False
-    operator_info["EN_recruitment_added"] = mdy2ymd(
-        en_recruit.group(1)) if en_recruit else None
-
-    # CN Release Info
-    cn_release = re.search(
-        "Release Date \(CN\)\n(\d+/\d+/\d\d\d\d)",
-        op_obtain_info
-    )
-    cn_recruit = re.search(
-        "Recruitment Pool Date \(CN\)\n(\d+/\d+/\d\d\d\d)",
-        op_obtain_info
-    )
-
-    operator_info["CN_released"] = True if cn_release else False
-    operator_info["CN_release_date"] = mdy2ymd(
-        cn_release.group(1)) if cn_release else None
-    operator_info["CN_recruitable"] = True if cn_recruit else False
-    operator_info["CN_recruitment_added"] = mdy2ymd(
-        cn_recruit.group(1)) if cn_recruit else None
+    # EN and CN Release Info
+    for server, prefix in [("Global", "EN"), ("CN", "CN")]:
+        release = obtain_dates.get(("Release Date", server))
+        recruit = obtain_dates.get(("Recruitment Pool Date", server))
+        operator_info[f"{prefix}_released"] = bool(release)
+        operator_info[f"{prefix}_release_date"] = mdy2ymd(
+            release) if release else None
+        operator_info[f"{prefix}_recruitable"] = bool(recruit)
+        operator_info[f"{prefix}_recruitment_added"] = mdy2ymd(
+            recruit) if recruit else None
 
     # Archetype Class Name
-    op_class = soup.findAll("div", class_="profession-title")
+    op_class = indexed(page, "profession-title", "div")
     archetype_info["class_name"] = op_class[0].text.strip()
 
     # Archetype Name
@@ -272,7 +404,7 @@ def scrape(name):
     archetype_info["trait"] = trait_info.text.strip()
 
     # Archetype Position
-    op_position = soup.find_all("div", class_="information-cell")
+    op_position = indexed(page, "information-cell", "div")
     archetype_info["position"] = op_position[0].find("a").text
 
     # Archetype Attack Type
@@ -305,20 +437,28 @@ def scrape(name):
             del op_stat_object["e2"]["cost"], op_stat_object["e2"]["block"]
 
     # Skill Info
-    for cell in soup.findAll("div", class_="skill-cell"):
+    skill_classes = [
+        "sp-cost",
+        "initial-sp",
+        "skill-duration",
+        "skill-description",
+        "skill-range-box"
+    ]
+    for cell in indexed(page, "skill-cell", "div"):
         skill = {}
-        skill["skill_name"] = re.findall("Skill \d: (.+)", cell.text)[0]
-        skill["sp_type"] = re.findall("SP Charge Type\n\n(.+)", cell.text)[0]
-        skill["activation_type"] = re.findall(
-            "Skill Activation\n\n\n(.+)", cell.text)[0]
-        sp_cost_list = [item.text for item in cell.find(
-            class_="sp-cost").findAll(class_="effect-description")]
-        initial_sp_list = [item.text for item in cell.find(
-            class_="initial-sp").findAll(class_="effect-description")]
-        skill_duration_list = [item.text.strip() for item in cell.find(
-            class_="skill-duration").findAll(class_="effect-description")]
-        skill_description_list = cell.find(
-            class_="skill-description").findAll(class_="effect-description")
+        skill_text = first_matches(skill_pattern, cell.text)
+        skill["skill_name"] = skill_text["skill_name"]
+        skill["sp_type"] = skill_text["sp_type"]
+        skill["activation_type"] = skill_text["activation_type"]
+        s_parts = find_first(cell, skill_classes)
+        sp_cost_list = [item.text for item in all_with_class(
+            s_parts["sp-cost"], "effect-description")]
+        initial_sp_list = [item.text for item in all_with_class(
+            s_parts["initial-sp"], "effect-description")]
+        skill_duration_list = [item.text.strip() for item in all_with_class(
+            s_parts["skill-duration"], "effect-description")]
+        skill_description_list = all_with_class(
+            s_parts["skill-description"], "effect-description")
         for skill_description in skill_description_list:
             for br in skill_description.select("br"):
                 br.replace_with("\n")
@@ -338,10 +478,11 @@ def scrape(name):
             8: "m2",
             9: "m3",
         }
-        range_change = bool(cell.find(class_="skill-range-box"))
+        range_change = "skill-range-box" in s_parts
         if range_change:
             skill_range_list = [
-                parse_range(item) for item in cell.findAll(class_="range-box")]
+                parse_range(item) for item in all_with_class(
+                    cell, "range-box")]
         for i in range(len(sp_cost_list)):
             skill[skill_level_lookup[i]] = {
                 "sp_cost": int(sp_cost_list[i]),
@@ -351,15 +492,24 @@ def scrape(name):
             }
             if range_change:
                 skill[skill_level_lookup[i]]["range"] = skill_range_list[i]
+                mask = range_mask(skill_range_list[i])
+                if mask is not None:
+                    skill[skill_level_lookup[i]]["range_mask"] = mask
         skill_info.append(skill)
 
     # Tags
-    tag_soup = soup.find(class_="tag-cell").findAll(class_="tag-title")
+    tag_soup = all_with_class(
+        indexed_one(page, "tag-cell"), "tag-title")
     tags = list(set([tag.text.strip() for tag in tag_soup]))
 
     # Modules
-    module_soup = soup.findAll(class_="view-modules-on-operator")[1]
+    module_soup = indexed(page, "view-modules-on-operator")[1]
     mod_levels = module_soup.findAll(class_="views-row")[1:]
+    module_talent_classes = [
+        "module-talent-name",
+        "module-talent-row-1",
+        "module-talent-row-2"
+    ]
     for mod in mod_levels:
         m_name = mod.find(class_="module-title").text.strip().split("\n")[0]
         m_level = mod.find(
@@ -394,13 +544,12 @@ def scrape(name):
                 class_="accordion-custom-content").findAll(class_="field__item")
             mod_talent = {}
             for t in m_t_soup:
-                m_t_name = t.find(
-                    class_="module-talent-name").text.strip()
+                m_t_parts = find_first(t, module_talent_classes)
+                m_t_name = m_t_parts["module-talent-name"].text.strip()
                 m_t_level = f"e2/l{rarity}0"
-                m_t_pot = "pot"+t.find(
-                    class_="module-talent-row-1").findAll("img")[1]["src"].split("/")[-1][0]
-                m_t_desc = t.find(
-                    class_="module-talent-row-2").text.strip()
+                m_t_pot = "pot"+img_digit(
+                    m_t_parts["module-talent-row-1"].findAll("img")[1])
+                m_t_desc = m_t_parts["module-talent-row-2"].text.strip()
                 if not mod_talent.get(m_t_name):
                     mod_talent[m_t_name] = {m_t_level: {m_t_pot: m_t_desc}}
                 else:
@@ -412,7 +561,9 @@ def scrape(name):
             module[f"level_{m_level}_talent"] = mod_talent
         if m_level == "3":
             modules.append(module)
-    return operator_info, archetype_info, skill_info, modules, tags
+    return to_records(
+        operator_info, archetype_info, skill_info, modules, tags
+    )
 
 
 # if __name__ == "__main__":
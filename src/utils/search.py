@@ -0,0 +1,97 @@
+from src.utils.connect import run
+from src.utils.query import Query
+
+
+def nested_texts(data):
+    ''' Yields every string found in a nested dict, depth first, skipping
+        repeats so a talent unchanged across levels is indexed once.
+    '''
+    seen = set()
+    stack = [data]
+    while stack:
+        item = stack.pop(0)
+        if isinstance(item, dict):
+            stack = list(item.values()) + stack
+        elif isinstance(item, str) and item not in seen:
+            seen.add(item)
+            yield item
+
+
+def operator_documents(operator_info: dict):
+    docs = []
+    if operator_info.get("description"):
+        docs.append(("description", operator_info["description"]))
+    for name, levels in (operator_info.get("talents") or {}).items():
+        for text in nested_texts(levels):
+            docs.append(("talent", f"{name}: {text}"))
+    return docs
+
+
+def archetype_documents(archetype_info: dict):
+    if archetype_info.get("trait"):
+        return [("trait", archetype_info["trait"])]
+    return []
+
+
+def skill_documents(skill_info: dict):
+    levels = [
+        skill_info[key] for key in
+        ["l1", "l2", "l3", "l4", "l5", "l6", "l7", "m1", "m2", "m3"]
+        if skill_info.get(key)
+    ]
+    texts = nested_texts(
+        {i: level.get("skill_description") for i, level in enumerate(levels)}
+    )
+    return [("skill_description", text) for text in texts]
+
+
+def module_documents(module_info: dict):
+    docs = []
+    if module_info.get("level_1_trait_upgrade"):
+        docs.append(("trait_upgrade", module_info["level_1_trait_upgrade"]))
+    talents = {
+        key: module_info.get(key)
+        for key in ["level_2_talent", "level_3_talent"]
+    }
+    for level in talents.values():
+        for name, levels in (level or {}).items():
+            for text in nested_texts(levels):
+                docs.append(("module_talent", f"{name}: {text}"))
+    return docs
+
+
+def index_documents(entity: str, entity_id: int, name: str, docs: list):
+    ''' Replaces the search documents stored for one entity with docs, a
+        list of (field, content) pairs. Nothing is written if the stored
+        documents already match, returns whether they were replaced.
+    '''
+    s_q = Query("search_documents").select("name, field, content")
+    s_q.where({"entity": entity, "entity_id": entity_id})
+    s_q.order_by("search_document_id")
+    fresh = [[name, field, content] for field, content in docs]
+    if run(s_q(), "rows") == fresh:
+        return False
+    d_q = Query("search_documents").delete()
+    d_q.where({"entity": entity, "entity_id": entity_id})
+    run(d_q())
+    if docs != []:
+        i_q = Query("search_documents").insert(
+            ["entity", "entity_id", "name", "field", "content"],
+            [[entity, entity_id, name, field, content]
+             for field, content in docs]
+        )
+        run(i_q())
+    return True
+
+
+def search(text: str, entity: str = None, field: str = None,
+           limit: int = 20):
+    ''' Full text search over the indexed descriptions, returning matches
+        best first with their rank.
+    '''
+    q = Query("search_documents").select(
+        "entity, entity_id, name, field, content"
+    ).search(text).limit(limit)
+    filters = {"entity": entity, "field": field}
+    q.where({key: filters[key] for key in filters if filters[key]})
+    return run(q())
@@ -0,0 +1,19 @@
+from src.utils.sqlite_snapshot import export_sqlite
+from src.utils.mmap_snapshot import export_mmap
+from src.utils.connect import load_env
+from os import getenv
+
+
+def export_snapshots():
+    ''' Rebuilds the read snapshots configured in the environment, called at
+        the end of each ingest run. SQLITE_SNAPSHOT names the SQLite file and
+        MMAP_SNAPSHOT the memory mapped document file.
+
+        API workers notice the new snapshots themselves, through the file
+        swap or the change log, see freshness.data_version.
+    '''
+    load_env()
+    if getenv("SQLITE_SNAPSHOT"):
+        export_sqlite(getenv("SQLITE_SNAPSHOT"))
+    if getenv("MMAP_SNAPSHOT"):
+        export_mmap(getenv("MMAP_SNAPSHOT"))
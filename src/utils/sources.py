@@ -0,0 +1,474 @@
+from abc import ABC, abstractmethod
+from os import path
+from src.utils.scraper import scrape, operator_list, skip_list
+from src.utils.insert import insert
+from src.utils.snapshots import export_snapshots
+from src.utils.ranges import range_masks, range_mask
+from src.utils.records import to_records
+import json
+import re
+
+
+class Source(ABC):
+    ''' Base class for somewhere operator data can be loaded from.
+
+        Subclasses provide names(), the keys of every operator the source
+        holds, and load(name), which returns the same records tuple,
+        (operator_info, archetype_info, skill_info, modules, tags), that
+        scrape() does so it can be passed straight to insert().
+    '''
+
+    @abstractmethod
+    def names(self):
+        pass
+
+    @abstractmethod
+    def load(self, name):
+        pass
+
+
+class GamepressSource(Source):
+    ''' Scrapes operator pages from gamepress, one request per operator. '''
+
+    def names(self):
+        return [
+            name for name, server in operator_list()
+            if server == "na" and name not in skip_list
+        ]
+
+    def load(self, name):
+        return scrape(name)
+
+
+class MissingTableErr(Exception):
+    pass
+
+
+professions = {
+    "PIONEER": "Vanguard",
+    "WARRIOR": "Guard",
+    "TANK": "Defender",
+    "SNIPER": "Sniper",
+    "CASTER": "Caster",
+    "MEDIC": "Medic",
+    "SUPPORT": "Supporter",
+    "SPECIAL": "Specialist"
+}
+
+attribute_lookup = {
+    "MAX_HP": "HP",
+    "ATK": "ATK",
+    "DEF": "DEF",
+    "MAGIC_RESISTANCE": "Arts Resist",
+    "COST": "DP Cost",
+    "ATTACK_SPEED": "ASPD",
+    "RESPAWN_TIME": "Redeploy Time"
+}
+
+# Older dumps store enums as their index rather than their name.
+attribute_indexes = [
+    "MAX_HP", "ATK", "DEF", "MAGIC_RESISTANCE", "COST", "BLOCK_CNT",
+    "MOVE_SPEED", "ATTACK_SPEED", "BASE_ATTACK_TIME", "RESPAWN_TIME"
+]
+
+favor_lookup = {"maxHp": "HP", "atk": "ATK", "def": "DEF"}
+
+module_stat_lookup = {
+    "max_hp": "HP",
+    "atk": "ATK",
+    "def": "DEF",
+    "cost": "DP Cost",
+    "attack_speed": "ASPD",
+    "respawn_time": "Redeploy Time"
+}
+
+sp_types = {
+    "INCREASE_WITH_TIME": "Auto Recovery",
+    "INCREASE_WHEN_ATTACK": "Offensive Recovery",
+    "INCREASE_WHEN_TAKEN_DAMAGE": "Defensive Recovery",
+    1: "Auto Recovery",
+    2: "Offensive Recovery",
+    4: "Defensive Recovery",
+    8: "Passive"
+}
+
+skill_types = {
+    "PASSIVE": "Passive",
+    "MANUAL": "Manual Trigger",
+    "AUTO": "Auto Trigger",
+    0: "Passive",
+    1: "Manual Trigger",
+    2: "Auto Trigger"
+}
+
+skill_level_lookup = ["l1", "l2", "l3", "l4", "l5", "l6", "l7", "m1", "m2",
+                      "m3"]
+
+rarity_tags = {6: "Top Operator", 5: "Senior Operator", 2: "Starter",
+               1: "Robot"}
+
+free_approaches = ["Activity Acquisition", "Event Reward", "Main Story",
+                   "Code Redemption", "Anniversary Reward"]
+
+markup_pattern = re.compile(r"<[@$/][^>]*>")
+template_pattern = re.compile(r"\{(-?)([^}:]+)(?::([^}]*))?\}")
+recruit_name_pattern = re.compile(r"<@rc\.eml>([^<]+)</>")
+
+
+def strip_markup(text):
+    ''' Removes the rich text tags (<@ba.vup>, </> ...) game text uses. '''
+    return markup_pattern.sub("", text or "")
+
+
+def render_description(text, blackboard):
+    ''' Strips markup from a game text template and fills in its {key},
+        {key:0%} and {-key:0.0} placeholders from a blackboard list of
+        {"key": ..., "value": ...} dicts.
+    '''
+    values = {item["key"].lower(): item["value"] for item in blackboard or []}
+
+    def fill(match):
+        negate, key, fmt = match.groups()
+        value = values.get(key.lower())
+        if value is None:
+            return match.group(0)
+        if negate:
+            value = -value
+        if fmt and fmt.endswith("%"):
+            return f"{round(value * 100)}%"
+        if float(value).is_integer():
+            return str(int(value))
+        return str(round(value, 2))
+
+    return template_pattern.sub(fill, strip_markup(text))
+
+
+def phase_number(phase):
+    if isinstance(phase, str):
+        return int(phase.split("_")[-1])
+    return phase
+
+
+def rarity_number(rarity):
+    if isinstance(rarity, str):
+        return int(rarity.split("_")[-1])
+    return rarity + 1
+
+
+def slug(name):
+    slugged = re.sub(r"[^a-z0-9 -]", "", name.lower())
+    return "-".join(slugged.split())
+
+
+def range_string(grids):
+    ''' Renders a range table grid list in the same box character layout
+        parse_range produces, with the operator's own tile filled.
+    '''
+    tiles = {(grid["row"], grid["col"]) for grid in grids} | {(0, 0)}
+    rows = range(min(t[0] for t in tiles), max(t[0] for t in tiles) + 1)
+    cols = range(min(t[1] for t in tiles), max(t[1] for t in tiles) + 1)
+    lines = []
+    for row in rows:
+        line = ""
+        for col in cols:
+            if (row, col) == (0, 0):
+                line += chr(9632)
+            elif (row, col) in tiles:
+                line += chr(9633)
+            else:
+                line += " "
+        lines.append(line)
+    return "\n".join(lines)
+
+
+class GameDataSource(Source):
+    ''' Builds operators from a local copy of the game's excel data tables,
+        e.g. the gamedata/excel directory of an ArknightsGameData dump.
+
+        Reads character_table, skill_table, uniequip_table,
+        battle_equip_table and range_table, and gacha_table when present to
+        tell which operators are in the recruitment pool. Release dates and
+        limited banners aren't part of these tables, so dates are left empty
+        and every operator is marked released on the dump's server.
+    '''
+
+    tables = ["character_table", "skill_table", "uniequip_table",
+              "battle_equip_table", "range_table"]
+
+    def __init__(self, directory: str, server: str = "en"):
+        self.server = server
+        for table in self.tables:
+            file_path = path.join(directory, table + ".json")
+            if not path.exists(file_path):
+                raise MissingTableErr(f"No {table}.json in {directory}.")
+            with open(file_path, encoding="utf-8") as f:
+                setattr(self, table, json.load(f))
+        self.recruitable = set()
+        gacha_path = path.join(directory, "gacha_table.json")
+        if path.exists(gacha_path):
+            with open(gacha_path, encoding="utf-8") as f:
+                detail = json.load(f).get("recruitDetail", "")
+            self.recruitable = set(recruit_name_pattern.findall(detail))
+
+    def names(self):
+        return [
+            char_id for char_id, char in self.character_table.items()
+            if char_id.startswith("char_")
+            and char.get("profession") in professions
+            and not char.get("isNotObtainable")
+        ]
+
+    def load(self, name):
+        char = self.character_table[name]
+        rarity = rarity_number(char["rarity"])
+        phases = char["phases"]
+        operator_info = self.operator_info(char, rarity)
+        archetype_info = self.archetype_info(char, rarity)
+        skill_info = [
+            self.skill_info(skill["skillId"]) for skill in char["skills"]
+            if skill.get("skillId") in self.skill_table
+        ]
+        modules = self.modules(name, rarity)
+        tags = set(char.get("tagList") or [])
+        tags.add(professions[char["profession"]])
+        tags.add(char["position"].capitalize())
+        if rarity in rarity_tags:
+            tags.add(rarity_tags[rarity])
+        operator_info["level_stats"] = {
+            f"e{i}": {
+                "Base": self.stats(phase, 0),
+                "Max": {
+                    **self.stats(phase, -1),
+                    "Level": phase["attributesKeyFrames"][-1]["level"]
+                }
+            } for i, phase in enumerate(phases)
+        }
+        return to_records(
+            operator_info, archetype_info, skill_info, modules, tags
+        )
+
+    def stats(self, phase, frame):
+        data = phase["attributesKeyFrames"][frame]["data"]
+        return {"ATK": data["atk"], "DEF": data["def"], "HP": data["maxHp"]}
+
+    def operator_info(self, char, rarity):
+        name = char["name"]
+        final = char["phases"][-1]["attributesKeyFrames"][-1]["data"]
+        approach = char.get("itemObtainApproach") or ""
+        released = {"en": self.server == "en", "cn": self.server == "cn"}
+        recruitable = name in self.recruitable
+        operator_info = {
+            "operator_name": name,
+            "gamepress_url_name": slug(name),
+            "gamepress_link": "https://gamepress.gg/arknights/operator/"
+            + slug(name),
+            "rarity": rarity,
+            "description": strip_markup(char.get("itemUsage")),
+            "quote": strip_markup(char.get("itemDesc")),
+            "alter": None,
+            "resist": int(final["magicResistance"]),
+            "redeploy": int(final["respawnTime"]),
+            "cost": int(final["cost"]),
+            "block": int(final["blockCnt"]),
+            "interval": float(final["baseAttackTime"]),
+            "ranges": {
+                f"e{i}": range_string(
+                    self.range_table[phase["rangeId"]]["grids"])
+                for i, phase in enumerate(char["phases"])
+                if phase.get("rangeId") in self.range_table
+            },
+            "potentials": self.potentials(char),
+            "trust_stats": self.trust(char),
+            "talents": self.talents(char),
+            "limited": "Limited" in approach,
+            "free": approach in free_approaches
+        }
+        operator_info["range_masks"] = range_masks(operator_info["ranges"])
+        for server in ["en", "cn"]:
+            prefix = server.upper()
+            operator_info[f"{prefix}_released"] = released[server]
+            operator_info[f"{prefix}_release_date"] = None
+            operator_info[f"{prefix}_recruitable"] = (
+                released[server] and recruitable
+            )
+            operator_info[f"{prefix}_recruitment_added"] = None
+        return operator_info
+
+    def archetype_info(self, char, rarity):
+        phases = char["phases"]
+        frames = [phase["attributesKeyFrames"][0]["data"] for phase in phases]
+        sub_profs = self.uniequip_table.get("subProfDict", {})
+        sub_prof = sub_profs.get(char["subProfessionId"], {})
+        archetype_name = sub_prof.get(
+            "subProfessionName", char["subProfessionId"])
+        if rarity == 1:
+            archetype_name += " (1*)"
+        trait = char.get("description") or ""
+        if char.get("trait"):
+            candidate = char["trait"]["candidates"][-1]
+            trait = candidate.get("overrideDescripton") or trait
+            trait = render_description(trait, candidate.get("blackboard"))
+        else:
+            trait = strip_markup(trait)
+        if char["profession"] == "MEDIC":
+            attack_type = "Healing"
+        elif "Arts damage" in trait or char["profession"] == "CASTER":
+            attack_type = "Arts"
+        else:
+            attack_type = "Physical"
+
+        def gain(stat, phase):
+            if len(frames) <= phase:
+                return None
+            return frames[phase][stat] > frames[phase - 1][stat]
+
+        return {
+            "class_name": professions[char["profession"]],
+            "archetype_name": archetype_name,
+            "trait": trait,
+            "position": char["position"].capitalize(),
+            "attack_type": attack_type,
+            "cost_on_e1": gain("cost", 1),
+            "cost_on_e2": gain("cost", 2),
+            "block_on_e1": gain("blockCnt", 1),
+            "block_on_e2": gain("blockCnt", 2)
+        }
+
+    def potentials(self, char):
+        output = {}
+        for i, rank in enumerate(char.get("potentialRanks") or []):
+            modifiers = []
+            if rank.get("buff"):
+                modifiers = rank["buff"]["attributes"].get(
+                    "attributeModifiers") or []
+            if modifiers:
+                attribute = modifiers[0]["attributeType"]
+                if isinstance(attribute, int):
+                    attribute = attribute_indexes[attribute]
+                stat = attribute_lookup.get(attribute, attribute)
+                output[f"pot{i+2}"] = {stat: int(modifiers[0]["value"])}
+            else:
+                output[f"pot{i+2}"] = rank["description"]
+        return output
+
+    def trust(self, char):
+        frames = char.get("favorKeyFrames") or []
+        if not frames:
+            return {}
+        data = frames[-1]["data"]
+        return {
+            favor_lookup[key]: int(data[key]) for key in favor_lookup
+            if data.get(key)
+        }
+
+    def talents(self, char):
+        talents = {}
+        for talent in char.get("talents") or []:
+            for candidate in talent.get("candidates") or []:
+                if not candidate.get("name"):
+                    continue
+                cond = candidate["unlockCondition"]
+                t_EL = f"e{phase_number(cond['phase'])}/l{cond['level']}"
+                t_pot = f"pot{candidate['requiredPotentialRank'] + 1}"
+                t_desc = strip_markup(candidate["description"])
+                talents.setdefault(candidate["name"], {}).setdefault(
+                    t_EL, {})[t_pot] = t_desc
+        return talents
+
+    def skill_info(self, skill_id):
+        levels = self.skill_table[skill_id]["levels"]
+        skill = {
+            "skill_name": levels[0]["name"],
+            "sp_type": sp_types.get(levels[0]["spData"]["spType"], "Passive"),
+            "activation_type": skill_types[levels[0]["skillType"]]
+        }
+        range_change = any(level.get("rangeId") for level in levels)
+        for i, level in enumerate(levels[:len(skill_level_lookup)]):
+            duration = level.get("duration") or 0
+            if duration <= 0:
+                duration = "-"
+            elif float(duration).is_integer():
+                duration = str(int(duration))
+            else:
+                duration = str(duration)
+            skill[skill_level_lookup[i]] = {
+                "sp_cost": level["spData"]["spCost"],
+                "initial_sp": level["spData"]["initSp"],
+                "skill_duration": duration,
+                "skill_description": render_description(
+                    level["description"], level.get("blackboard"))
+            }
+            if range_change and level.get("rangeId") in self.range_table:
+                level_range = range_string(
+                    self.range_table[level["rangeId"]]["grids"])
+                skill[skill_level_lookup[i]]["range"] = level_range
+                mask = range_mask(level_range)
+                if mask is not None:
+                    skill[skill_level_lookup[i]]["range_mask"] = mask
+        return skill
+
+    def modules(self, char_id, rarity):
+        modules = []
+        equip_dict = self.uniequip_table.get("equipDict", {})
+        for equip_id in self.uniequip_table.get("charEquip", {}).get(
+                char_id, []):
+            equip = equip_dict.get(equip_id, {})
+            battle = self.battle_equip_table.get(equip_id)
+            if equip.get("type") == "INITIAL" or not battle:
+                continue
+            if len(battle["phases"]) < 3:
+                continue
+            module = {"module_name": equip["uniEquipName"]}
+            for phase in battle["phases"]:
+                level = phase["equipLevel"]
+                module[f"level_{level}_stats"] = {
+                    module_stat_lookup.get(item["key"], item["key"]):
+                    int(item["value"])
+                    for item in phase.get("attributeBlackboard") or []
+                }
+                if level == 1:
+                    module["level_1_trait_upgrade"] = self.trait_upgrade(
+                        phase)
+                else:
+                    module[f"level_{level}_talent"] = self.module_talent(
+                        phase, rarity)
+            modules.append(module)
+        return modules
+
+    def trait_upgrade(self, phase):
+        for part in phase["parts"]:
+            bundle = part.get("overrideTraitDataBundle") or {}
+            for candidate in bundle.get("candidates") or []:
+                text = candidate.get("additionalDescription") or \
+                    candidate.get("overrideDescripton")
+                if text:
+                    return render_description(
+                        text, candidate.get("blackboard"))
+        return ""
+
+    def module_talent(self, phase, rarity):
+        mod_talent = {}
+        for part in phase["parts"]:
+            bundle = part.get("addOrOverrideTalentDataBundle") or {}
+            for candidate in bundle.get("candidates") or []:
+                text = candidate.get("upgradeDescription") or \
+                    candidate.get("description")
+                if not candidate.get("name") or not text:
+                    continue
+                m_t_pot = f"pot{candidate['requiredPotentialRank'] + 1}"
+                mod_talent.setdefault(candidate["name"], {}).setdefault(
+                    f"e2/l{rarity}0", {})[m_t_pot] = render_description(
+                        text, candidate.get("blackboard"))
+        return mod_talent
+
+
+def ingest(source: Source, names: list = None):
+    ''' Loads every operator a source holds, or just the given names, and
+        inserts each one, then refreshes any configured read snapshots.
+        Returns the list of names inserted.
+    '''
+    names = source.names() if names is None else names
+    for name in names:
+        insert(*source.load(name))
+    export_snapshots()
+    return names
@@ -0,0 +1,104 @@
+from src.utils.connect import run, stream
+from src.utils.formatting import idf, lit
+from src.utils.query import Query
+from contextlib import closing
+from datetime import date, datetime
+from os import path, remove, replace
+import sqlite3
+import json
+
+snapshot_tables = [
+    "archetypes",
+    "skills",
+    "modules",
+    "operators",
+    "tags",
+    "operators_tags"
+]
+
+snapshot_indexes = {
+    "archetypes": ["archetype_name"],
+    "skills": ["skill_name"],
+    "modules": ["module_name"],
+    "operators": ["operator_name", "gamepress_url_name", "archetype_id"],
+    "tags": ["tag_name"],
+    "operators_tags": ["operator_id", "tag_id"]
+}
+
+type_affinity = {
+    "smallint": "INTEGER",
+    "integer": "INTEGER",
+    "bigint": "INTEGER",
+    "boolean": "INTEGER",
+    "real": "REAL",
+    "double precision": "REAL",
+    "numeric": "REAL"
+}
+
+
+def table_columns(table: str):
+    ''' Returns a list of (column name, data type) pairs for a postgres
+        table, in column order.
+    '''
+    query = "SELECT column_name, data_type, ordinal_position\n"
+    query += "FROM information_schema.columns\n"
+    query += f"WHERE table_name = {lit(table)};"
+    cols = sorted(run(query), key=lambda col: col["ordinal_position"])
+    return [(col["column_name"], col["data_type"]) for col in cols]
+
+
+def to_sqlite(value):
+    if isinstance(value, (dict, list)):
+        return json.dumps(value)
+    elif isinstance(value, (date, datetime)):
+        return value.isoformat()
+    elif isinstance(value, bool):
+        return int(value)
+    return value
+
+
+def export_sqlite(file_path: str):
+    ''' Copies the schema and every row of the API tables from postgres into
+        a single SQLite file, with the lookup columns indexed.
+
+        The file is built alongside the target and moved into place once
+        complete, so readers never see a half written snapshot. A _columns
+        table records each column's postgres type so run_snapshot can decode
+        JSON and boolean values.
+    '''
+    tmp_path = file_path + ".tmp"
+    if path.exists(tmp_path):
+        remove(tmp_path)
+    with closing(sqlite3.connect(tmp_path)) as db:
+        db.execute(
+            "CREATE TABLE _columns "
+            "(table_name TEXT, column_name TEXT, data_type TEXT);"
+        )
+        for table in snapshot_tables:
+            cols = table_columns(table)
+            col_defs = [
+                f"{idf(name)} {type_affinity.get(data_type, 'TEXT')}"
+                for name, data_type in cols
+            ]
+            col_defs[0] += " PRIMARY KEY"
+            db.execute(f"CREATE TABLE {idf(table)} ({', '.join(col_defs)});")
+            db.executemany(
+                "INSERT INTO _columns VALUES (?, ?, ?);",
+                [(table, name, data_type) for name, data_type in cols]
+            )
+            names = [name for name, _ in cols]
+            rows = stream(Query(table).select(names), "rows")
+            placeholders = ", ".join("?" * len(names))
+            db.executemany(
+                f"INSERT INTO {idf(table)} VALUES ({placeholders});",
+                ([to_sqlite(item) for item in row] for row in rows)
+            )
+            for col in snapshot_indexes[table]:
+                db.execute(
+                    f"CREATE INDEX {idf(f'{table}_{col}_idx')} "
+                    f"ON {idf(table)} ({idf(col)});"
+                )
+        db.commit()
+    replace(tmp_path, file_path)
+    return file_path
+
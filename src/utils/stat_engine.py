@@ -0,0 +1,166 @@
+from src.utils.connect import read
+from src.utils.query import Query
+from src.utils.freshness import Rebuilt
+import numpy as np
+
+stat_names = ["HP", "ATK", "DEF"]
+elites = ["e0", "e1", "e2"]
+module_levels = ["level_1_stats", "level_2_stats", "level_3_stats"]
+
+
+class BadStatParamErr(Exception):
+    pass
+
+
+class StatEngine:
+    ''' Every operator's stat tables held as NumPy arrays, indexed
+        [..., operator, stat] with the stats in stat_names order.
+
+        base and top hold the level 1 and max level stats for each elite
+        stage, missing stages are NaN. pot_bonus is the cumulative flat bonus
+        at each potential, trust_bonus the bonus at full trust and
+        module_bonus the stats of each module slot at each level. compute()
+        combines them for the whole roster in one pass.
+    '''
+
+    def __init__(self, operators: list, archetypes: list, modules: list):
+        n = len(operators)
+        self.operators = operators
+        self.names = np.array([op["operator_name"] for op in operators])
+        arch = {a["archetype_id"]: a for a in archetypes}
+        self.class_names = np.array([
+            arch.get(op["archetype_id"], {}).get("class_name", "")
+            for op in operators
+        ])
+        self.archetype_names = np.array([
+            arch.get(op["archetype_id"], {}).get("archetype_name", "")
+            for op in operators
+        ])
+        self.attack_types = np.array([
+            arch.get(op["archetype_id"], {}).get("attack_type", "")
+            for op in operators
+        ])
+        self.intervals = np.array(
+            [op.get("interval") or 1.0 for op in operators], dtype=float
+        )
+        self.base = np.full((len(elites), n, len(stat_names)), np.nan)
+        self.top = np.full((len(elites), n, len(stat_names)), np.nan)
+        self.max_level = np.ones((len(elites), n))
+        self.pot_bonus = np.zeros((6, n, len(stat_names)))
+        self.trust_bonus = np.zeros((n, len(stat_names)))
+        self.module_bonus = np.zeros(
+            (2, len(module_levels), n, len(stat_names))
+        )
+        mods = {m["module_id"]: m for m in modules}
+        for i, op in enumerate(operators):
+            level_stats = op["level_stats"] or {}
+            for e, elite in enumerate(elites):
+                stage = level_stats.get(elite)
+                if not stage:
+                    continue
+                self.base[e, i] = [stage["Base"][s] for s in stat_names]
+                self.top[e, i] = [stage["Max"][s] for s in stat_names]
+                self.max_level[e, i] = stage["Max"]["Level"]
+            for p in range(2, 7):
+                pot = (op["potentials"] or {}).get(f"pot{p}")
+                if isinstance(pot, dict):
+                    for s, stat in enumerate(stat_names):
+                        self.pot_bonus[p - 1:, i, s] += pot.get(stat, 0)
+            trust = op["trust_stats"] or {}
+            self.trust_bonus[i] = [trust.get(s, 0) for s in stat_names]
+            for slot in range(2):
+                module = mods.get(op.get(f"module_{slot + 1}_id"))
+                if not module:
+                    continue
+                for lv, col in enumerate(module_levels):
+                    m_stats = module[col] or {}
+                    self.module_bonus[slot, lv, i] = [
+                        m_stats.get(s, 0) for s in stat_names
+                    ]
+
+    def compute(self, elite: int = 2, level: int = None, potential: int = 1,
+                trust: int = 0, module: int = 0, module_level: int = 3):
+        ''' Returns an (operators, stats) array of every operator's stats at
+            the given progression. level defaults to each operator's max
+            level for the elite stage and is capped at it, trust is a
+            percentage and module is the slot, 0 for none. Operators that
+            can't reach the elite stage are NaN.
+        '''
+        if elite not in range(len(elites)):
+            raise BadStatParamErr("elite must be 0, 1 or 2.")
+        if potential not in range(1, 7):
+            raise BadStatParamErr("potential must be between 1 and 6.")
+        if module not in range(3) or module_level not in range(1, 4):
+            msg = "module must be 0, 1 or 2 and module_level between 1 and 3."
+            raise BadStatParamErr(msg)
+        if level is not None and level < 1:
+            raise BadStatParamErr("level must be 1 or more.")
+        max_level = self.max_level[elite]
+        if level is None:
+            lv = max_level
+        else:
+            lv = np.minimum(level, max_level)
+        progress = (lv - 1) / np.maximum(max_level - 1, 1)
+        base = self.base[elite]
+        res = base + (self.top[elite] - base) * progress[:, None]
+        res += self.pot_bonus[potential - 1]
+        res += self.trust_bonus * min(max(trust, 0), 100) / 100
+        if module and elite == 2:
+            res += self.module_bonus[module - 1, module_level - 1]
+        return res
+
+    def rank(self, stat: str = "ATK", class_name: str = None,
+             archetype: str = None, limit: int = 20, **params):
+        ''' Returns the operators with the highest value of stat under the
+            compute() params, optionally limited to a class or archetype.
+        '''
+        if stat not in stat_names:
+            msg = f'"{stat}" is not a stat, use one of: '
+            msg += ", ".join(stat_names)
+            raise BadStatParamErr(msg)
+        if limit < 1:
+            raise BadStatParamErr("limit must be 1 or more.")
+        stats = self.compute(**params)
+        values = stats[:, stat_names.index(stat)]
+        mask = ~np.isnan(values)
+        if class_name:
+            mask &= np.char.lower(self.class_names) == class_name.lower()
+        if archetype:
+            mask &= np.char.lower(self.archetype_names) == archetype.lower()
+        found = np.flatnonzero(mask)
+        order = found[np.argsort(-values[found], kind="stable")][:limit]
+        return [
+            {
+                "operator_name": str(self.names[i]),
+                **{s: round(float(stats[i, j]))
+                   for j, s in enumerate(stat_names)}
+            }
+            for i in order
+        ]
+
+
+op_q = Query("operators").select([
+    "operator_id", "operator_name", "archetype_id", "interval",
+    "level_stats", "potentials", "trust_stats", "skill_1_id",
+    "skill_2_id", "skill_3_id", "module_1_id", "module_2_id"
+]).freeze()
+arch_q = Query("archetypes").select(
+    ["archetype_id", "class_name", "archetype_name", "attack_type"]
+).freeze()
+mod_q = Query("modules").select(["module_id"] + module_levels).freeze()
+
+
+def build_engine():
+    return StatEngine(read(op_q), read(arch_q), read(mod_q))
+
+
+engines = Rebuilt()
+
+
+def get_engine():
+    ''' Returns the cached engine, rebuilt once the data changes. '''
+    return engines.get(None, build_engine)
+
+
+def invalidate():
+    engines.clear()
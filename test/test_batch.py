@@ -0,0 +1,45 @@
+from src.utils.batch import (
+    BadFieldErr,
+    BatchTooLargeErr,
+    operator_columns,
+    batch_query,
+    get_operators
+)
+from unittest.mock import patch
+import pytest
+
+
+class Test_batch_query:
+    def test_selects_requested_columns_for_names_and_ids(self):
+        q = batch_query(["lemon", "lime"], [3], ["rarity", "EN_released"])
+        expected = "SELECT operator_id, rarity, en_released FROM operators"
+        expected += "\nWHERE operator_name IN ('lemon', 'lime')"
+        expected += "\nOR gamepress_url_name IN ('lemon', 'lime')"
+        expected += "\nOR operator_id IN (3);"
+        assert str(q) == expected
+
+    def test_defaults_to_every_column_without_duplicate_ids(self):
+        q = batch_query(ids=[1, 1])
+        assert q.cols == operator_columns
+        assert str(q).endswith("WHERE operator_id IN (1);")
+
+    def test_rejects_unknown_fields_and_large_batches(self):
+        with pytest.raises(BadFieldErr):
+            batch_query(["lemon"], cols=["rarity", "banana"])
+        with pytest.raises(BatchTooLargeErr):
+            batch_query(ids=list(range(101)))
+
+
+class Test_get_operators:
+    @patch("src.utils.batch.read")
+    def test_runs_one_query(self, m_read):
+        m_read.return_value = [{"operator_id": 1}]
+        assert get_operators(["lemon"], cols=["rarity"]) == [
+            {"operator_id": 1}
+        ]
+        m_read.assert_called_once()
+
+    @patch("src.utils.batch.read")
+    def test_skips_db_without_names_or_ids(self, m_read):
+        assert get_operators() == []
+        m_read.assert_not_called()
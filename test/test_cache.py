@@ -0,0 +1,56 @@
+from src.utils.cache import ResponseCache
+from unittest.mock import patch
+
+
+class Test_ResponseCache:
+    def test_get_and_set(self):
+        cache = ResponseCache()
+        assert cache.get("a") is None
+        cache.set("a", 1, [("operators", 1)])
+        assert cache.get("a") == 1
+
+    @patch("src.utils.cache.monotonic")
+    def test_expires_after_ttl(self, m_time):
+        cache = ResponseCache(ttl=10)
+        m_time.return_value = 0
+        cache.set("a", 1, [])
+        m_time.return_value = 11
+        assert cache.get("a", "gone") == "gone"
+        assert cache.entries == {}
+
+    def test_evict_drops_only_matching_rows_and_table_entries(self):
+        cache = ResponseCache()
+        cache.set("op1", 1, [("operators", 1)])
+        cache.set("op2", 2, [("operators", 2), ("skills", 5)])
+        cache.set("miss", [], [("operators", None)])
+        cache.set("skill", 3, [("skills", 6)])
+        assert cache.evict("operators", [2]) == 2
+        assert sorted(cache.entries) == ["op1", "skill"]
+        assert ("skills", 5) not in cache.tags
+        assert cache.evict("skills") == 1
+        assert sorted(cache.entries) == ["op1"]
+
+    def test_evicts_oldest_past_max_entries(self):
+        cache = ResponseCache(max_entries=2)
+        for key in "abc":
+            cache.set(key, key, [("tags", key)])
+        assert sorted(cache.entries) == ["b", "c"]
+        assert ("tags", "a") not in cache.tags
+
+    def test_set_skips_values_read_before_an_eviction(self):
+        cache = ResponseCache()
+        generation = cache.generation
+        cache.evict("operators", [1])
+        assert cache.set("op1", "stale", [("operators", 1)], generation)
+        assert cache.get("op1") is None
+        cache.set("op1", "fresh", [("operators", 1)], cache.generation)
+        assert cache.get("op1") == "fresh"
+
+    def test_sync_clears_when_version_changes(self):
+        cache = ResponseCache()
+        cache.sync(1)
+        cache.set("a", 1, [])
+        cache.sync(1)
+        assert cache.get("a") == 1
+        cache.sync(2)
+        assert cache.get("a") is None
@@ -0,0 +1,60 @@
+from src.utils.changes import (
+    UnknownActionErr,
+    record_change,
+    changes_since,
+    latest_revision,
+    stream_changes
+)
+from datetime import date
+from unittest.mock import patch
+import pytest
+
+
+class Test_record_change:
+    @patch("src.utils.changes.run")
+    def test_inserts_change_with_json_data(self, m_run):
+        record_change("operator", 4, "updated", {"en_release_date": date(
+            2023, 1, 5)})
+        query = "INSERT INTO change_log\n(entity, entity_id, action, data)"
+        query += "\nVALUES\n('operator', 4, 'updated', "
+        query += "'{\"en_release_date\": \"2023-01-05\"}');"
+        query += "\nSELECT pg_notify('apiknights_changes', "
+        query += "'{\"table\": \"operators\", \"ids\": [4]}');"
+        m_run.assert_called_with(query)
+
+    def test_rejects_unknown_actions(self):
+        with pytest.raises(UnknownActionErr):
+            record_change("operator", 4, "deleted", {})
+
+
+class Test_changes_since:
+    @patch("src.utils.changes.run")
+    def test_selects_after_revision_in_order(self, m_run):
+        changes_since(10, 50)
+        query = "SELECT * FROM change_log\nWHERE revision > 10"
+        query += "\nORDER BY revision ASC\nLIMIT 50;"
+        m_run.assert_called_with(query)
+
+
+class Test_stream_changes:
+    @patch("src.utils.changes.changes_since")
+    def test_pages_until_a_short_page(self, m_since):
+        m_since.side_effect = [
+            [{"revision": 1}, {"revision": 2}],
+            [{"revision": 3}]
+        ]
+        res = list(stream_changes(0, page_size=2))
+        assert [c["revision"] for c in res] == [1, 2, 3]
+        assert [c[0] for c in m_since.call_args_list] == [(0, 2), (2, 2)]
+
+
+class Test_latest_revision:
+    @patch("src.utils.changes.run")
+    def test_returns_newest_revision_or_zero(self, m_run):
+        m_run.return_value = [{"revision": 9}]
+        assert latest_revision() == 9
+        query = "SELECT revision FROM change_log"
+        query += "\nORDER BY revision DESC\nLIMIT 1;"
+        m_run.assert_called_with(query)
+        m_run.return_value = []
+        assert latest_revision() == 0
@@ -0,0 +1,107 @@
+from src.utils.compression import (
+    CompressedCache,
+    accepted_encodings,
+    negotiate,
+    compress,
+    compressed_response,
+    min_size
+)
+from unittest.mock import Mock, patch
+import gzip
+
+body = b'{"talents": "' + b"ATK +10% " * 100 + b'"}'
+
+
+class Test_negotiate:
+    def test_parses_q_values_and_drops_refused(self):
+        assert accepted_encodings("gzip;q=0.5, br, identity;q=0") == {
+            "gzip": 0.5, "br": 1.0
+        }
+        assert accepted_encodings(None) == {}
+
+    def test_prefers_brotli_when_installed(self):
+        assert negotiate("gzip, br") == "br"
+        assert negotiate("gzip;q=1, br;q=0.5") == "gzip"
+        assert negotiate("*") == "br"
+        assert negotiate("deflate") == "identity"
+
+    @patch("src.utils.compression.brotli", None)
+    def test_falls_back_to_gzip_without_brotli(self):
+        assert negotiate("gzip, br") == "gzip"
+        assert negotiate("br") == "identity"
+
+
+class Test_CompressedCache:
+    def test_compresses_once_per_version_and_encoding(self):
+        cache = CompressedCache()
+        body_fn = Mock(return_value=body)
+        first = cache.get("v1", "gzip", body_fn)
+        assert cache.get("v1", "gzip", body_fn) is first
+        assert body_fn.call_count == 1
+        assert gzip.decompress(first[0]) == body
+        assert first[1] == "gzip"
+        cache.get("v1", "br", body_fn)
+        assert body_fn.call_count == 2
+
+    def test_leaves_small_bodies_alone(self):
+        cache = CompressedCache()
+        small = b"{}"
+        assert len(small) < min_size
+        assert cache.get("v1", "gzip", lambda: small) == (small, "identity")
+
+    def test_drops_oldest_past_max_entries(self):
+        cache = CompressedCache(max_entries=1)
+        cache.get("v1", "gzip", lambda: body)
+        cache.get("v2", "gzip", lambda: body)
+        assert list(cache.entries) == [("v2", "gzip")]
+
+
+class Test_compressed_response:
+    def test_sets_encoding_and_cache_headers(self):
+        res = compressed_response(
+            CompressedCache(), "v1", lambda: body, accept_encoding="gzip"
+        )
+        assert res.headers["content-encoding"] == "gzip"
+        assert res.headers["etag"] == '"v1-gzip"'
+        assert res.headers["vary"] == "Accept-Encoding"
+        assert res.body == compress(body, "gzip")
+
+    def test_not_modified_when_etag_matches(self):
+        body_fn = Mock()
+        res = compressed_response(
+            CompressedCache(), "v1", body_fn, if_none_match='"v0", "v1"'
+        )
+        assert res.status_code == 304
+        body_fn.assert_not_called()
+
+    def test_etag_differs_per_encoding(self):
+        cache = CompressedCache()
+        gzipped = compressed_response(
+            cache, "v1", lambda: body, accept_encoding="gzip"
+        )
+        res = compressed_response(
+            cache, "v1", lambda: body, if_none_match=gzipped.headers["etag"]
+        )
+        assert res.status_code == 200
+        assert res.headers["etag"] == '"v1"'
+        assert res.body == body
+
+    def test_weak_etags_match(self):
+        res = compressed_response(
+            CompressedCache(), "v1", lambda: body, accept_encoding="gzip",
+            if_none_match='W/"v1-gzip"'
+        )
+        assert res.status_code == 304
+
+    def test_small_body_etag_names_applied_encoding(self):
+        cache = CompressedCache()
+        res = compressed_response(
+            cache, "v1", lambda: b"{}", accept_encoding="gzip"
+        )
+        assert "content-encoding" not in res.headers
+        assert res.headers["etag"] == '"v1"'
+        res = compressed_response(
+            cache, "v1", lambda: b"{}", accept_encoding="gzip",
+            if_none_match='"v1"'
+        )
+        assert res.status_code == 304
@@ -1,5 +1,14 @@
-from src.utils.connect import connect, run
+from src.utils.connect import (
+    connect,
+    postgres_configured,
+    run,
+    stream,
+    read,
+    translate,
+    SnapshotQueryErr
+)
 from unittest.mock import Mock, patch
+import pytest
 
 
 class Test_connect:
@@ -15,6 +24,16 @@ class Test_connect:
         )
 
 
+class Test_postgres_configured:
+    @patch("src.utils.connect.getenv")
+    def test_true_only_when_a_user_is_set(self, m_env):
+        m_env.return_value = None
+        assert not postgres_configured()
+        m_env.return_value = "lemon"
+        assert postgres_configured()
+        m_env.assert_called_with("PGUSER")
+
+
 class Test_run:
     @patch("src.utils.connect.connect")
     def test_queries_db_with_passed_query(self, m_connect):
@@ -124,3 +143,133 @@ class Test_run:
         m_db.columns = [{"name": "fruit"}]
         m_con.return_value.__enter__.return_value = m_db
         assert run("", "banana") == [{"fruit": "banana"}]
+
+
+class Test_run_return_types:
+    def mock_db(self, m_con):
+        m_db = Mock()
+        m_db.run.return_value = [["banana", "yellow"], ["lime", "green"]]
+        m_db.columns = [{"name": "fruit"}, {"name": "colour"}]
+        m_con.return_value.__enter__.return_value = m_db
+        return m_db
+
+    @patch("src.utils.connect.connect")
+    def test_rows_are_returned_as_is(self, m_con):
+        m_db = self.mock_db(m_con)
+        assert run("", "rows") is m_db.run.return_value
+
+    @patch("src.utils.connect.connect")
+    def test_namedtuples_have_a_field_per_col(self, m_con):
+        self.mock_db(m_con)
+        res = run("", "namedtuples")
+        assert res == [("banana", "yellow"), ("lime", "green")]
+        assert res[1].fruit == "lime"
+        assert res[1]._asdict() == {"fruit": "lime", "colour": "green"}
+
+    @patch("src.utils.connect.connect")
+    def test_namedtuples_rename_invalid_headings(self, m_con):
+        m_db = self.mock_db(m_con)
+        m_db.columns = [{"name": "fruit"}, {"name": "?column?"}]
+        assert run("", "namedtuples")[0]._1 == "yellow"
+
+    @patch("src.utils.connect.connect")
+    def test_columns_gives_a_list_per_col(self, m_con):
+        self.mock_db(m_con)
+        assert run("", "columns") == {
+            "fruit": ["banana", "lime"], "colour": ["yellow", "green"]
+        }
+
+    @patch("src.utils.connect.connect")
+    def test_columns_are_empty_lists_for_no_rows(self, m_con):
+        m_db = self.mock_db(m_con)
+        m_db.run.return_value = None
+        assert run("", "columns") == {"fruit": [], "colour": []}
+
+
+class Test_stream:
+    def mock_db(self, m_con, batches):
+        m_db = Mock()
+        fetches = iter(batches)
+
+        def fake_run(sql):
+            if sql.startswith("FETCH"):
+                return next(fetches)
+            return None
+
+        m_db.run.side_effect = fake_run
+        m_db.columns = [{"name": "fruit"}]
+        m_con.return_value.__enter__.return_value = m_db
+        return m_db
+
+    @patch("src.utils.connect.connect")
+    def test_fetches_batches_through_a_cursor(self, m_con):
+        m_db = self.mock_db(m_con, [[["a"], ["b"]], [["c"]]])
+        rows = stream("SELECT fruit FROM fruits;", batch_size=2)
+        assert list(rows) == [{"fruit": "a"}, {"fruit": "b"}, {"fruit": "c"}]
+        sent = [call.args[0] for call in m_db.run.call_args_list]
+        assert sent == [
+            "START TRANSACTION READ ONLY;",
+            "DECLARE apiknights_stream NO SCROLL CURSOR FOR "
+            "SELECT fruit FROM fruits;",
+            "FETCH FORWARD 2 FROM apiknights_stream;",
+            "FETCH FORWARD 2 FROM apiknights_stream;",
+            "ROLLBACK;"
+        ]
+
+    @patch("src.utils.connect.connect")
+    def test_yields_rows_before_fetching_more(self, m_con):
+        m_db = self.mock_db(m_con, [[["a"], ["b"]], [["c"], ["d"]], []])
+        rows = stream("", "rows", batch_size=2)
+        assert next(rows) == ["a"]
+        fetched = [
+            call for call in m_db.run.call_args_list
+            if call.args[0].startswith("FETCH")
+        ]
+        assert len(fetched) == 1
+
+    @patch("src.utils.connect.connect")
+    def test_closing_early_ends_the_transaction(self, m_con):
+        m_db = self.mock_db(m_con, [[["a"], ["b"]]])
+        rows = stream("", batch_size=2)
+        next(rows)
+        rows.close()
+        m_db.run.assert_called_with("ROLLBACK;")
+
+    @patch("src.utils.connect.connect")
+    def test_unstreamable_return_types_fall_back_to_dicts(self, m_con):
+        self.mock_db(m_con, [[["a"]]])
+        assert list(stream("", "columns")) == [{"fruit": "a"}]
+
+
+class Test_translate:
+    def test_rewrites_postgres_casts_as_sqlite_casts(self):
+        query = "SELECT * FROM a\nWHERE (b->'c'->>'d')::int >= 5;"
+        expected = "SELECT * FROM a\nWHERE CAST(b->'c'->>'d' AS INTEGER) >= 5;"
+        assert translate(query) == expected
+
+    def test_leaves_plain_queries_untouched(self):
+        assert translate("SELECT * FROM a;") == "SELECT * FROM a;"
+
+    def test_raises_SnapshotQueryErr_for_containment(self):
+        with pytest.raises(SnapshotQueryErr):
+            translate("SELECT * FROM a WHERE b @> '{}';")
+
+
+class Test_read:
+    @patch("src.utils.connect.run_snapshot")
+    @patch("src.utils.connect.run")
+    @patch("src.utils.connect.getenv")
+    def test_uses_postgres_without_snapshot(self, m_env, m_run, m_snap):
+        m_env.return_value = None
+        read("banana")
+        m_run.assert_called_with("banana", {})
+        m_snap.assert_not_called()
+
+    @patch("src.utils.connect.run_snapshot")
+    @patch("src.utils.connect.run")
+    @patch("src.utils.connect.getenv")
+    def test_uses_snapshot_when_configured(self, m_env, m_run, m_snap):
+        m_env.return_value = "snap.db"
+        read("banana", [])
+        m_snap.assert_called_with("banana", [])
+        m_run.assert_not_called()
@@ -0,0 +1,153 @@
+from src.utils.dps import (
+    DpsCalculator,
+    skill_duration,
+    atk_buff,
+    get_calculator
+)
+from src.utils.stat_engine import StatEngine, BadStatParamErr
+from unittest.mock import patch
+import numpy as np
+import pytest
+
+
+def stage(atk):
+    return {
+        "Base": {"HP": 100, "ATK": atk, "DEF": 10},
+        "Max": {"HP": 100, "ATK": atk, "DEF": 10, "Level": 1}
+    }
+
+
+def operator(op_id, name, archetype_id, interval, atk, skill_ids):
+    op = {
+        "operator_id": op_id, "operator_name": name,
+        "archetype_id": archetype_id, "interval": interval,
+        "level_stats": {"e0": stage(atk)}, "potentials": {},
+        "trust_stats": {}, "module_1_id": None, "module_2_id": None
+    }
+    for slot, skill_id in enumerate(skill_ids, 1):
+        op[f"skill_{slot}_id"] = skill_id
+    return op
+
+
+def skill(skill_id, sp_type, activation, sp_cost, duration, desc):
+    level = {"sp_cost": sp_cost, "initial_sp": 0,
+             "skill_duration": duration, "skill_description": desc}
+    return {"skill_id": skill_id, "skill_name": f"S{skill_id}",
+            "sp_type": sp_type, "activation_type": activation,
+            "l7": level}
+
+
+archetypes = [
+    {"archetype_id": 1, "class_name": "Sniper", "archetype_name": "Marks",
+     "attack_type": "Physical"},
+    {"archetype_id": 2, "class_name": "Caster", "archetype_name": "Core",
+     "attack_type": "Arts"},
+    {"archetype_id": 3, "class_name": "Medic", "archetype_name": "Medic",
+     "attack_type": "Healing"}
+]
+operators = [
+    operator(1, "Lemon", 1, 1.0, 500, [1, 2]),
+    operator(2, "Lime", 2, 2.0, 400, [3]),
+    operator(3, "Pear", 3, 1.0, 300, [4])
+]
+skills = [
+    skill(1, "Auto Recovery", "Manual Trigger", 30, "10", "ATK +100%"),
+    skill(2, "Offensive Recovery", "Auto Trigger", 4, "-", "ATK +200%"),
+    skill(3, "Auto Recovery", "Passive", 0, "-", "ATK +50%"),
+    skill(4, "Defensive Recovery", "Manual Trigger", 10, "20", "Heals")
+]
+
+
+def calculator():
+    engine = StatEngine(operators, archetypes, [])
+    return DpsCalculator(engine, skills)
+
+
+class Test_helpers:
+    def test_skill_duration_treats_non_numbers_as_instant(self):
+        assert skill_duration("12.5") == 12.5
+        assert skill_duration("-") == 0
+        assert skill_duration(None) == 0
+
+    def test_atk_buff_sums_atk_percentages(self):
+        assert atk_buff("ATK +30%, then ATK +20%") == 0.5
+        assert atk_buff("DEF +30%") == 0
+        assert atk_buff(None) == 0
+
+
+class Test_DpsCalculator:
+    def test_builds_one_pair_per_operator_skill(self):
+        calc = calculator()
+        assert calc.op_index.tolist() == [0, 0, 1, 2]
+        assert calc.slots.tolist() == [1, 2, 1, 1]
+        assert calc.duration[6].tolist() == [10, 0, 0, 20]
+        assert np.isnan(calc.sp_cost[0]).all()
+
+    def test_uptime_by_recovery_type(self):
+        res = calculator().compute(elite=0)
+        assert res["uptime"].tolist() == pytest.approx([0.25, 0.2, 1, 0])
+
+    def test_fight_time_uptime_starts_from_initial_sp(self):
+        calc = calculator()
+        res = calc.compute(elite=0, fight_time=60)
+        assert res["uptime"].tolist() == pytest.approx([10 / 60, 0.2, 1, 0])
+        calc.initial_sp[6, 0] = 20
+        res = calc.compute(elite=0, fight_time=60, enemy_def=1)
+        assert res["uptime"][0] == pytest.approx(20 / 60)
+        res = calc.compute(elite=0, fight_time=5, enemy_def=1)
+        assert res["uptime"][0] == 0
+        with pytest.raises(BadStatParamErr):
+            calc.compute(fight_time=0)
+
+    def test_dps_against_def_and_res(self):
+        res = calculator().compute(enemy_def=300, enemy_res=50, elite=0)
+        assert res["dps"].tolist() == pytest.approx([
+            0.75 * 200 + 0.25 * 700,
+            0.8 * 200 + 0.2 * 1200,
+            400 * 1.5 * 0.5 / 2,
+            0
+        ])
+
+    def test_physical_damage_floors_at_five_percent(self):
+        res = calculator().compute(enemy_def=5000, elite=0)
+        assert res["dps"][0] == pytest.approx(0.75 * 25 + 0.25 * 50)
+
+    def test_missing_levels_are_nan_and_bad_levels_raise(self):
+        calc = calculator()
+        assert np.isnan(calc.compute(skill_level="l1", elite=0)["dps"]).all()
+        with pytest.raises(BadStatParamErr):
+            calc.compute(skill_level="l8")
+        with pytest.raises(BadStatParamErr):
+            calc.rank(limit=0)
+
+    def test_caches_results_by_params(self):
+        calc = calculator()
+        with patch.object(calc.engine, "compute",
+                          wraps=calc.engine.compute) as m_compute:
+            first = calc.compute(enemy_def=100, elite=0)
+            assert calc.compute(enemy_def=100, elite=0) is first
+            calc.compute(enemy_def=200, elite=0)
+            assert m_compute.call_count == 2
+
+    def test_rank_sorts_by_dps_and_filters_class(self):
+        calc = calculator()
+        res = calc.rank(elite=0)
+        assert [(r["operator_name"], r["skill_slot"]) for r in res] == [
+            ("Lemon", 2), ("Lemon", 1), ("Lime", 1), ("Pear", 1)
+        ]
+        res = calc.rank(class_name="caster", elite=0)
+        assert res == [{"operator_name": "Lime", "skill_name": "S3",
+                        "skill_slot": 1, "dps": 300.0, "uptime": 1.0}]
+
+
+class Test_get_calculator:
+    @patch("src.utils.dps.read")
+    @patch("src.utils.dps.get_engine")
+    def test_rebuilds_only_with_a_new_engine(self, m_engine, m_read):
+        m_engine.return_value = StatEngine(operators, archetypes, [])
+        m_read.return_value = skills
+        calc = get_calculator()
+        assert get_calculator() is calc
+        m_engine.return_value = StatEngine(operators, archetypes, [])
+        assert get_calculator() is not calc
+        assert m_read.call_count == 2
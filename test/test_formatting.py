@@ -2,6 +2,8 @@ from src.utils.formatting import (
     j_d,
     idf,
     lit,
+    jp,
+    idf_str,
     MismatchKeysErr
 )
 import pytest
@@ -12,11 +14,19 @@ import json
 
 class Test_j_d:
     def test_j_d_converts_dicts_to_valid_json_format(self):
-        test_dict = {"apple": "banana"}
-        test_json = json.dumps(test_dict)
+        test_dict = {"apple": "banana", "cherry": [1, {"date": None}]}
         out = j_d(test_dict)
         assert isinstance(out, str)
-        assert j_d(test_dict) == test_json
+        assert json.loads(out) == test_dict
+
+    def test_j_d_output_is_compact(self):
+        assert j_d({"apple": [1, 2]}) == '{"apple":[1,2]}'
+
+    def test_j_d_stringifies_non_str_keys(self):
+        assert json.loads(j_d({5: "sick"})) == {"5": "sick"}
+
+    def test_j_d_falls_back_to_json_for_huge_ints(self):
+        assert j_d({"apple": 2 ** 70}) == json.dumps({"apple": 2 ** 70})
 
     def test_j_d_ignores_non_dicts(self):
         test_str = "apple"
@@ -97,3 +107,51 @@ class Test_lit:
         test_valid_str = "'banana''s'"
         assert lit(test_str) == test_valid_str
         assert lit(test_valid_str) == test_valid_str
+
+    def test_strips_every_layer_of_surrounding_quotes(self):
+        assert lit("''a''") == "'a'"
+        assert lit("'''banana'''") == "'banana'"
+        assert lit("''") == "''"
+        assert lit("'") == "''''"
+
+    def test_matches_literal_for_every_fast_path_type(self):
+        values = [
+            "it's", "", 0, -3, 2.5, float("inf"), True, False, None,
+            {"quote": "it's"}
+        ]
+        for value in values:
+            assert lit(value) == literal(j_d(value))
+        assert lit([values]) == [[literal(j_d(value)) for value in values]]
+
+    def test_subclasses_go_through_literal(self):
+        class Level(int):
+            def __str__(self):
+                return "level"
+
+        assert lit(Level(5)) == "level"
+
+
+class Test_idf_cache:
+    def test_repeated_names_are_served_from_cache(self):
+        idf("cache test col")
+        before = idf_str.cache_info().hits
+        assert idf(["cache test col", "cache test col"]) == [
+            '"cache test col"', '"cache test col"'
+        ]
+        assert idf_str.cache_info().hits == before + 2
+
+
+class Test_jp:
+    def test_returns_validated_col_when_path_empty(self):
+        assert jp("apple pie", []) == idf("apple pie")
+
+    def test_walks_path_ending_in_text_step(self):
+        expected = "apple->'e2'->'Max'->>'ATK'"
+        assert jp("apple", ["e2", "Max", "ATK"]) == expected
+
+    def test_last_step_keeps_json_when_as_text_false(self):
+        assert jp("apple", ["e2", 0], as_text=False) == "apple->'e2'->0"
+
+    def test_wraps_expression_in_cast_when_passed(self):
+        expected = "(apple->>'sp_cost')::int"
+        assert jp("apple", ["sp_cost"], cast="int") == expected
@@ -0,0 +1,73 @@
+from src.utils import freshness
+from src.utils.freshness import Rebuilt, data_version, snapshot_version
+from unittest.mock import Mock, patch
+from os import replace
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def fresh_check():
+    freshness.checked = None
+    yield
+    freshness.checked = None
+
+
+class Test_snapshot_version:
+    def test_changes_when_file_swapped(self, tmp_path):
+        file_path = str(tmp_path / "snap.db")
+        assert snapshot_version(file_path) is None
+        with open(file_path, "w") as f:
+            f.write("a")
+        first = snapshot_version(file_path)
+        with open(file_path + ".tmp", "w") as f:
+            f.write("bb")
+        replace(file_path + ".tmp", file_path)
+        assert snapshot_version(file_path) != first
+
+
+class Test_data_version:
+    @patch("src.utils.freshness.latest_revision")
+    @patch("src.utils.freshness.getenv")
+    def test_follows_change_log_without_snapshot(self, m_env, m_latest):
+        m_env.return_value = None
+        m_latest.return_value = 7
+        assert data_version() == 7
+
+    @patch("src.utils.freshness.snapshot_version")
+    @patch("src.utils.freshness.latest_revision")
+    @patch("src.utils.freshness.getenv")
+    def test_follows_snapshot_file_when_configured(
+        self, m_env, m_latest, m_snap
+    ):
+        m_env.return_value = "snap.db"
+        m_snap.return_value = (1, 2, 3)
+        assert data_version() == (1, 2, 3)
+        m_snap.assert_called_with("snap.db")
+        m_latest.assert_not_called()
+
+    @patch("src.utils.freshness.latest_revision")
+    @patch("src.utils.freshness.getenv")
+    def test_reuses_answer_within_max_age(self, m_env, m_latest):
+        m_env.return_value = None
+        m_latest.return_value = 7
+        data_version()
+        m_latest.return_value = 8
+        assert data_version() == 7
+        assert data_version(max_age=-1) == 8
+
+
+class Test_Rebuilt:
+    @patch("src.utils.freshness.data_version")
+    def test_rebuilds_per_key_when_version_moves(self, m_version):
+        m_version.return_value = 1
+        rebuilt = Rebuilt()
+        build = Mock(side_effect=lambda: object())
+        first = rebuilt.get("en", build)
+        assert rebuilt.get("en", build) is first
+        rebuilt.get("cn", build)
+        assert build.call_count == 2
+        m_version.return_value = 2
+        assert rebuilt.get("en", build) is not first
+        assert build.call_count == 3
+        rebuilt.clear()
+        assert rebuilt.values == {}
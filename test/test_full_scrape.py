@@ -0,0 +1,150 @@
+from src.utils.full_scrape import full_scrape, crawl_operator, known_operators
+from src.utils.scraper import fingerprint
+from src.utils.journal import CrawlJournal
+from unittest.mock import patch
+import pytest
+
+pages = {
+    "lemon": "<html><div>Lemon</div></html>",
+    "lime": "<html><div>Lime</div></html>"
+}
+
+
+def fake_fetch(name):
+    return "https://gamepress.gg/arknights/operator/" + name, pages[name]
+
+
+def fake_scrape(name, html):
+    return {"operator_name": name.title()}, {}, [], [], []
+
+
+@pytest.fixture
+def crawl():
+    ''' Patches out the network, the db and the snapshot export, yielding
+        the mocks by name.
+    '''
+    targets = ["fetch", "scrape", "insert", "known_operators",
+               "operator_list", "export_snapshots", "time"]
+    patches = {
+        target: patch(f"src.utils.full_scrape.{target}")
+        for target in targets
+    }
+    mocks = {target: p.start() for target, p in patches.items()}
+    mocks["fetch"].side_effect = fake_fetch
+    mocks["scrape"].side_effect = fake_scrape
+    mocks["known_operators"].return_value = {}
+    mocks["operator_list"].return_value = [("lemon", "na"), ("lime", "na")]
+    yield mocks
+    for p in patches.values():
+        p.stop()
+
+
+@pytest.fixture
+def journal_path(tmp_path):
+    return str(tmp_path / "journal.json")
+
+
+class Test_known_operators:
+    @patch("src.utils.full_scrape.run")
+    def test_maps_url_name_to_hash(self, m_run):
+        m_run.return_value = [
+            {"gamepress_url_name": "lemon", "content_hash": "abc"}
+        ]
+        assert known_operators() == {"lemon": "abc"}
+
+
+class Test_crawl_operator:
+    def test_inserts_with_content_hash(self, crawl, journal_path):
+        journal = CrawlJournal(journal_path)
+        assert crawl_operator("lemon", {}, False, journal)
+        operator_info = crawl["insert"].call_args[0][0]
+        assert operator_info["content_hash"] == fingerprint(pages["lemon"])
+        assert journal.state("lemon") == "inserted"
+
+    def test_skips_unchanged_page_without_parsing(self, crawl, journal_path):
+        journal = CrawlJournal(journal_path)
+        known = {"lemon": fingerprint(pages["lemon"])}
+        assert not crawl_operator("lemon", known, False, journal)
+        crawl["fetch"].assert_called_once()
+        crawl["scrape"].assert_not_called()
+        crawl["insert"].assert_not_called()
+        assert journal.state("lemon") == "skipped"
+
+    def test_new_only_skips_known_without_fetching(self, crawl, journal_path):
+        journal = CrawlJournal(journal_path)
+        assert not crawl_operator("lemon", {"lemon": "old"}, True, journal)
+        crawl["fetch"].assert_not_called()
+        assert journal.state("lemon") == "skipped"
+
+
+class Test_full_scrape:
+    def test_inserts_new_operators_and_exports(self, crawl, journal_path):
+        summary = full_scrape(journal_path=journal_path)
+        assert crawl["insert"].call_count == 2
+        crawl["export_snapshots"].assert_called_once()
+        assert summary["inserted"] == 2
+
+    def test_skips_cn_operators(self, crawl, journal_path):
+        crawl["operator_list"].return_value = [
+            ("lemon", "na"), ("lime", "cn")
+        ]
+        full_scrape(journal_path=journal_path)
+        crawl["fetch"].assert_called_once_with("lemon")
+
+    def test_no_export_when_nothing_inserted(self, crawl, journal_path):
+        crawl["known_operators"].return_value = {
+            name: fingerprint(html) for name, html in pages.items()
+        }
+        summary = full_scrape(new_only=False, journal_path=journal_path)
+        crawl["insert"].assert_not_called()
+        crawl["export_snapshots"].assert_not_called()
+        assert summary["skipped"] == 2
+
+    def test_retries_failures_up_to_max_attempts(self, crawl, journal_path):
+        def insert(operator_info, *data):
+            if operator_info["operator_name"] == "Lime":
+                raise ConnectionError("db went away")
+
+        crawl["insert"].side_effect = insert
+        summary = full_scrape(journal_path=journal_path, max_attempts=3)
+        names = [call[0][0] for call in crawl["fetch"].call_args_list]
+        assert names == ["lemon", "lime", "lime", "lime"]
+        assert summary["inserted"] == 1
+        assert summary["failed"] == 1
+        assert "db went away" in summary["errors"]["lime"]
+        crawl["export_snapshots"].assert_called_once()
+
+    def test_resume_skips_operators_done_earlier(self, crawl, journal_path):
+        CrawlJournal(journal_path).mark("lemon", "inserted")
+        full_scrape(resume=True, journal_path=journal_path)
+        crawl["fetch"].assert_called_once_with("lime")
+
+    def test_resume_retries_earlier_failures(self, crawl, journal_path):
+        journal = CrawlJournal(journal_path, max_attempts=2)
+        journal.mark("lemon", "inserted")
+        journal.mark("lime", "failed", "timeout")
+        summary = full_scrape(resume=True, journal_path=journal_path,
+                              max_attempts=2)
+        crawl["fetch"].assert_called_once_with("lime")
+        assert summary["inserted"] == 2
+
+    def test_resume_from_parsed_uses_saved_page(self, crawl, journal_path):
+        journal = CrawlJournal(journal_path)
+        journal.mark("lemon", "inserted")
+        journal.save_page("lime", pages["lime"])
+        journal.mark("lime", "parsed")
+        summary = full_scrape(resume=True, journal_path=journal_path)
+        crawl["fetch"].assert_not_called()
+        crawl["scrape"].assert_called_once_with("lime", pages["lime"])
+        assert summary["inserted"] == 2
+
+    def test_resume_refetches_when_saved_page_is_gone(self, crawl,
+                                                      journal_path):
+        CrawlJournal(journal_path).mark("lime", "fetched")
+        full_scrape(resume=True, journal_path=journal_path)
+        assert crawl["fetch"].call_count == 2
+
+    def test_without_resume_journal_starts_afresh(self, crawl, journal_path):
+        CrawlJournal(journal_path).mark("lemon", "inserted")
+        full_scrape(journal_path=journal_path)
+        assert crawl["fetch"].call_count == 2
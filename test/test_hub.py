@@ -0,0 +1,95 @@
+from src.utils.hub import Subscription, Hub
+from unittest.mock import patch
+import asyncio
+
+
+def change(revision, entity="operator", action="created"):
+    return {"revision": revision, "entity": entity, "entity_id": revision,
+            "action": action, "data": {"rarity": 6, "alter": None}}
+
+
+class Test_Subscription:
+    def test_filters_by_topic(self):
+        assert Subscription().wants("skill")
+        sub = Subscription(["operator"])
+        assert sub.wants("operator") and not sub.wants("skill")
+
+    def test_drops_oldest_when_full_and_reports_lag(self):
+        async def drain():
+            sub = Subscription(max_queue=2)
+            for i in range(4):
+                sub.offer({"event": i})
+            return [await sub.next() for _ in range(3)]
+        assert asyncio.run(drain()) == [
+            {"event": "lagged", "topic": None, "dropped": 2},
+            {"event": 2},
+            {"event": 3}
+        ]
+
+
+class Test_Hub:
+    def test_publishes_changes_to_matching_subscribers(self):
+        hub = Hub()
+        ops = hub.subscribe(["operator"])
+        skills = hub.subscribe(["skill"])
+        hub.publish_change(change(5, action="updated"))
+        assert skills.queue.empty()
+        assert ops.queue.get_nowait() == {
+            "event": "operator-updated", "topic": "operator",
+            "revision": 5, "entity_id": 5, "columns": ["alter", "rarity"]
+        }
+        assert hub.revision == 5
+
+    def test_unsubscribe_stops_delivery(self):
+        hub = Hub()
+        sub = hub.subscribe()
+        hub.unsubscribe(sub)
+        hub.publish("operator", {"event": "a"})
+        assert sub.queue.empty()
+
+    @patch("src.utils.hub.changes_since")
+    @patch("src.utils.hub.latest_revision")
+    def test_poll_starts_from_latest_then_follows_log(
+        self, m_latest, m_since
+    ):
+        hub = Hub()
+        sub = hub.subscribe()
+        m_latest.return_value = 3
+        m_since.return_value = [change(4), change(5, "skill")]
+        assert asyncio.run(hub.poll()) == 2
+        m_since.assert_called_with(3)
+        assert sub.queue.get_nowait()["event"] == "operator-added"
+        assert sub.queue.get_nowait()["event"] == "skill-added"
+        m_since.return_value = []
+        asyncio.run(hub.poll())
+        m_since.assert_called_with(5)
+        m_latest.assert_called_once()
+
+    @patch("src.utils.hub.changes_since")
+    @patch("src.utils.hub.latest_revision")
+    def test_run_stops_once_no_one_is_subscribed(self, m_latest, m_since):
+        hub = Hub(interval=0)
+        sub = hub.subscribe()
+        m_latest.return_value = 0
+        m_since.side_effect = lambda rev: hub.unsubscribe(sub) or []
+        asyncio.run(hub.run())
+        assert hub.task is None
+
+    @patch("src.utils.hub.changes_since")
+    @patch("src.utils.hub.latest_revision")
+    def test_restarts_from_head_after_idle(self, m_latest, m_since):
+        hub = Hub(interval=0)
+        sub = hub.subscribe()
+        m_latest.return_value = 3
+        m_since.side_effect = lambda rev: hub.unsubscribe(sub) or [
+            change(4)
+        ]
+        asyncio.run(hub.run())
+        assert hub.revision is None
+        sub = hub.subscribe()
+        m_latest.return_value = 9
+        m_since.side_effect = None
+        m_since.return_value = []
+        asyncio.run(hub.poll())
+        m_since.assert_called_with(9)
+        assert sub.queue.empty()
@@ -6,17 +6,27 @@ from src.utils.insert import (
     insert_skill,
     alter_mod,
     add_ids_to_op,
+    normalise,
+    row_changes,
     insert_operator,
     insert_tags,
     insert_operators_tags,
     insert
 )
+from src.utils.records import Operator
 from unittest.mock import patch, call
+from datetime import date
 from copy import deepcopy
 from pg8000.exceptions import DatabaseError
 import pytest
 
 
+@pytest.fixture(autouse=True)
+def m_record():
+    with patch("src.utils.insert.record_change") as m_record:
+        yield m_record
+
+
 class Test_merge:
     def test_returns_empty_dict_when_passed_two_empty_dicts(self):
         assert merge({}, {}) == {}
@@ -56,6 +66,10 @@ class Test_merge:
         }
 
 
+    def test_keeps_none_from_old_when_new_is_missing_key(self):
+        assert merge({"apple": None}, {}) == {"apple": None}
+
+
 class Test_diff:
     def test_returns_empty_dict_when_args_are_same(self):
         assert diff({"one": "two"}, {"one": "two"}) == {}
@@ -73,6 +87,54 @@ class Test_diff:
         ) == {"one": "five"}
 
 
+class Test_normalise:
+    def test_converts_column_date_strings(self):
+        assert normalise("2023/01/05") == date(2023, 1, 5)
+        assert normalise("2023-1-5") == "2023-1-5"
+
+    def test_converts_tuples_but_not_dates_inside_json(self):
+        assert normalise({"a": ("x", "2023/01/05")}) == {
+            "a": ["x", "2023/01/05"]
+        }
+
+
+class Test_row_changes:
+    def test_no_changes_when_fresh_matches_stored_form(self):
+        stored = {
+            "en_released": True,
+            "en_release_date": date(2023, 1, 5),
+            "level_stats": {"e0": {"Max": {"ATK": 10, "Level": 30}}},
+            "alter": None
+        }
+        fresh = {
+            "EN_released": True,
+            "EN_release_date": "2023/01/05",
+            "level_stats": {"e0": {"Max": {"Level": 30, "ATK": 10}}}
+        }
+        assert row_changes(stored, fresh) == {}
+
+    def test_no_changes_for_dates_stored_in_json(self):
+        stored = {"modules": {"Mod": {"added": "2023/01/05"}}}
+        fresh = {"modules": {"Mod": {"added": "2023/01/05"}}}
+        assert row_changes(stored, fresh) == {}
+
+    def test_returns_only_changed_columns(self):
+        stored = {
+            "rarity": 6,
+            "level_stats": {"e0": {"Max": {"ATK": 10}}},
+            "talents": {"Zest": "old"}
+        }
+        fresh = {
+            "rarity": 6,
+            "level_stats": {"e0": {"Max": {"ATK": 12}}},
+            "talents": {"Zest": "old"},
+            "quote": None
+        }
+        assert row_changes(stored, fresh) == {
+            "level_stats": {"e0": {"Max": {"ATK": 12}}}
+        }
+
+
 class Test_insert_archetype:
     @patch("src.utils.insert.run")
     def test_runs_insert_query_if_stored_is_empty(self, m_run):
@@ -145,20 +207,29 @@ class Test_insert_skill:
         assert s_id == 15
 
     @patch("src.utils.insert.run")
-    def test_does_not_query_db_if_stored_not_empty(self, m_run):
-        stored = [{"skill_id": 15}]
-        fresh = {"apple": "orange"}
+    def test_does_not_query_db_if_nothing_changed(self, m_run):
+        stored = [{"skill_id": 15, "apple": "orange", "l1": {"a": 1}}]
+        fresh = {"apple": "orange", "l1": {"a": 1}}
         insert_skill(stored, fresh)
         m_run.assert_not_called()
 
+    @patch("src.utils.insert.run")
+    def test_updates_only_changed_columns(self, m_run):
+        stored = [{"skill_id": 15, "apple": "orange", "l1": {"a": 1}}]
+        fresh = {"apple": "orange", "l1": {"a": 2}}
+        query = "UPDATE skills\nSET\nl1 = '{\"a\":2}'\n"
+        query += "WHERE skill_id = 15;"
+        insert_skill(stored, fresh)
+        m_run.assert_called_once_with(query)
+
     def test_returns_skill_id_from_stored_if_stored_not_empty(self):
-        stored = [{"skill_id": 15}]
+        stored = [{"skill_id": 15, "apple": "orange"}]
         fresh = {"apple": "orange"}
         s_id = insert_skill(stored, fresh)
         assert s_id == 15
 
     def test_does_not_mutate_the_input_arguments(self):
-        stored = [{"skill_id": 15}]
+        stored = [{"skill_id": 15, "apple": "orange"}]
         fresh = {"apple": "orange"}
         stored_clone = deepcopy(stored)
         fresh_clone = deepcopy(fresh)
@@ -186,20 +257,29 @@ class Test_insert_module:
         assert m_id == 15
 
     @patch("src.utils.insert.run")
-    def test_does_not_query_db_if_stored_not_empty(self, m_run):
-        stored = [{"module_id": 15}]
-        fresh = {"apple": "orange"}
+    def test_does_not_query_db_if_nothing_changed(self, m_run):
+        stored = [{"module_id": 15, "apple": "orange", "l1": {"a": 1}}]
+        fresh = {"apple": "orange", "l1": {"a": 1}}
         insert_module(stored, fresh)
         m_run.assert_not_called()
 
+    @patch("src.utils.insert.run")
+    def test_updates_only_changed_columns(self, m_run):
+        stored = [{"module_id": 15, "apple": "orange", "l1": {"a": 1}}]
+        fresh = {"apple": "orange", "l1": {"a": 2}}
+        query = "UPDATE modules\nSET\nl1 = '{\"a\":2}'\n"
+        query += "WHERE module_id = 15;"
+        insert_module(stored, fresh)
+        m_run.assert_called_once_with(query)
+
     def test_returns_module_id_from_stored_if_stored_not_empty(self):
-        stored = [{"module_id": 15}]
+        stored = [{"module_id": 15, "apple": "orange"}]
         fresh = {"apple": "orange"}
         m_id = insert_module(stored, fresh)
         assert m_id == 15
 
     def test_does_not_mutate_the_input_arguments(self):
-        stored = [{"module_id": 15}]
+        stored = [{"module_id": 15, "apple": "orange"}]
         fresh = {"apple": "orange"}
         stored_clone = deepcopy(stored)
         fresh_clone = deepcopy(fresh)
@@ -284,6 +364,18 @@ class Test_add_ids_to_op:
         assert s_ids == s_ids_clone
         assert fresh == fresh_clone
 
+    def test_accepts_records_and_shares_nested_values(self):
+        fresh = Operator(
+            "Lemon", "lemon", "link", 6, alter="Lime",
+            level_stats={"e0": {}}
+        )
+        out = add_ids_to_op(fresh, 5, [8], [])
+        assert out["archetype_id"] == 5
+        assert out["skill_1_id"] == 8
+        assert out["alter"] is None
+        assert fresh.alter == "Lime"
+        assert out["level_stats"] is fresh.level_stats
+
 
 class Test_insert_operator:
     @patch("src.utils.insert.run")
@@ -304,20 +396,29 @@ class Test_insert_operator:
         assert o_id == 15
 
     @patch("src.utils.insert.run")
-    def test_does_not_query_db_if_stored_not_empty(self, m_run):
-        stored = [{"operator_id": 15}]
+    def test_does_not_query_db_if_stored_matches_fresh(self, m_run):
+        stored = [{"operator_id": 15, "apple": "orange"}]
         id_fresh = {"apple": "orange"}
         insert_operator(stored, id_fresh)
         m_run.assert_not_called()
 
+    @patch("src.utils.insert.run")
+    def test_runs_update_query_if_fresh_differs_from_stored(self, m_run):
+        stored = [{"operator_id": 15, "apple": "pear"}]
+        id_fresh = {"apple": "orange"}
+        query = "UPDATE operators\nSET\napple = 'orange'\n"
+        query += "WHERE operator_id = 15;"
+        insert_operator(stored, id_fresh)
+        m_run.assert_called_with(query)
+
     def test_returns_op_id_from_stored_if_stored_not_empty(self):
-        stored = [{"operator_id": 15}]
+        stored = [{"operator_id": 15, "apple": "orange"}]
         id_fresh = {"apple": "orange"}
         o_id = insert_operator(stored, id_fresh)
         assert o_id == 15
 
     def test_does_not_mutate_the_input_arguments(self):
-        stored = [{"operator_id": 15}]
+        stored = [{"operator_id": 15, "apple": "orange"}]
         id_fresh = {"apple": "orange"}
         stored_clone = deepcopy(stored)
         id_fresh_clone = deepcopy(id_fresh)
@@ -333,26 +434,93 @@ class Test_alter_mod:
         m_run.assert_not_called()
 
     @patch("src.utils.insert.run")
-    def test_if_alter_not_None_query_db_for_alters_op_id(self, m_run):
-        query = "SELECT operator_id FROM operators\n"
-        query += "WHERE operator_name = 'orange';"
+    def test_if_alter_not_None_query_db_for_both_ops(self, m_run):
+        query = "SELECT operator_id, operator_name, alter FROM operators\n"
+        query += "WHERE operator_name = 'orange'\nOR operator_id = 1;"
         alter_mod("orange", 1)
         assert call(query) in m_run.call_args_list
 
     @patch("src.utils.insert.run")
     def test_if_alter_not_in_db_then_do_nothing_more(self, m_run):
-        m_run.return_value = []
+        m_run.return_value = [
+            {"operator_id": 1, "operator_name": "apple", "alter": None}
+        ]
         alter_mod("orange", 1)
         m_run.assert_called_once()
 
     @patch("src.utils.insert.run")
-    def test_if_alter_in_db_update_op_and_alter_alter_id(self, m_run):
-        m_run.return_value = [{"operator_id": 5}]
+    def test_if_alter_in_db_update_op_and_alter_alter_id(
+        self, m_run, m_record
+    ):
+        m_run.return_value = [
+            {"operator_id": 1, "operator_name": "apple", "alter": None},
+            {"operator_id": 5, "operator_name": "orange", "alter": None}
+        ]
         op_query = "UPDATE operators\nSET\nalter = 5\nWHERE operator_id = 1;"
         alt_query = "UPDATE operators\nSET\nalter = 1\nWHERE operator_id = 5;"
         alter_mod("orange", 1)
         assert call(op_query) == m_run.call_args_list[1]
         assert call(alt_query) == m_run.call_args_list[2]
+        assert m_record.call_args_list == [
+            call("operator", 1, "updated", {"alter": 5}),
+            call("operator", 5, "updated", {"alter": 1})
+        ]
+
+    @patch("src.utils.insert.run")
+    def test_writes_nothing_when_already_linked(self, m_run, m_record):
+        m_run.return_value = [
+            {"operator_id": 1, "operator_name": "apple", "alter": 5},
+            {"operator_id": 5, "operator_name": "orange", "alter": 1}
+        ]
+        alter_mod("orange", 1)
+        m_run.assert_called_once()
+        m_record.assert_not_called()
+
+    @patch("src.utils.insert.run")
+    def test_writes_only_the_missing_link(self, m_run, m_record):
+        m_run.return_value = [
+            {"operator_id": 1, "operator_name": "apple", "alter": None},
+            {"operator_id": 5, "operator_name": "orange", "alter": 1}
+        ]
+        alter_mod("orange", 1)
+        assert m_run.call_count == 2
+        m_record.assert_called_once_with(
+            "operator", 1, "updated", {"alter": 5}
+        )
+
+
+class Test_change_log:
+    @patch("src.utils.insert.run")
+    def test_logs_created_rows_in_full(self, m_run, m_record):
+        m_run.return_value = [{"skill_id": 3}]
+        insert_skill([], {"skill_name": "Squeeze"})
+        m_record.assert_called_once_with(
+            "skill", 3, "created", {"skill_name": "Squeeze"}
+        )
+
+    @patch("src.utils.insert.run")
+    def test_logs_only_changed_columns_on_update(self, m_run, m_record):
+        stored = [{"operator_id": 4, "rarity": 5, "quote": "a"}]
+        insert_operator(stored, {"rarity": 6, "quote": "a"})
+        m_record.assert_called_once_with(
+            "operator", 4, "updated", {"rarity": 6}
+        )
+
+    @patch("src.utils.insert.run")
+    def test_logs_nothing_without_changes(self, m_run, m_record):
+        insert_module([{"module_id": 1, "module_name": "a"}],
+                      {"module_name": "a"})
+        m_record.assert_not_called()
+
+    @patch("src.utils.insert.run")
+    def test_logs_new_tags_and_operator_tags(self, m_run, m_record):
+        m_run.return_value = [{"tag_id": 7}]
+        insert_tags({}, ["lemon"])
+        insert_operators_tags([1], 4, [1, 7])
+        assert m_record.call_args_list == [
+            call("tag", 7, "created", {"tag_name": "lemon"}),
+            call("operator", 4, "updated", {"tag_ids": [7]})
+        ]
 
 
 class Test_insert_tags:
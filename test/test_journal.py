@@ -0,0 +1,84 @@
+from src.utils.journal import CrawlJournal, UnknownStateErr
+import json
+import pytest
+
+
+class Test_CrawlJournal:
+    def test_starts_empty_when_file_missing(self, tmp_path):
+        journal = CrawlJournal(str(tmp_path / "journal.json"))
+        assert journal.entries == {}
+
+    def test_mark_checkpoints_state_to_file(self, tmp_path):
+        file_path = str(tmp_path / "journal.json")
+        CrawlJournal(file_path).mark("banana", "fetched")
+        with open(file_path) as f:
+            stored = json.load(f)
+        assert stored == {
+            "banana": {"state": "fetched", "attempts": 0, "error": None}
+        }
+
+    def test_loads_existing_entries_to_resume(self, tmp_path):
+        file_path = str(tmp_path / "journal.json")
+        CrawlJournal(file_path).mark("banana", "inserted")
+        journal = CrawlJournal(file_path)
+        assert journal.state("banana") == "inserted"
+        assert not journal.should_run("banana")
+
+    def test_reset_clears_entries(self, tmp_path):
+        file_path = str(tmp_path / "journal.json")
+        CrawlJournal(file_path).mark("banana", "inserted")
+        assert CrawlJournal(file_path).reset().entries == {}
+        assert CrawlJournal(file_path).entries == {}
+
+    def test_raises_UnknownStateErr_for_invalid_state(self, tmp_path):
+        journal = CrawlJournal(str(tmp_path / "journal.json"))
+        with pytest.raises(UnknownStateErr):
+            journal.mark("banana", "eaten")
+
+    def test_unfinished_operators_should_run(self, tmp_path):
+        journal = CrawlJournal(str(tmp_path / "journal.json"))
+        journal.mark("banana", "parsed")
+        assert journal.should_run("banana")
+        assert journal.should_run("apple")
+        journal.mark("apple", "skipped")
+        assert not journal.should_run("apple")
+
+    def test_failures_retry_until_max_attempts(self, tmp_path):
+        journal = CrawlJournal(str(tmp_path / "journal.json"), 2)
+        journal.mark("banana", "failed", "KeyError('x')")
+        assert journal.retryable() == ["banana"]
+        journal.mark("banana", "failed", "KeyError('y')")
+        assert journal.retryable() == []
+        assert not journal.should_run("banana")
+        assert journal.entries["banana"]["error"] == "KeyError('y')"
+
+    def test_saved_page_kept_until_operator_is_done(self, tmp_path):
+        journal = CrawlJournal(str(tmp_path / "journal.json"))
+        journal.save_page("banana", "<html></html>")
+        assert journal.saved_page("banana") is None
+        journal.mark("banana", "parsed")
+        assert journal.saved_page("banana") == "<html></html>"
+        journal.mark("banana", "inserted")
+        assert journal.saved_page("banana") is None
+        assert not (tmp_path / "journal.json.pages" / "banana.html").exists()
+
+    def test_failure_and_reset_drop_saved_pages(self, tmp_path):
+        journal = CrawlJournal(str(tmp_path / "journal.json"))
+        journal.save_page("banana", "<html></html>")
+        journal.mark("banana", "failed", "oops")
+        assert not (tmp_path / "journal.json.pages" / "banana.html").exists()
+        journal.save_page("apple", "<html></html>")
+        journal.reset()
+        assert not (tmp_path / "journal.json.pages").exists()
+
+    def test_summary_counts_states_and_lists_errors(self, tmp_path):
+        journal = CrawlJournal(str(tmp_path / "journal.json"))
+        journal.mark("banana", "inserted")
+        journal.mark("apple", "inserted")
+        journal.mark("pear", "failed", "oops")
+        summary = journal.summary()
+        assert summary["inserted"] == 2
+        assert summary["failed"] == 1
+        assert summary["pending"] == 0
+        assert summary["errors"] == {"pear": "oops"}
+        assert "pear (1 attempts): oops" in journal.report()
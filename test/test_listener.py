@@ -0,0 +1,62 @@
+from src.utils.listener import CacheListener
+from src.utils.cache import ResponseCache
+from src.utils.changes import channel
+from collections import deque
+from unittest.mock import Mock, patch
+from os import getenv
+import json
+import time
+import pytest
+
+
+class Test_CacheListener:
+    def test_handle_evicts_named_rows(self):
+        cache = ResponseCache()
+        cache.set("a", 1, [("operators", 4)])
+        cache.set("b", 2, [("operators", 5)])
+        listener = CacheListener(cache)
+        assert listener.handle('{"table": "operators", "ids": [4]}') == 1
+        assert list(cache.entries) == ["b"]
+        assert listener.handle("not json") == 0
+
+    def test_drain_handles_every_queued_notification(self):
+        cache = ResponseCache()
+        cache.set("a", 1, [("skills", 1)])
+        db = Mock()
+        db.notifications = deque([
+            (1, channel, '{"table": "skills", "ids": [1]}')
+        ])
+        CacheListener(cache).drain(db)
+        assert cache.entries == {}
+        assert not db.notifications
+
+    @patch("src.utils.listener.connect")
+    def test_listens_then_polls_until_stopped(self, m_connect):
+        cache = ResponseCache()
+        listener = CacheListener(cache, interval=0.01)
+        db = m_connect.return_value
+        db.notifications = deque()
+        db.run.side_effect = lambda query: listener.stopped.set()
+        listener.start()
+        listener.thread.join(1)
+        assert db.run.call_args_list[0][0][0] == f"LISTEN {channel};"
+        db.close.assert_called_once()
+
+
+@pytest.mark.skipif(not getenv("PGUSER"), reason="needs a local postgres")
+class Test_CacheListener_postgres:
+    def test_notify_from_another_connection_evicts(self):
+        from src.utils.connect import connect
+        cache = ResponseCache()
+        cache.set("a", 1, [("operators", 4)])
+        listener = CacheListener(cache, interval=0.05).start()
+        time.sleep(0.5)
+        cache.set("a", 1, [("operators", 4)])
+        payload = json.dumps({"table": "operators", "ids": [4]})
+        with connect() as db:
+            db.run(f"SELECT pg_notify('{channel}', '{payload}');")
+        deadline = time.monotonic() + 5
+        while cache.entries and time.monotonic() < deadline:
+            time.sleep(0.05)
+        listener.stop()
+        assert cache.entries == {}
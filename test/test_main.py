@@ -0,0 +1,319 @@
+from src.main import app
+from src import main
+from src.utils.recruit import UnknownTagErr
+from src.utils.stat_engine import BadStatParamErr
+from src.utils.batch import BadFieldErr
+from src.utils.mmap_snapshot import write_snapshot, Snapshot
+from fastapi.testclient import TestClient
+from unittest.mock import patch
+from os import path
+import asyncio
+import subprocess
+import sys
+
+client = TestClient(app)
+root_dir = path.dirname(path.dirname(path.abspath(__file__)))
+# Modules a worker should never load just to start serving
+ingest_only = [
+    "requests", "bs4", "dotenv", "numpy", "src.utils.scraper",
+    "src.utils.full_scrape", "src.utils.sources", "src.utils.insert",
+    "src.utils.sqlite_snapshot"
+]
+# Microseconds the project's own modules may spend importing, third party
+# packages such as fastapi aren't counted
+own_import_budget = 200_000
+
+
+def import_times(module: str):
+    ''' Imports module in a fresh interpreter with -X importtime and returns
+        each module imported mapped to its self time in microseconds.
+    '''
+    res = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=root_dir, capture_output=True, text=True, check=True
+    )
+    times = {}
+    for line in res.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, _, name = line[len("import time:"):].split("|")
+        times[name.strip()] = int(self_us)
+    return times
+
+
+class Test_startup:
+    def test_serving_path_skips_ingest_dependencies(self):
+        times = import_times("src.main")
+        assert "src.main" in times
+        assert [name for name in ingest_only if name in times] == []
+
+    def test_own_modules_import_within_budget(self):
+        times = import_times("src.main")
+        own = sum(us for name, us in times.items() if name.startswith("src"))
+        assert own < own_import_budget
+
+
+class Test_root:
+    def test_returns_hello_world(self):
+        res = client.get("/api/")
+        assert res.status_code == 200
+        assert res.json() == {"message": "Hello World"}
+
+
+class Test_get_operator:
+    @patch("src.main.get_snapshot")
+    def test_serves_operator_from_snapshot(self, m_snap, tmp_path):
+        file_path = write_snapshot(str(tmp_path / "snap.bin"), {"operators": [
+            {"operator_id": 1, "operator_name": "Lemon",
+             "gamepress_url_name": "lemon"}
+        ]})
+        m_snap.return_value = Snapshot(file_path)
+        res = client.get("/api/operators/lemon")
+        assert res.status_code == 200
+        assert res.json()["operator_id"] == 1
+        assert client.get("/api/operators/lime").status_code == 404
+
+    @patch("src.main.read")
+    @patch("src.main.get_snapshot")
+    def test_falls_back_to_db_without_snapshot(self, m_snap, m_read):
+        main.cache.clear()
+        m_snap.return_value = None
+        m_read.return_value = [{"operator_id": 2}]
+        res = client.get("/api/operators/lime")
+        assert res.json() == {"operator_id": 2}
+        m_read.return_value = []
+        assert client.get("/api/operators/pear").status_code == 404
+
+    @patch("src.main.get_snapshot")
+    def test_negotiates_compression_and_etags(self, m_snap, tmp_path):
+        talents = "ATK +10% " * 200
+        file_path = write_snapshot(str(tmp_path / "snap.bin"), {"operators": [
+            {"operator_id": 1, "operator_name": "Lemon",
+             "gamepress_url_name": "lemon", "talents": talents}
+        ]})
+        m_snap.return_value = Snapshot(file_path)
+        res = client.get("/api/operators/lemon",
+                         headers={"Accept-Encoding": "gzip"})
+        assert res.headers["content-encoding"] == "gzip"
+        assert res.json()["talents"] == talents
+        etag = res.headers["etag"]
+        res = client.get("/api/operators/lemon", headers={
+            "Accept-Encoding": "gzip", "If-None-Match": etag
+        })
+        assert res.status_code == 304
+        res = client.get("/api/operators/lemon", headers={
+            "Accept-Encoding": "identity", "If-None-Match": etag
+        })
+        assert res.status_code == 200
+        assert res.json()["talents"] == talents
+
+    @patch("src.main.read")
+    @patch("src.main.get_snapshot")
+    def test_caches_db_reads_until_evicted(self, m_snap, m_read):
+        main.cache.clear()
+        m_snap.return_value = None
+        m_read.return_value = [{"operator_id": 2}]
+        client.get("/api/operators/lime")
+        client.get("/api/operators/lime")
+        assert m_read.call_count == 1
+        main.cache.evict("operators", [3])
+        client.get("/api/operators/lime")
+        assert m_read.call_count == 1
+        main.cache.evict("operators", [2])
+        m_read.return_value = [{"operator_id": 2, "rarity": 6}]
+        assert client.get("/api/operators/lime").json()["rarity"] == 6
+        main.cache.clear()
+
+
+    @patch("src.main.read")
+    @patch("src.main.get_snapshot")
+    def test_doesnt_cache_reads_raced_by_an_eviction(self, m_snap, m_read):
+        main.cache.clear()
+        m_snap.return_value = None
+
+        def evicting_read(q):
+            main.cache.evict("operators", [2])
+            return [{"operator_id": 2}]
+
+        m_read.side_effect = evicting_read
+        client.get("/api/operators/lime")
+        client.get("/api/operators/lime")
+        assert m_read.call_count == 2
+        main.cache.clear()
+
+    @patch("src.main.data_version")
+    @patch("src.main.getenv")
+    @patch("src.main.read")
+    @patch("src.main.get_snapshot")
+    def test_starts_over_when_sqlite_snapshot_swapped(
+        self, m_snap, m_read, m_env, m_version
+    ):
+        main.cache.clear()
+        m_snap.return_value = None
+        m_env.side_effect = lambda key: {"SQLITE_SNAPSHOT": "s.db"}.get(key)
+        m_version.return_value = (1, 1, 1)
+        m_read.return_value = [{"operator_id": 2}]
+        client.get("/api/operators/lime")
+        client.get("/api/operators/lime")
+        assert m_read.call_count == 1
+        m_version.return_value = (2, 1, 1)
+        client.get("/api/operators/lime")
+        assert m_read.call_count == 2
+        main.cache.clear()
+
+
+class Test_listener_lifecycle:
+    @patch("src.main.listener")
+    @patch("src.main.postgres_configured")
+    def test_only_listens_with_postgres(self, m_configured, m_listener):
+        m_configured.return_value = False
+        main.start_listener()
+        m_listener.start.assert_not_called()
+        m_configured.return_value = True
+        main.start_listener()
+        m_listener.start.assert_called_once()
+
+
+class Test_recruit:
+    @patch("src.main.get_index")
+    def test_splits_tags_and_returns_lookup(self, m_index):
+        m_index.return_value.lookup.return_value = [{"tags": ["Sour"]}]
+        res = client.get("/api/recruit?tags=Sour, Citrus")
+        assert res.json() == [{"tags": ["Sour"]}]
+        m_index.assert_called_with("en")
+        m_index.return_value.lookup.assert_called_with(["Sour", "Citrus"])
+
+    @patch("src.main.get_index")
+    def test_bad_tags_are_400(self, m_index):
+        m_index.return_value.lookup.side_effect = UnknownTagErr("Unknown")
+        assert client.get("/api/recruit?tags=Sweet").status_code == 400
+        assert client.get("/api/recruit?tags=a&server=jp").status_code == 400
+
+
+class Test_rank_stats:
+    @patch("src.main.get_engine")
+    def test_passes_params_to_engine(self, m_engine):
+        m_engine.return_value.rank.return_value = [{"operator_name": "a"}]
+        res = client.get("/api/stats/rank?class_name=Sniper&trust=100")
+        assert res.json() == [{"operator_name": "a"}]
+        m_engine.return_value.rank.assert_called_with(
+            "ATK", class_name="Sniper", archetype=None, limit=20, elite=2,
+            level=None, potential=1, trust=100, module=0, module_level=3
+        )
+
+    @patch("src.main.get_engine")
+    def test_bad_params_are_400(self, m_engine):
+        m_engine.return_value.rank.side_effect = BadStatParamErr("bad")
+        assert client.get("/api/stats/rank?elite=4").status_code == 400
+
+
+class Test_rank_dps:
+    @patch("src.main.get_calculator")
+    def test_passes_params_to_calculator(self, m_calc):
+        m_calc.return_value.rank.return_value = [{"dps": 1.0}]
+        res = client.get("/api/dps/rank?enemy_def=300&skill_level=l7")
+        assert res.json() == [{"dps": 1.0}]
+        m_calc.return_value.rank.assert_called_with(
+            class_name=None, limit=20, enemy_def=300, enemy_res=0,
+            skill_level="l7", fight_time=None, elite=2, potential=1,
+            trust=100, module=0
+        )
+
+    @patch("src.main.get_calculator")
+    def test_bad_params_are_400(self, m_calc):
+        m_calc.return_value.rank.side_effect = BadStatParamErr("bad")
+        assert client.get("/api/dps/rank?skill_level=x").status_code == 400
+
+
+class Test_search_text:
+    @patch("src.main.search")
+    def test_clamps_limit_between_1_and_100(self, m_search):
+        m_search.return_value = []
+        for limit, expected in [(-1, 1), (0, 1), (50, 50), (500, 100)]:
+            client.get(f"/api/search?q=arts&limit={limit}")
+            m_search.assert_called_with(
+                "arts", entity=None, field=None, limit=expected
+            )
+
+
+class Test_search_ranges:
+    @patch("src.main.ranges.get_index")
+    def test_covering_and_superset_queries(self, m_index):
+        index = m_index.return_value
+        index.covering.return_value = ["Lemon"]
+        assert client.get("/api/ranges?dx=1&dy=0").json() == ["Lemon"]
+        index.covering.assert_called_with(1, 0, "e2")
+        index.mask_of.return_value = 3
+        index.supersets.return_value = ["Lime"]
+        res = client.get("/api/ranges?superset_of=lime&elite=1")
+        assert res.json() == ["Lime"]
+        index.supersets.assert_called_with(3, "e1")
+
+    @patch("src.main.ranges.get_index")
+    def test_bad_queries(self, m_index):
+        m_index.return_value.mask_of.return_value = None
+        assert client.get("/api/ranges").status_code == 400
+        assert client.get("/api/ranges?superset_of=x").status_code == 404
+
+
+class Test_get_changes:
+    @patch("src.main.stream_changes")
+    def test_streams_ndjson_after_revision(self, m_stream):
+        m_stream.return_value = iter([
+            {"revision": 2, "entity": "skill"},
+            {"revision": 3, "entity": "tag"}
+        ])
+        res = client.get("/api/changes?since=1")
+        assert res.headers["content-type"] == "application/x-ndjson"
+        assert res.text.splitlines() == [
+            '{"revision":2,"entity":"skill"}',
+            '{"revision":3,"entity":"tag"}'
+        ]
+        m_stream.assert_called_with(1)
+
+
+class Test_events:
+    def test_websocket_sends_subscribed_events(self):
+        def publish():
+            main.hub.publish("skill", {"event": "skill-added"})
+            main.hub.publish("operator", {"event": "operator-added"})
+        with patch.object(main.hub, "ensure_polling", publish):
+            with client.websocket_connect("/api/ws?topics=operator") as ws:
+                assert ws.receive_json() == {"event": "operator-added"}
+        assert main.hub.subscriptions == []
+
+    def test_parse_topics_splits_commas(self):
+        assert main.parse_topics("operator, skill") == ["operator", "skill"]
+        assert main.parse_topics(None) is None
+
+    def test_sse_events_formats_and_unsubscribes(self):
+        sub = main.hub.subscribe()
+        sub.offer({"event": "operator-added", "revision": 1})
+
+        async def first_event():
+            stream = main.sse_events(sub)
+            chunks = [await stream.__anext__(), await stream.__anext__()]
+            await stream.aclose()
+            return chunks
+        assert asyncio.run(first_event()) == [
+            b"event: operator-added\n",
+            b'data: {"event":"operator-added","revision":1}\n\n'
+        ]
+        assert sub not in main.hub.subscriptions
+
+
+class Test_get_operators_batch:
+    @patch("src.main.get_operators")
+    def test_splits_params(self, m_get):
+        m_get.return_value = [{"operator_id": 1, "rarity": 6}]
+        res = client.get("/api/operators?names=lemon,lime&ids=3&fields=rarity")
+        assert res.json() == [{"operator_id": 1, "rarity": 6}]
+        m_get.assert_called_with(["lemon", "lime"], [3], ["rarity"])
+        client.get("/api/operators?names=lemon")
+        m_get.assert_called_with(["lemon"], [], None)
+
+    @patch("src.main.get_operators")
+    def test_bad_params_are_400(self, m_get):
+        assert client.get("/api/operators?ids=a").status_code == 400
+        m_get.side_effect = BadFieldErr("bad")
+        assert client.get("/api/operators?ids=1").status_code == 400
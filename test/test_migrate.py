@@ -0,0 +1,143 @@
+from src.utils.migrate import (
+    load_migrations,
+    applied_versions,
+    apply_migration,
+    migrate,
+    DuplicateMigrationErr
+)
+from src.utils.ranges import range_masks
+from unittest.mock import Mock, patch, call
+from os import getenv
+import json
+import pytest
+
+
+def write_migrations(directory, files):
+    for name in files:
+        (directory / name).write_text(files[name])
+
+
+class Test_load_migrations:
+    def test_returns_migrations_ordered_by_version(self, tmp_path):
+        write_migrations(tmp_path, {
+            "0010-later.sql": "SELECT 2;",
+            "0002-earlier.sql": "SELECT 1;"
+        })
+        assert load_migrations(str(tmp_path)) == [
+            {"version": 2, "name": "earlier", "sql": "SELECT 1;"},
+            {"version": 10, "name": "later", "sql": "SELECT 2;"}
+        ]
+
+    def test_ignores_files_not_matching_pattern(self, tmp_path):
+        write_migrations(tmp_path, {"notes.txt": "", "setup.sql": ""})
+        assert load_migrations(str(tmp_path)) == []
+
+    def test_raises_DuplicateMigrationErr_on_repeated_versions(self, tmp_path):
+        write_migrations(tmp_path, {"1-one.sql": "", "0001-uno.sql": ""})
+        with pytest.raises(DuplicateMigrationErr):
+            load_migrations(str(tmp_path))
+
+    def test_repo_migrations_are_loadable(self):
+        versions = [m["version"] for m in load_migrations()]
+        assert versions == sorted(versions)
+        assert versions[0] == 1
+
+
+class Test_applied_versions:
+    def test_creates_tracking_table_and_returns_versions(self):
+        m_db = Mock()
+        m_db.run.side_effect = [None, [[1], [2]]]
+        assert applied_versions(m_db) == {1, 2}
+        assert "schema_migrations" in m_db.run.call_args_list[0][0][0]
+
+
+class Test_apply_migration:
+    migration = {"version": 3, "name": "lemon", "sql": "SELECT 3;"}
+
+    def test_runs_sql_and_records_version_in_transaction(self):
+        m_db = Mock()
+        apply_migration(m_db, self.migration)
+        record = "INSERT INTO schema_migrations\n(version, name)\nVALUES\n"
+        record += "(3, 'lemon');"
+        assert m_db.run.call_args_list == [
+            call("START TRANSACTION;"),
+            call("SELECT 3;"),
+            call(record),
+            call("COMMIT;")
+        ]
+
+    def test_rolls_back_and_reraises_on_failure(self):
+        m_db = Mock()
+        m_db.run.side_effect = [None, ValueError, None]
+        with pytest.raises(ValueError):
+            apply_migration(m_db, self.migration)
+        assert m_db.run.call_args_list[-1] == call("ROLLBACK;")
+
+
+class Test_migrate:
+    files = {"0001-one.sql": "SELECT 1;", "0002-two.sql": "SELECT 2;"}
+
+    @patch("src.utils.migrate.apply_migration")
+    @patch("src.utils.migrate.applied_versions")
+    @patch("src.utils.migrate.connect")
+    def test_applies_only_pending_migrations(
+        self, m_connect, m_applied, m_apply, tmp_path
+    ):
+        write_migrations(tmp_path, self.files)
+        m_applied.return_value = {1}
+        pending = migrate(directory=str(tmp_path))
+        assert [m["version"] for m in pending] == [2]
+        m_apply.assert_called_once()
+
+    @patch("src.utils.migrate.apply_migration")
+    @patch("src.utils.migrate.applied_versions")
+    @patch("src.utils.migrate.connect")
+    def test_dry_run_applies_nothing(
+        self, m_connect, m_applied, m_apply, tmp_path
+    ):
+        write_migrations(tmp_path, self.files)
+        m_applied.return_value = set()
+        pending = migrate(dry_run=True, directory=str(tmp_path))
+        assert len(pending) == 2
+        m_apply.assert_not_called()
+
+    @patch("src.utils.migrate.apply_migration")
+    @patch("src.utils.migrate.applied_versions")
+    @patch("src.utils.migrate.connect")
+    def test_stops_at_target_version(
+        self, m_connect, m_applied, m_apply, tmp_path
+    ):
+        write_migrations(tmp_path, self.files)
+        m_applied.return_value = set()
+        pending = migrate(target=1, directory=str(tmp_path))
+        assert [m["version"] for m in pending] == [1]
+
+
+@pytest.mark.skipif(not getenv("PGUSER"), reason="needs a local postgres")
+class Test_backfill_range_masks_postgres:
+    def test_matches_range_masks(self):
+        from src.utils.connect import connect
+        ranges = [
+            {"e0": "■□□", "e2": " □ \n□■□\n □ "},
+            {"e0": "□□", "e2": "■" + "□" * 9},
+            {"e0": "□"}
+        ]
+        sql = [m["sql"] for m in load_migrations() if m["version"] == 8][0]
+        with connect() as db:
+            db.run("START TRANSACTION;")
+            try:
+                # Shadows the real table for this session
+                db.run("CREATE TEMP TABLE operators "
+                       "(operator_id INT, ranges JSONB, range_masks JSONB);")
+                for i, op_ranges in enumerate(ranges):
+                    db.run("INSERT INTO operators (operator_id, ranges) "
+                           "VALUES (:i, CAST(:r AS JSONB));",
+                           i=i, r=json.dumps(op_ranges))
+                db.run(sql)
+                rows = db.run("SELECT range_masks FROM operators "
+                              "ORDER BY operator_id;")
+            finally:
+                db.run("ROLLBACK;")
+        assert [row[0] for row in rows] == [
+            range_masks(op_ranges) for op_ranges in ranges
+        ]
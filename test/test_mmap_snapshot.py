@@ -0,0 +1,117 @@
+from src.utils.mmap_snapshot import (
+    write_snapshot,
+    export_mmap,
+    open_snapshot,
+    Snapshot,
+    BadSnapshotErr
+)
+from unittest.mock import patch
+from os import path
+import orjson
+import pytest
+
+documents = {
+    "operators": [
+        {"operator_id": 1, "operator_name": "Lemon",
+         "gamepress_url_name": "lemon-2", "level_stats": {"e0": {}}},
+        {"operator_id": 7, "operator_name": "Lime",
+         "gamepress_url_name": "lime"}
+    ],
+    "skills": [{"skill_id": 1, "skill_name": "Squeeze"}]
+}
+
+
+@pytest.fixture
+def snapshot_path(tmp_path):
+    return write_snapshot(str(tmp_path / "snapshot.bin"), documents)
+
+
+class Test_Snapshot:
+    def test_looks_up_documents_by_id(self, snapshot_path):
+        snap = Snapshot(snapshot_path)
+        assert snap.load("operators", 7) == documents["operators"][1]
+        assert snap.load("skills", 1) == documents["skills"][0]
+
+    def test_ids_are_namespaced_by_kind(self, snapshot_path):
+        snap = Snapshot(snapshot_path)
+        assert snap.load("skills", 7) is None
+        assert snap.load("modules", 1) is None
+
+    def test_looks_up_by_any_name_case_insensitively(self, snapshot_path):
+        snap = Snapshot(snapshot_path)
+        assert snap.load("operators", name="LEMON")["operator_id"] == 1
+        assert snap.load("operators", name="lemon-2")["operator_id"] == 1
+        assert snap.get("operators", name="banana") is None
+
+    def test_get_returns_memoryview_slice_of_json(self, snapshot_path):
+        doc = Snapshot(snapshot_path).get("skills", 1)
+        assert isinstance(doc, memoryview)
+        assert bytes(doc) == orjson.dumps(documents["skills"][0])
+
+    def test_find_gives_offset_and_length(self, snapshot_path):
+        snap = Snapshot(snapshot_path)
+        offset, length = snap.find("operators", name="lime")
+        doc = bytes(snap.view[offset:offset + length])
+        assert orjson.loads(doc) == documents["operators"][1]
+        assert snap.find("operators", 99) is None
+
+    def test_picks_up_swapped_file(self, snapshot_path):
+        snap = Snapshot(snapshot_path, check_interval=0)
+        write_snapshot(snapshot_path, {"skills": [
+            {"skill_id": 1, "skill_name": "Zest"}
+        ]})
+        assert snap.load("skills", 1)["skill_name"] == "Zest"
+        assert snap.load("operators", 1) is None
+
+    def test_generation_increases_with_each_write(self, snapshot_path):
+        first = Snapshot(snapshot_path).generation
+        write_snapshot(snapshot_path, documents)
+        assert Snapshot(snapshot_path).generation > first
+
+    def test_picks_up_file_rewritten_in_place(self, snapshot_path, tmp_path):
+        snap = Snapshot(snapshot_path, check_interval=0)
+        new = write_snapshot(str(tmp_path / "new.bin"), {"skills": [
+            {"skill_id": 1, "skill_name": "Zest"}
+        ]})
+        with open(snapshot_path, "r+b") as f:
+            f.truncate(0)
+            f.write(open(new, "rb").read())
+        assert snap.load("skills", 1)["skill_name"] == "Zest"
+
+    def test_raises_BadSnapshotErr_on_other_files(self, tmp_path):
+        file_path = tmp_path / "other.bin"
+        file_path.write_bytes(b"not a snapshot at all")
+        with pytest.raises(BadSnapshotErr):
+            Snapshot(str(file_path))
+
+
+class Test_write_snapshot:
+    def test_writes_documents_as_they_stream(self, tmp_path):
+        file_path = str(tmp_path / "snapshot.bin")
+        sizes = []
+
+        def rows():
+            for i in range(3):
+                yield {"operator_id": i, "talents": "x" * 20000}
+                sizes.append(path.getsize(file_path + ".tmp"))
+
+        write_snapshot(file_path, {"operators": rows()})
+        assert 0 < sizes[0] < sizes[1] < sizes[2]
+        assert Snapshot(file_path).load("operators", 2)["operator_id"] == 2
+
+
+class Test_open_snapshot:
+    def test_returns_None_when_missing(self, tmp_path):
+        assert open_snapshot(str(tmp_path / "missing.bin")) is None
+        assert open_snapshot(None) is None
+
+
+class Test_export_mmap:
+    @patch("src.utils.mmap_snapshot.stream")
+    def test_writes_every_kind_from_db(self, m_stream, tmp_path):
+        m_stream.side_effect = lambda q: iter({
+            "operators": documents["operators"],
+            "skills": documents["skills"]
+        }.get(str(q).split("FROM ")[1].rstrip(";"), []))
+        file_path = export_mmap(str(tmp_path / "snapshot.bin"))
+        assert Snapshot(file_path).load("operators", name="lime")
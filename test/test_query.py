@@ -5,12 +5,17 @@ from src.utils.query import (
     IncompleteQueryErr,
     MismatchedRowErr,
     ImplicitUpdateErr,
+    InvalidOperatorErr,
+    ImplicitDeleteErr,
+    FrozenQueryErr,
     Query,
     SelectQuery,
     InsertQuery,
-    UpdateQuery
+    UpdateQuery,
+    DeleteQuery,
+    FrozenQuery
 )
-from src.utils.formatting import idf, lit
+from src.utils.formatting import idf, lit, jp
 import pytest
 from unittest.mock import patch
 
@@ -43,6 +48,29 @@ class Test_validate_dict:
         validated_dict = {'"lemon 1"': "'lime''s'"}
         assert validated_dict == validate_dict(filter_dict)
 
+    def test_tuple_values_are_split_into_operator_and_validated_value(self):
+        assert validate_dict({"apple": (">=", 5)}) == {"apple": (">=", "5")}
+
+    def test_raises_InvalidOperatorErr_for_unknown_operators(self):
+        with pytest.raises(InvalidOperatorErr):
+            validate_dict({"apple": ("; DROP", 5)})
+
+    def test_tuple_keys_become_json_paths_cast_by_value_type(self):
+        assert validate_dict({("apple", "pear"): (">", 5)}) == {
+            jp("apple", ["pear"], cast="int"): (">", "5")
+        }
+        assert validate_dict({("apple", "pear"): (">", 5.5)}) == {
+            jp("apple", ["pear"], cast="numeric"): (">", "5.5")
+        }
+        assert validate_dict({("apple", "pear"): "lime"}) == {
+            jp("apple", ["pear"]): "'lime'"
+        }
+
+    def test_containment_filters_use_jsonb_paths_and_json_values(self):
+        assert validate_dict({("apple", "pear"): ("@>", ["lime"])}) == {
+            jp("apple", ["pear"], as_text=False): ("@>", """'["lime"]'""")
+        }
+
 
 class Test_validate_rows:
     def test_returns_empty_list_when_passed_empty_list(self):
@@ -348,6 +376,14 @@ class Test_SelectQuery:
         expected += "\nAND gamma = 'delta';"
         assert str(s) == expected
 
+    def test_str_method_uses_passed_operators_in_where_clause(self):
+        s = SelectQuery("banana")
+        s.where({"apple": "orange", ("lemon", "e2", "lime"): (">=", 600)})
+        expected = "SELECT * FROM banana"
+        expected += "\nWHERE apple = 'orange'"
+        expected += "\nAND (lemon->'e2'->>'lime')::int >= 600;"
+        assert str(s) == expected
+
     def test_str_method_appends_where_clause_after_join_clause(self):
         s = SelectQuery("banana")
         s.where({"apple": "orange"})
@@ -369,6 +405,31 @@ class Test_SelectQuery:
         s.clear("where")
         assert s.wheres == []
 
+    def test_order_by_and_limit_are_appended_after_where(self):
+        s = SelectQuery("banana").where({"apple": "orange"})
+        s.order_by("lemon", desc=True).order_by("lime").limit(5)
+        expected = "SELECT * FROM banana"
+        expected += "\nWHERE apple = 'orange'"
+        expected += "\nORDER BY lemon DESC, lime ASC"
+        expected += "\nLIMIT 5;"
+        assert str(s) == expected
+
+    def test_search_ands_match_with_where_groups_and_ranks(self):
+        s = SelectQuery("banana", "apple").search("sour")
+        s.where({"apple": "orange"}).where({"apple": "pear"})
+        tsquery = "websearch_to_tsquery('english', 'sour')"
+        expected = f"SELECT apple, ts_rank(document, {tsquery}) AS rank "
+        expected += "FROM banana"
+        expected += f"\nWHERE document @@ {tsquery}"
+        expected += "\nAND (apple = 'orange'\nOR apple = 'pear')"
+        expected += "\nORDER BY rank DESC;"
+        assert str(s) == expected
+
+    def test_clear_resets_search_order_and_limit(self):
+        s = SelectQuery("banana").search("sour").order_by("a").limit(1)
+        s.clear("search").clear("order").clear("limit")
+        assert str(s) == "SELECT * FROM banana;"
+
 
 class Test_InsertQuery:
     def test_InsertQuery_extends_Query(self):
@@ -708,3 +769,102 @@ class Test_UpdateQuery:
         expected += "\nAND three = 'four'"
         expected += '\nRETURNING peach, "avocado 1";'
         assert str(u) == expected
+
+
+class Test_DeleteQuery:
+    def test_Query_delete_returns_DeleteQuery_with_self_table(self):
+        d = Query("banana").delete()
+        assert isinstance(d, DeleteQuery)
+        assert d.table == "banana"
+
+    def test_raises_ImplicitDeleteErr_without_filters(self):
+        with pytest.raises(ImplicitDeleteErr):
+            str(DeleteQuery("banana"))
+
+    def test_star_filter_deletes_every_row(self):
+        assert str(DeleteQuery("banana").where("*")) == "DELETE FROM banana;"
+
+    def test_str_method_compiles_where_and_returning(self):
+        d = DeleteQuery("banana").where({"apple": "orange"}).returning("id")
+        expected = "DELETE FROM banana\nWHERE apple = 'orange'"
+        expected += "\nRETURNING id;"
+        assert str(d) == expected
+
+
+class Test_in_operator:
+    def test_compiles_list_to_in_clause(self):
+        s = SelectQuery("banana").where({"apple": ("IN", ["a", 1])})
+        assert str(s) == "SELECT * FROM banana\nWHERE apple IN ('a', 1);"
+
+    def test_rejects_empty_or_scalar_values(self):
+        with pytest.raises(InvalidOperatorErr):
+            str(SelectQuery("banana").where({"apple": ("IN", [])}))
+        with pytest.raises(InvalidOperatorErr):
+            str(SelectQuery("banana").where({"apple": ("IN", "abc")}))
+
+
+class Test_compiled_sql:
+    def test_compiles_once_however_often_rendered(self):
+        s = SelectQuery("banana").where({"apple": "orange"})
+        with patch.object(
+            SelectQuery, "compile", autospec=True,
+            side_effect=SelectQuery.compile
+        ) as m_compile:
+            assert s() == str(s) == s.sql
+            assert s == "SELECT * FROM banana\nWHERE apple = 'orange';"
+            assert m_compile.call_count == 1
+
+    def test_every_mutation_recompiles(self):
+        s = SelectQuery("banana")
+        str(s)
+        s.where({"apple": "orange"})
+        assert "WHERE" in str(s)
+        s.order_by("apple").limit(5)
+        assert str(s).endswith("ORDER BY apple ASC\nLIMIT 5;")
+        s.clear("where").clear("order").clear("limit")
+        assert str(s) == "SELECT * FROM banana;"
+        s.join("pear", "pear_id")
+        assert "INNER JOIN pear" in str(s)
+        i = InsertQuery("banana", ["apple"], [["a"]])
+        str(i)
+        i.row([["b"]]).returning("apple")
+        assert str(i).endswith("('b')\nRETURNING apple;")
+        u = UpdateQuery("banana", {"apple": "a"}).where("*")
+        str(u)
+        u.update({"apple": "b"})
+        assert "apple = 'b'" in str(u)
+
+    def test_errors_are_not_cached(self):
+        u = UpdateQuery("banana", {"apple": "a"})
+        with pytest.raises(ImplicitUpdateErr):
+            str(u)
+        assert u.where("*")() == "UPDATE banana\nSET\napple = 'a';"
+
+
+class Test_FrozenQuery:
+    def test_holds_compiled_sql(self):
+        s = SelectQuery("banana").where({"apple": "orange"})
+        f = s.freeze()
+        assert isinstance(f, FrozenQuery)
+        assert f() == str(f) == str(s)
+        assert f == s and s == f
+        assert hash(f) == hash(str(s))
+        assert f.table == "banana"
+
+    def test_later_changes_to_the_builder_dont_leak_in(self):
+        s = SelectQuery("banana")
+        f = s.freeze()
+        s.where({"apple": "orange"})
+        assert f() == "SELECT * FROM banana;"
+
+    def test_raises_FrozenQueryErr_when_changed(self):
+        f = SelectQuery("banana").freeze()
+        with pytest.raises(FrozenQueryErr):
+            f.where({"apple": "orange"})
+        with pytest.raises(FrozenQueryErr):
+            f.sql = "DROP TABLE banana;"
+        assert not hasattr(f, "banana")
+
+    def test_incomplete_queries_cant_be_frozen(self):
+        with pytest.raises(IncompleteQueryErr):
+            InsertQuery("banana").freeze()
@@ -0,0 +1,92 @@
+from src.utils.ranges import (
+    BadRangeErr,
+    RangeIndex,
+    tile_bit,
+    encode_range,
+    decode_range,
+    mask_hex,
+    range_mask,
+    range_masks,
+    get_index,
+    invalidate
+)
+from unittest.mock import patch
+import pytest
+
+cross = " □ \n□■□\n □ "
+line = "■□□"
+
+
+class Test_encoding:
+    def test_tile_bit_is_relative_to_grid_origin(self):
+        assert tile_bit(-7, -7) == 1
+        assert tile_bit(0, 0) == 1 << (7 * 16 + 7)
+        with pytest.raises(BadRangeErr):
+            tile_bit(9, 0)
+
+    def test_encode_and_decode_round_trip_tiles(self):
+        assert decode_range(encode_range(cross)) == [
+            (-1, 0), (0, -1), (0, 0), (0, 1), (1, 0)
+        ]
+        assert decode_range(encode_range(line)) == [(0, 0), (1, 0), (2, 0)]
+
+    def test_encode_gives_None_without_operator_tile(self):
+        assert encode_range("□□") is None
+
+    def test_encode_skips_tiles_outside_grid(self):
+        far = "■" + "□" * 9
+        assert decode_range(encode_range(far)) == [
+            (dx, 0) for dx in range(9)
+        ]
+
+    def test_range_masks_leave_out_ranges_without_own_tile(self):
+        masks = range_masks({"e0": "□□", "e2": cross})
+        assert masks == {"e2": mask_hex(encode_range(cross))}
+        assert range_mask("□□") is None
+
+    def test_range_masks_are_fixed_width_hex(self):
+        masks = range_masks({"e0": line, "e2": cross})
+        assert len(masks["e0"]) == 64
+        assert int(masks["e2"], 16) == encode_range(cross)
+        assert masks["e0"] == mask_hex(encode_range(line))
+
+
+operators = [
+    {"operator_name": "Lemon", "range_masks": range_masks({"e2": cross})},
+    {"operator_name": "Lime", "range_masks": range_masks({"e2": line})},
+    {"operator_name": "Pear", "range_masks": None}
+]
+
+
+class Test_RangeIndex:
+    def test_covering_looks_up_tile_bitsets(self):
+        index = RangeIndex(operators)
+        assert index.covering(1, 0) == ["Lemon", "Lime"]
+        assert index.covering(0, 1) == ["Lemon"]
+        assert index.covering(2, 0, "e0") == []
+
+    def test_supersets_and_each_tile(self):
+        index = RangeIndex(operators)
+        assert index.supersets(encode_range("■□")) == ["Lemon", "Lime"]
+        assert index.supersets(encode_range(cross)) == ["Lemon"]
+        assert index.supersets(0) == ["Lemon", "Lime"]
+
+    def test_mask_of_is_case_insensitive(self):
+        index = RangeIndex(operators)
+        assert index.mask_of("lime") == encode_range(line)
+        assert index.mask_of("pear") is None
+
+
+class Test_get_index:
+    @patch("src.utils.freshness.data_version")
+    @patch("src.utils.ranges.read")
+    def test_builds_once_until_data_changes(self, m_read, m_version):
+        m_read.return_value = operators
+        m_version.return_value = 1
+        invalidate()
+        index = get_index()
+        assert get_index() is index
+        assert "range_masks" in str(m_read.call_args[0][0])
+        m_version.return_value = 2
+        assert get_index() is not index
+        invalidate()
@@ -0,0 +1,76 @@
+from src.utils.records import (
+    Archetype,
+    Skill,
+    Operator,
+    as_row,
+    to_records
+)
+import pytest
+
+operator_info = {
+    "operator_name": "Lemon",
+    "gamepress_url_name": "lemon",
+    "gamepress_link": "https://gamepress.gg/arknights/operator/lemon",
+    "rarity": 6,
+    "alter": None,
+    "level_stats": {"e0": {"Base": {"ATK": 100}}}
+}
+
+
+class Test_Record:
+    def test_records_have_no_instance_dict(self):
+        op = Operator.from_dict(operator_info)
+        assert not hasattr(op, "__dict__")
+        with pytest.raises(AttributeError):
+            op.banana = 1
+
+    def test_item_access_reads_and_writes_fields(self):
+        op = Operator.from_dict(operator_info)
+        assert op["operator_name"] == "Lemon"
+        assert op.get("banana", 5) == 5
+        op["content_hash"] = "abc"
+        assert op.content_hash == "abc"
+        with pytest.raises(KeyError):
+            op["banana"]
+
+    def test_row_skips_none_and_shares_nested_values(self):
+        op = Operator.from_dict(operator_info)
+        row = op.row(archetype_id=3)
+        expected = {**operator_info, "archetype_id": 3}
+        del expected["alter"]
+        assert row == expected
+        assert row["level_stats"] is operator_info["level_stats"]
+
+    def test_from_dict_rejects_unknown_keys(self):
+        with pytest.raises(TypeError):
+            Skill.from_dict({"skill_name": "a", "sp_type": "b",
+                             "activation_type": "c", "banana": 1})
+
+
+class Test_as_row:
+    def test_copies_top_level_of_dicts_only(self):
+        row = as_row(operator_info, archetype_id=3)
+        assert row["archetype_id"] == 3
+        assert "archetype_id" not in operator_info
+        assert row["level_stats"] is operator_info["level_stats"]
+
+    def test_uses_record_row(self):
+        arch = Archetype("Caster", "Core", "Arts", "Ranged", "Arts")
+        assert as_row(arch) == {
+            "class_name": "Caster", "archetype_name": "Core",
+            "trait": "Arts", "position": "Ranged", "attack_type": "Arts"
+        }
+
+
+class Test_to_records:
+    def test_wraps_scrape_output(self):
+        skill = {"skill_name": "a", "sp_type": "b", "activation_type": "c"}
+        arch = {"class_name": "Caster", "archetype_name": "Core",
+                "trait": "Arts", "position": "Ranged", "attack_type": "Arts"}
+        op, a, skills, modules, tags = to_records(
+            operator_info, arch, [skill], [], ["DPS"]
+        )
+        assert isinstance(op, Operator) and isinstance(a, Archetype)
+        assert [s.row() for s in skills] == [skill]
+        assert modules == []
+        assert tags == ("DPS",)
@@ -0,0 +1,96 @@
+from src.utils.recruit import (
+    RecruitIndex,
+    UnknownTagErr,
+    TooManyTagsErr,
+    build_index,
+    get_index,
+    invalidate,
+    indexes
+)
+from unittest.mock import patch
+import pytest
+
+operators = [
+    {"operator_id": 1, "operator_name": "Lemon", "rarity": 3},
+    {"operator_id": 2, "operator_name": "Lime", "rarity": 4},
+    {"operator_id": 3, "operator_name": "Orange", "rarity": 5},
+    {"operator_id": 4, "operator_name": "Apple", "rarity": 6}
+]
+tags = [
+    {"tag_id": 1, "tag_name": "Sour"},
+    {"tag_id": 2, "tag_name": "Citrus"},
+    {"tag_id": 3, "tag_name": "Top Operator"}
+]
+operators_tags = [
+    {"operator_id": 1, "tag_id": 1},
+    {"operator_id": 1, "tag_id": 2},
+    {"operator_id": 2, "tag_id": 1},
+    {"operator_id": 2, "tag_id": 2},
+    {"operator_id": 3, "tag_id": 2},
+    {"operator_id": 4, "tag_id": 1},
+    {"operator_id": 4, "tag_id": 3}
+]
+
+
+def names(res):
+    return [op["operator_name"] for op in res["operators"]]
+
+
+class Test_RecruitIndex:
+    def test_builds_a_bitset_per_tag_in_rarity_order(self):
+        index = RecruitIndex(operators, tags, operators_tags)
+        assert index.bitsets == {
+            "Sour": 0b1011, "Citrus": 0b0111, "Top Operator": 0b1000
+        }
+
+    def test_precomputes_only_combinations_with_matches(self):
+        index = RecruitIndex(operators, tags, operators_tags)
+        assert frozenset(["Citrus", "Top Operator"]) not in index.results
+        res = index.results[frozenset(["Citrus", "Sour"])]
+        assert res["min_rarity"] == 3
+        assert names(res) == ["Lemon", "Lime"]
+
+    def test_six_stars_need_top_operator(self):
+        index = RecruitIndex(operators, tags, operators_tags)
+        assert names(index.results[frozenset(["Sour"])]) == ["Lemon", "Lime"]
+        res = index.results[frozenset(["Sour", "Top Operator"])]
+        assert names(res) == ["Apple"]
+
+    def test_lookup_sorts_by_guaranteed_rarity(self):
+        index = RecruitIndex(operators, tags, operators_tags)
+        res = index.lookup(["Sour", "Top Operator"])
+        assert [r["tags"] for r in res] == [
+            ["Top Operator"], ["Sour", "Top Operator"], ["Sour"]
+        ]
+
+    def test_lookup_rejects_unknown_and_too_many_tags(self):
+        index = RecruitIndex(operators, tags, operators_tags)
+        with pytest.raises(UnknownTagErr):
+            index.lookup(["Sweet"])
+        with pytest.raises(TooManyTagsErr):
+            index.lookup(["a", "b", "c", "d", "e", "f"])
+
+
+class Test_get_index:
+    @patch("src.utils.recruit.read")
+    def test_build_index_reads_servers_recruitable_pool(self, m_read):
+        m_read.side_effect = [operators, tags, operators_tags]
+        build_index("cn")
+        assert "cn_recruitable = TRUE" in str(m_read.call_args_list[0][0][0])
+
+    @patch("src.utils.freshness.data_version")
+    @patch("src.utils.recruit.build_index")
+    def test_caches_per_server_until_data_changes(self, m_build, m_version):
+        m_build.return_value = RecruitIndex(operators, tags, operators_tags)
+        m_version.return_value = 1
+        invalidate()
+        get_index()
+        get_index()
+        assert m_build.call_count == 1
+        get_index("cn")
+        m_build.assert_called_with("cn")
+        m_version.return_value = 2
+        get_index()
+        assert m_build.call_count == 3
+        invalidate()
+        assert indexes.values == {}
@@ -0,0 +1,58 @@
+from src.utils.scraper import scrape
+from os import path
+import json
+import pytest
+
+fixtures = path.join(path.dirname(__file__), "fixtures")
+
+
+def load_fixture(name: str):
+    with open(path.join(fixtures, name), encoding="utf-8") as f:
+        return f.read()
+
+
+def assert_matches(expected, actual):
+    ''' Compares actual against the old parser's output, field by field.
+        Fields the old parser didn't produce, like range masks, are skipped.
+    '''
+    if isinstance(expected, dict):
+        for key in expected:
+            assert_matches(expected[key], actual[key])
+    elif isinstance(expected, list):
+        assert len(expected) == len(actual)
+        for item, actual_item in zip(expected, actual):
+            assert_matches(item, actual_item)
+    else:
+        assert json.loads(json.dumps(actual)) == expected
+
+
+@pytest.fixture(scope="module")
+def scraped():
+    return scrape("op2", load_fixture("operator_page.html"))
+
+
+# operator_page.json is what the BeautifulSoup tree walking parser returned
+# for operator_page.html before scrape() moved to a single pass class index
+expected = json.loads(load_fixture("operator_page.json"))
+
+
+class Test_scrape:
+    def test_operator_matches_old_parser(self, scraped):
+        assert_matches(expected["operator"], scraped[0])
+
+    def test_archetype_matches_old_parser(self, scraped):
+        assert_matches(expected["archetype"], scraped[1])
+
+    def test_skills_match_old_parser(self, scraped):
+        assert_matches(expected["skills"], scraped[2])
+
+    def test_modules_match_old_parser(self, scraped):
+        assert_matches(expected["modules"], scraped[3])
+
+    def test_tags_match_old_parser(self, scraped):
+        assert sorted(scraped[4]) == sorted(expected["tags"])
+
+    def test_adds_range_masks(self, scraped):
+        assert set(scraped[0]["range_masks"]) == set(
+            expected["operator"]["ranges"]
+        )
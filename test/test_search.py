@@ -0,0 +1,105 @@
+from src.utils.search import (
+    nested_texts,
+    operator_documents,
+    archetype_documents,
+    skill_documents,
+    module_documents,
+    index_documents,
+    search
+)
+from unittest.mock import patch, call
+
+
+class Test_nested_texts:
+    def test_yields_unique_strings_depth_first(self):
+        data = {"e0": {"pot1": "a", "pot5": "b"}, "e2": {"pot1": "a"}}
+        assert list(nested_texts(data)) == ["a", "b"]
+
+
+class Test_documents:
+    def test_operator_documents_cover_description_and_talents(self):
+        op = {
+            "description": "A caster.",
+            "talents": {"Zest": {"e2/l1": {"pot1": "ATK +10%"}}}
+        }
+        assert operator_documents(op) == [
+            ("description", "A caster."),
+            ("talent", "Zest: ATK +10%")
+        ]
+
+    def test_archetype_documents_cover_trait(self):
+        assert archetype_documents({"trait": "Arts damage"}) == [
+            ("trait", "Arts damage")
+        ]
+        assert archetype_documents({}) == []
+
+    def test_skill_documents_dedupe_descriptions_by_level(self):
+        skill = {
+            "l1": {"skill_description": "ATK +10%"},
+            "l2": {"skill_description": "ATK +10%"},
+            "m3": {"skill_description": "ATK +50%"}
+        }
+        assert skill_documents(skill) == [
+            ("skill_description", "ATK +10%"),
+            ("skill_description", "ATK +50%")
+        ]
+
+    def test_module_documents_cover_trait_upgrade_and_talents(self):
+        module = {
+            "level_1_trait_upgrade": "Sourer",
+            "level_2_talent": {"Zest": {"e2/l60": {"pot1": "ATK +12%"}}},
+            "level_3_talent": {"Zest": {"e2/l60": {"pot1": "ATK +15%"}}}
+        }
+        assert module_documents(module) == [
+            ("trait_upgrade", "Sourer"),
+            ("module_talent", "Zest: ATK +12%"),
+            ("module_talent", "Zest: ATK +15%")
+        ]
+
+
+class Test_index_documents:
+    @patch("src.utils.search.run")
+    def test_replaces_stored_documents_for_entity(self, m_run):
+        m_run.return_value = [["Squeeze", "skill_description", "old"]]
+        assert index_documents(
+            "skill", 3, "Squeeze", [("skill_description", "x")]
+        )
+        select = "SELECT name, field, content FROM search_documents\n"
+        select += "WHERE entity = 'skill'\nAND entity_id = 3\n"
+        select += "ORDER BY search_document_id ASC;"
+        delete = "DELETE FROM search_documents\nWHERE entity = 'skill'\n"
+        delete += "AND entity_id = 3;"
+        insert = "INSERT INTO search_documents\n"
+        insert += "(entity, entity_id, name, field, content)\nVALUES\n"
+        insert += "('skill', 3, 'Squeeze', 'skill_description', 'x');"
+        assert m_run.call_args_list == [
+            call(select, "rows"), call(delete), call(insert)
+        ]
+
+    @patch("src.utils.search.run")
+    def test_only_deletes_when_no_documents(self, m_run):
+        m_run.return_value = [["Squeeze", "skill_description", "old"]]
+        index_documents("skill", 3, "Squeeze", [])
+        assert m_run.call_count == 2
+
+    @patch("src.utils.search.run")
+    def test_skips_rewrite_when_documents_unchanged(self, m_run):
+        m_run.return_value = [["Squeeze", "skill_description", "x"]]
+        assert not index_documents(
+            "skill", 3, "Squeeze", [("skill_description", "x")]
+        )
+        m_run.assert_called_once()
+
+
+class Test_search:
+    @patch("src.utils.search.run")
+    def test_builds_ranked_filtered_query(self, m_run):
+        search("arts damage", entity="operator", limit=5)
+        tsquery = "websearch_to_tsquery('english', 'arts damage')"
+        query = "SELECT entity, entity_id, name, field, content, "
+        query += f"ts_rank(document, {tsquery}) AS rank "
+        query += "FROM search_documents\n"
+        query += f"WHERE document @@ {tsquery}\n"
+        query += "AND (entity = 'operator')\n"
+        query += "ORDER BY rank DESC\nLIMIT 5;"
+        m_run.assert_called_with(query)
@@ -0,0 +1,20 @@
+from src.utils.snapshots import export_snapshots
+from unittest.mock import patch
+
+
+class Test_export_snapshots:
+    @patch("src.utils.snapshots.export_mmap")
+    @patch("src.utils.snapshots.export_sqlite")
+    @patch("src.utils.snapshots.getenv")
+    def test_exports_only_configured_snapshots(
+        self, m_env, m_sqlite, m_mmap
+    ):
+        m_env.side_effect = lambda key: None
+        export_snapshots()
+        m_sqlite.assert_not_called()
+        m_mmap.assert_not_called()
+        m_env.side_effect = lambda key: {"MMAP_SNAPSHOT": "snap.bin"}.get(key)
+        export_snapshots()
+        m_sqlite.assert_not_called()
+        m_mmap.assert_called_with("snap.bin")
+
@@ -0,0 +1,223 @@
+from src.utils.sources import (
+    Source,
+    GameDataSource,
+    MissingTableErr,
+    render_description,
+    range_string,
+    strip_markup,
+    slug,
+    ingest
+)
+from src.utils.ranges import decode_range
+from unittest.mock import Mock, patch, call
+import json
+import pytest
+
+
+def frame(level, atk, cost, block):
+    return {"level": level, "data": {
+        "maxHp": 1000 + atk, "atk": atk, "def": 100, "magicResistance": 10.0,
+        "cost": cost, "blockCnt": block, "baseAttackTime": 1.6,
+        "respawnTime": 70
+    }}
+
+
+game_data = {
+    "character_table": {
+        "char_001_lemon": {
+            "name": "Lemon",
+            "description": "Deals <@ba.kw>Arts damage</>",
+            "itemUsage": "A caster.",
+            "itemDesc": "Sour.",
+            "position": "RANGED",
+            "tagList": ["DPS"],
+            "rarity": "TIER_6",
+            "profession": "CASTER",
+            "subProfessionId": "corecaster",
+            "itemObtainApproach": "Recruitment & Headhunting",
+            "trait": None,
+            "phases": [
+                {"rangeId": "r1", "attributesKeyFrames": [
+                    frame(1, 300, 18, 1), frame(50, 500, 18, 1)]},
+                {"rangeId": "r1", "attributesKeyFrames": [
+                    frame(1, 500, 20, 1), frame(80, 600, 20, 1)]},
+                {"rangeId": "r1", "attributesKeyFrames": [
+                    frame(1, 600, 20, 1), frame(90, 700, 20, 1)]}
+            ],
+            "skills": [{"skillId": "skchr_lemon_1"}],
+            "talents": [{"candidates": [{
+                "unlockCondition": {"phase": "PHASE_2", "level": 1},
+                "requiredPotentialRank": 0,
+                "name": "Zest",
+                "description": "ATK <@ba.vup>+10%</>"
+            }]}],
+            "potentialRanks": [
+                {"description": "Deployment Cost -1", "buff": {"attributes": {
+                    "attributeModifiers": [
+                        {"attributeType": "COST", "value": -1.0}
+                    ]}}},
+                {"description": "Improves Talent", "buff": None}
+            ],
+            "favorKeyFrames": [
+                {"level": 0, "data": {"maxHp": 0, "atk": 0, "def": 0}},
+                {"level": 50, "data": {"maxHp": 0, "atk": 60, "def": 0}}
+            ]
+        },
+        "token_10000_pith": {"name": "Token", "profession": "TOKEN"}
+    },
+    "skill_table": {
+        "skchr_lemon_1": {"levels": [{
+            "name": "Squeeze",
+            "rangeId": None,
+            "description": "ATK <@ba.vup>+{atk:0%}</> for {duration} sec",
+            "skillType": "MANUAL",
+            "spData": {"spType": "INCREASE_WITH_TIME", "spCost": 30,
+                       "initSp": 10},
+            "duration": 20.0,
+            "blackboard": [{"key": "atk", "value": 0.5},
+                           {"key": "duration", "value": 20.0}]
+        }]}
+    },
+    "uniequip_table": {
+        "subProfDict": {"corecaster": {"subProfessionName": "Core Caster"}},
+        "equipDict": {
+            "uniequip_001_lemon": {"uniEquipName": "Lemon Mod",
+                                   "type": "ADVANCED"}
+        },
+        "charEquip": {"char_001_lemon": ["uniequip_001_lemon"]}
+    },
+    "battle_equip_table": {
+        "uniequip_001_lemon": {"phases": [
+            {"equipLevel": 1, "parts": [{"overrideTraitDataBundle": {
+                "candidates": [{"additionalDescription": "Even sourer",
+                                "blackboard": []}]}}],
+             "attributeBlackboard": [{"key": "atk", "value": 30}]},
+            {"equipLevel": 2, "parts": [{"addOrOverrideTalentDataBundle": {
+                "candidates": [{"name": "Zest", "requiredPotentialRank": 0,
+                                "upgradeDescription": "ATK +{atk:0%}",
+                                "blackboard": [{"key": "atk", "value": 0.1}]}
+                               ]}}],
+             "attributeBlackboard": [{"key": "atk", "value": 40}]},
+            {"equipLevel": 3, "parts": [],
+             "attributeBlackboard": [{"key": "max_hp", "value": 50}]}
+        ]}
+    },
+    "range_table": {"r1": {"grids": [
+        {"row": 0, "col": 1}, {"row": -1, "col": 1}
+    ]}},
+    "gacha_table": {"recruitDetail": "★★★★★★\n<@rc.eml>Lemon</>"}
+}
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    for table in game_data:
+        with open(tmp_path / f"{table}.json", "w") as f:
+            json.dump(game_data[table], f)
+    return tmp_path
+
+
+class Test_helpers:
+    def test_strip_markup_removes_rich_text_tags(self):
+        assert strip_markup("<@ba.kw>Arts</> damage") == "Arts damage"
+
+    def test_render_description_fills_templates(self):
+        blackboard = [
+            {"key": "atk", "value": 0.5},
+            {"key": "Time", "value": 3}
+        ]
+        text = "ATK +{atk:0%} for {time} sec, {-atk:0%}, {missing}"
+        assert render_description(text, blackboard) == (
+            "ATK +50% for 3 sec, -50%, {missing}"
+        )
+
+    def test_range_string_matches_parse_range_layout(self):
+        grids = [{"row": -1, "col": 1}, {"row": 0, "col": 1}]
+        assert range_string(grids) == " □\n■□"
+
+    def test_slug_lowercases_and_hyphenates(self):
+        assert slug("Ch'en the Holungday") == "chen-the-holungday"
+
+
+class Test_Source:
+    def test_incomplete_source_fails_on_creation(self):
+        class NamesOnly(Source):
+            def names(self):
+                return []
+
+        with pytest.raises(TypeError):
+            NamesOnly()
+
+
+class Test_GameDataSource:
+    def test_raises_MissingTableErr_without_required_tables(self, tmp_path):
+        with pytest.raises(MissingTableErr):
+            GameDataSource(str(tmp_path))
+
+    def test_names_lists_obtainable_operators_only(self, data_dir):
+        assert GameDataSource(str(data_dir)).names() == ["char_001_lemon"]
+
+    def test_load_returns_insert_compatible_tuple(self, data_dir):
+        source = GameDataSource(str(data_dir))
+        op, arch, skills, modules, tags = source.load("char_001_lemon")
+        assert op["operator_name"] == "Lemon"
+        assert op["gamepress_url_name"] == "lemon"
+        assert op["rarity"] == 6
+        assert op["interval"] == 1.6
+        assert op["level_stats"]["e2"] == {
+            "Base": {"ATK": 600, "DEF": 100, "HP": 1600},
+            "Max": {"ATK": 700, "DEF": 100, "HP": 1700, "Level": 90}
+        }
+        assert op["ranges"]["e0"] == " □\n■□"
+        assert decode_range(int(op["range_masks"]["e0"], 16)) == [
+            (0, 0), (1, -1), (1, 0)
+        ]
+        assert op["potentials"] == {
+            "pot2": {"DP Cost": -1}, "pot3": "Improves Talent"
+        }
+        assert op["trust_stats"] == {"ATK": 60}
+        assert op["talents"] == {"Zest": {"e2/l1": {"pot1": "ATK +10%"}}}
+        assert op["EN_released"] and op["EN_recruitable"]
+        assert not op["CN_released"]
+        assert arch.row() == {
+            "class_name": "Caster",
+            "archetype_name": "Core Caster",
+            "trait": "Deals Arts damage",
+            "position": "Ranged",
+            "attack_type": "Arts",
+            "cost_on_e1": True,
+            "cost_on_e2": False,
+            "block_on_e1": False,
+            "block_on_e2": False
+        }
+        assert [skill.row() for skill in skills] == [{
+            "skill_name": "Squeeze",
+            "sp_type": "Auto Recovery",
+            "activation_type": "Manual Trigger",
+            "l1": {"sp_cost": 30, "initial_sp": 10, "skill_duration": "20",
+                   "skill_description": "ATK +50% for 20 sec"}
+        }]
+        assert [module.row() for module in modules] == [{
+            "module_name": "Lemon Mod",
+            "level_1_stats": {"ATK": 30},
+            "level_1_trait_upgrade": "Even sourer",
+            "level_2_stats": {"ATK": 40},
+            "level_2_talent": {"Zest": {"e2/l60": {"pot1": "ATK +10%"}}},
+            "level_3_stats": {"HP": 50},
+            "level_3_talent": {}
+        }]
+        assert sorted(tags) == ["Caster", "DPS", "Ranged", "Top Operator"]
+
+
+class Test_ingest:
+    @patch("src.utils.sources.export_snapshots")
+    @patch("src.utils.sources.insert")
+    def test_inserts_every_loaded_operator(self, m_insert, m_export):
+        source = Mock()
+        source.names.return_value = ["a", "b"]
+        source.load.side_effect = lambda name: (name, 1, 2, 3, 4)
+        assert ingest(source) == ["a", "b"]
+        assert m_insert.call_args_list == [
+            call("a", 1, 2, 3, 4), call("b", 1, 2, 3, 4)
+        ]
+        m_export.assert_called_once()
@@ -0,0 +1,139 @@
+from src.utils.sqlite_snapshot import export_sqlite, to_sqlite
+from src.utils.connect import run_snapshot, column_types
+from unittest.mock import Mock, patch
+from datetime import date
+import pytest
+import sqlite3
+
+columns = {
+    "archetypes": [("archetype_id", "integer"), ("archetype_name", "text")],
+    "skills": [("skill_id", "integer"), ("skill_name", "text"),
+               ("l1", "jsonb")],
+    "modules": [("module_id", "integer"), ("module_name", "text")],
+    "operators": [("operator_id", "integer"), ("operator_name", "text"),
+                  ("gamepress_url_name", "text"), ("archetype_id", "integer"),
+                  ("level_stats", "jsonb"), ("limited", "boolean"),
+                  ("en_release_date", "date")],
+    "tags": [("tag_id", "integer"), ("tag_name", "text")],
+    "operators_tags": [("operator_tag_id", "integer"),
+                       ("operator_id", "integer"), ("tag_id", "integer")]
+}
+
+rows = {
+    "archetypes": [[1, "Core Caster"]],
+    "skills": [[1, "Squeeze", {"sp_cost": 30}]],
+    "modules": [],
+    "operators": [
+        [1, "Lemon", "lemon", 1, {"e2": {"Max": {"ATK": 700}}}, True,
+         date(2020, 4, 30)],
+        [2, "Lime", "lime", 1, {"e2": {"Max": {"ATK": 500}}}, False, None]
+    ],
+    "tags": [[1, "DPS"]],
+    "operators_tags": [[1, 1, 1]]
+}
+
+
+def fake_run(query, return_type={}):
+    table = str(query).split("'")[1]
+    return [
+        {"column_name": name, "data_type": data_type, "ordinal_position": i}
+        for i, (name, data_type) in enumerate(columns[table])
+    ]
+
+
+def fake_stream(query, return_type={}):
+    assert return_type == "rows"
+    return iter(rows[str(query).split("FROM ")[1].rstrip(";")])
+
+
+@pytest.fixture
+def snapshot(tmp_path):
+    file_path = str(tmp_path / "snapshot.db")
+    with patch("src.utils.sqlite_snapshot.run", side_effect=fake_run), \
+            patch("src.utils.sqlite_snapshot.stream", side_effect=fake_stream):
+        export_sqlite(file_path)
+    return file_path
+
+
+class Test_to_sqlite:
+    def test_converts_json_dates_and_bools(self):
+        assert to_sqlite({"a": 1}) == '{"a": 1}'
+        assert to_sqlite([1]) == "[1]"
+        assert to_sqlite(date(2020, 4, 30)) == "2020-04-30"
+        assert to_sqlite(True) == 1
+        assert to_sqlite("lemon") == "lemon"
+
+
+class Test_export_sqlite:
+    def test_round_trips_rows_with_decoded_types(self, snapshot):
+        res = run_snapshot(
+            "SELECT * FROM operators WHERE operator_id = 1;",
+            file_path=snapshot
+        )
+        assert res == [{
+            "operator_id": 1,
+            "operator_name": "Lemon",
+            "gamepress_url_name": "lemon",
+            "archetype_id": 1,
+            "level_stats": {"e2": {"Max": {"ATK": 700}}},
+            "limited": True,
+            "en_release_date": date(2020, 4, 30)
+        }]
+
+    def test_serves_json_path_filters_from_query_builder(self, snapshot):
+        from src.utils.query import Query
+        q = Query("operators").select("operator_name")
+        q.where({("level_stats", "e2", "Max", "ATK"): (">", 600)})
+        assert run_snapshot(q, file_path=snapshot) == [
+            {"operator_name": "Lemon"}
+        ]
+
+    def test_creates_lookup_indexes(self, snapshot):
+        res = run_snapshot(
+            "SELECT name FROM sqlite_master WHERE type = 'index';",
+            [],
+            file_path=snapshot
+        )
+        assert ["operators_operator_name_idx"] in res
+
+    def test_returns_the_other_shapes_run_does(self, snapshot):
+        q = "SELECT operator_name, limited FROM operators "
+        q += "ORDER BY operator_id;"
+        res = run_snapshot(q, "columns", file_path=snapshot)
+        assert res == {"operator_name": ["Lemon", "Lime"],
+                       "limited": [True, False]}
+        res = run_snapshot(q, "namedtuples", file_path=snapshot)
+        assert res[1].operator_name == "Lime"
+
+
+class Test_column_types:
+    def test_reads_columns_once_per_snapshot_file(self, snapshot):
+        db = Mock()
+        db.execute.return_value.fetchall.return_value = [("t", "a", "date")]
+        assert column_types(db, snapshot, (1, 2, 3)) == {("t", "a"): "date"}
+        assert column_types(db, snapshot, (1, 2, 3)) == {("t", "a"): "date"}
+        db.execute.assert_called_once()
+        column_types(db, snapshot, (1, 2, 4))
+        assert db.execute.call_count == 2
+
+    def test_same_column_name_decoded_per_table(self, tmp_path):
+        file_path = str(tmp_path / "snap.db")
+        db = sqlite3.connect(file_path)
+        db.execute("CREATE TABLE _columns "
+                   "(table_name TEXT, column_name TEXT, data_type TEXT);")
+        db.executemany("INSERT INTO _columns VALUES (?, ?, ?);", [
+            ("a", "added", "date"), ("b", "added", "text")
+        ])
+        db.execute("CREATE TABLE a (added TEXT);")
+        db.execute("CREATE TABLE b (added TEXT);")
+        db.execute("INSERT INTO a VALUES ('2020-04-30');")
+        db.execute("INSERT INTO b VALUES ('2020-04-30');")
+        db.commit()
+        db.close()
+        q = "SELECT added FROM {};"
+        assert run_snapshot(q.format("a"), "rows", file_path) == [
+            [date(2020, 4, 30)]
+        ]
+        assert run_snapshot(q.format("b"), "rows", file_path) == [
+            ["2020-04-30"]
+        ]
\ No newline at end of file
@@ -0,0 +1,125 @@
+from src.utils.stat_engine import (
+    StatEngine,
+    BadStatParamErr,
+    build_engine,
+    get_engine,
+    invalidate
+)
+from unittest.mock import patch
+import numpy as np
+import pytest
+
+
+def stage(base, top, level):
+    return {
+        "Base": dict(zip(["HP", "ATK", "DEF"], base)),
+        "Max": {**dict(zip(["HP", "ATK", "DEF"], top)), "Level": level}
+    }
+
+
+operators = [
+    {
+        "operator_id": 1, "operator_name": "Lemon", "archetype_id": 1,
+        "level_stats": {
+            "e0": stage([100, 10, 10], [200, 20, 20], 50),
+            "e1": stage([200, 20, 20], [300, 30, 30], 80),
+            "e2": stage([300, 30, 30], [400, 40, 40], 90)
+        },
+        "potentials": {"pot2": "Deployment Cost -1", "pot3": {"ATK": 5},
+                       "pot5": {"ATK": 5, "HP": 10}},
+        "trust_stats": {"ATK": 20},
+        "module_1_id": 1, "module_2_id": None
+    },
+    {
+        "operator_id": 2, "operator_name": "Lime", "archetype_id": 2,
+        "level_stats": {"e0": stage([50, 5, 5], [150, 55, 15], 30)},
+        "potentials": {}, "trust_stats": {},
+        "module_1_id": None, "module_2_id": None
+    }
+]
+archetypes = [
+    {"archetype_id": 1, "class_name": "Sniper", "archetype_name": "Marks"},
+    {"archetype_id": 2, "class_name": "Caster", "archetype_name": "Core"}
+]
+modules = [{
+    "module_id": 1,
+    "level_1_stats": {"ATK": 10},
+    "level_2_stats": {"ATK": 20},
+    "level_3_stats": {"ATK": 30, "HP": 50}
+}]
+
+
+class Test_StatEngine:
+    def test_max_level_stats_with_missing_stages_as_nan(self):
+        engine = StatEngine(operators, archetypes, modules)
+        res = engine.compute(elite=2)
+        assert res[0].tolist() == [400, 40, 40]
+        assert np.isnan(res[1]).all()
+
+    def test_interpolates_and_caps_level(self):
+        engine = StatEngine(operators, archetypes, modules)
+        res = engine.compute(elite=0, level=25)
+        step = 24 / 49
+        assert res[0].tolist() == pytest.approx(
+            [100 + 100 * step, 10 + 10 * step, 10 + 10 * step]
+        )
+        assert engine.compute(elite=0, level=70)[1].tolist() == [150, 55, 15]
+
+    def test_adds_potential_trust_and_module_bonuses(self):
+        engine = StatEngine(operators, archetypes, modules)
+        res = engine.compute(elite=2, potential=6, trust=50, module=1)
+        assert res[0].tolist() == [460, 90, 40]
+        res = engine.compute(elite=1, potential=4, trust=200, module=1)
+        assert res[0].tolist() == [300, 55, 30]
+
+    def test_rank_filters_and_sorts(self):
+        engine = StatEngine(operators, archetypes, modules)
+        assert [r["operator_name"] for r in engine.rank(elite=0)] == [
+            "Lime", "Lemon"
+        ]
+        res = engine.rank("HP", class_name="sniper", elite=0, trust=100)
+        assert res == [
+            {"operator_name": "Lemon", "HP": 200, "ATK": 40, "DEF": 20}
+        ]
+
+    def test_rejects_bad_params(self):
+        engine = StatEngine(operators, archetypes, modules)
+        with pytest.raises(BadStatParamErr):
+            engine.compute(elite=3)
+        with pytest.raises(BadStatParamErr):
+            engine.compute(potential=0)
+        with pytest.raises(BadStatParamErr):
+            engine.rank("ASPD")
+
+    def test_rejects_levels_and_limits_below_one(self):
+        engine = StatEngine(operators, archetypes, modules)
+        for level in [0, -5]:
+            with pytest.raises(BadStatParamErr):
+                engine.compute(level=level)
+        for limit in [0, -1]:
+            with pytest.raises(BadStatParamErr):
+                engine.rank("ATK", limit=limit)
+
+
+class Test_get_engine:
+    @patch("src.utils.freshness.data_version")
+    @patch("src.utils.stat_engine.read")
+    def test_builds_once_until_data_changes(self, m_read, m_version):
+        m_version.return_value = 1
+        m_read.side_effect = lambda q: {
+            "operators": operators, "archetypes": archetypes,
+            "modules": modules
+        }[q.table]
+        invalidate()
+        engine = get_engine()
+        assert get_engine() is engine
+        assert m_read.call_count == 3
+        m_version.return_value = 2
+        assert get_engine() is not engine
+        invalidate()
+
+    @patch("src.utils.stat_engine.read")
+    def test_build_engine_selects_stat_columns(self, m_read):
+        m_read.side_effect = [operators, archetypes, modules]
+        build_engine()
+        assert "level_stats" in str(m_read.call_args_list[0][0][0])